@@ -0,0 +1,168 @@
+# config/keyset.py
+"""
+Keyset pagination and NDJSON streaming for list endpoints, shared by the
+fire and users apps.
+"""
+import base64
+import datetime
+import json
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+NDJSON_CHUNK = 500
+
+
+def _cursor_default(o):
+    # full isoformat: DRF/Django encoders cut microseconds, which would
+    # break the equality step of the keyset comparison
+    if isinstance(o, (datetime.datetime, datetime.date, datetime.time)):
+        return o.isoformat()
+    return str(o)
+
+
+def encode_cursor(values) -> str:
+    raw = json.dumps(values, default=_cursor_default, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+    except Exception:
+        raise ValueError("Invalid cursor.")
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor.")
+    return values
+
+
+class KeysetPaginator:
+    """
+    Cursor (keyset) pagination over a unique ordering, e.g. ("-date_time", "-id").
+    The next page is "rows strictly after the last row" in that ordering,
+    so cost does not grow with depth and concurrent inserts never shift pages.
+    Cursors are opaque base64 of the last row's ordering values.
+    """
+
+    def __init__(self, *ordering, default_limit=100, max_limit=1000):
+        self.ordering = ordering
+        self.fields = [f.lstrip("-") for f in ordering]
+        self.default_limit = default_limit
+        self.max_limit = max_limit
+
+    @staticmethod
+    def requested(request) -> bool:
+        return "limit" in request.GET or "cursor" in request.GET
+
+    def _after(self, values):
+        # lexicographic "(a, b, ...) after (va, vb, ...)", honouring each direction
+        q = Q()
+        equal = {}
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip("-")
+            op = "lt" if field.startswith("-") else "gt"
+            q |= Q(**equal, **{f"{name}__{op}": value})
+            equal[name] = value
+        return q
+
+    def paginate(self, queryset, request):
+        """
+        Returns (rows, next_cursor). Raises ValueError on a bad limit/cursor.
+        """
+        try:
+            limit = int(request.GET.get("limit") or self.default_limit)
+        except ValueError:
+            raise ValueError("limit must be an integer.")
+        limit = max(1, min(limit, self.max_limit))
+
+        qs = queryset.order_by(*self.ordering)
+
+        token = request.GET.get("cursor")
+        if token:
+            values = decode_cursor(token)
+            if len(values) != len(self.fields):
+                raise ValueError("Invalid cursor.")
+            try:
+                # values the field cannot take (tampered cursor) fail here
+                qs = qs.filter(self._after(values))
+            except (ValueError, TypeError, DjangoValidationError):
+                raise ValueError("Invalid cursor.")
+
+        rows = list(qs[:limit + 1])
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_cursor([getattr(last, f) for f in self.fields])
+        return rows, next_cursor
+
+
+def wants_ndjson(request) -> bool:
+    if (request.GET.get("format") or "").lower() == "ndjson":
+        return True
+    return NDJSON_CONTENT_TYPE in (request.META.get("HTTP_ACCEPT") or "")
+
+
+def ndjson_response(queryset, to_dict, chunk_size=NDJSON_CHUNK):
+    """
+    One JSON object per line. queryset.iterator() uses a server-side cursor
+    on PostgreSQL, so memory stays flat regardless of row count.
+    """
+    encoder = JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+
+    def generate():
+        buf = []
+        for obj in queryset.iterator(chunk_size=chunk_size):
+            buf.append(encoder.encode(to_dict(obj)))
+            if len(buf) >= chunk_size:
+                yield ("\n".join(buf) + "\n").encode("utf-8")
+                buf = []
+        if buf:
+            yield ("\n".join(buf) + "\n").encode("utf-8")
+
+    return StreamingHttpResponse(generate(), content_type=NDJSON_CONTENT_TYPE)
+
+
+class KeysetPagination(BasePagination):
+    """
+    DRF pagination class on top of KeysetPaginator, for generic list views.
+    Ordering comes from the view's `keyset_ordering`. Inactive (plain list
+    response) unless the client sends ?limit= or ?cursor=.
+    """
+    ordering = ("-id",)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not KeysetPaginator.requested(request):
+            return None
+        paginator = KeysetPaginator(*getattr(view, "keyset_ordering", self.ordering))
+        try:
+            rows, self.next_cursor = paginator.paginate(queryset, request)
+        except ValueError as e:
+            raise ValidationError({"detail": str(e)})
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({"results": data, "next_cursor": self.next_cursor})
+
+
+class NDJSONListMixin:
+    """
+    For generic ListAPIViews: ?format=ndjson (or Accept: application/x-ndjson)
+    streams the filtered queryset through the view's serializer.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if wants_ndjson(request):
+            queryset = self.filter_queryset(self.get_queryset())
+            serializer_class = self.get_serializer_class()
+            context = self.get_serializer_context()
+            return ndjson_response(queryset, lambda obj: serializer_class(obj, context=context).data)
+        return super().list(request, *args, **kwargs)
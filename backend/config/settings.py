@@ -51,6 +51,9 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.AllowAny",
     ],
+    # ?format= is used by our own endpoints (topojson, ndjson, fgb, ...),
+    # not as DRF's renderer override
+    "URL_FORMAT_OVERRIDE": None,
 }
 
 JWT_SECRET_KEY = SECRET_KEY
@@ -192,6 +195,11 @@ MINIO_SECRET_KEY = _env("MINIO_SECRET_KEY", "MINIO_ROOT_PASSWORD", default="")
 # Optional legacy/default bucket
 MINIO_BUCKET_NAME_FIRE = _env("MINIO_BUCKET_NAME_FIRE", default="fire")
 
+# Publish rasters as GeoServer COG stores that range-read the object from
+# MinIO (cog-plugin) instead of copying it through Django into GeoServer.
+# Falls back to the copy when the store cannot be created.
+GEOSERVER_COG_STORES = _env("GEOSERVER_COG_STORES", default="true").lower() == "true"
+
 
 # -------------------------
 # GeoServer Settings (REST internal vs browser/public)
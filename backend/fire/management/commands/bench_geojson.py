@@ -0,0 +1,132 @@
+# fire/management/commands/bench_geojson.py
+import json
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+
+from fire.utils.geojson import GEOJSON_LAYERS, iter_feature_collection_from_sql, layer_rows_sql
+from fire.views import feature_collection_from_sql
+
+
+def _legacy_sql(layer: str) -> str:
+    table, props = GEOJSON_LAYERS[layer]
+    return f"SELECT {props}::text, ST_AsGeoJSON(geometry::geometry)::text FROM {table};"
+
+
+def _run_legacy(layer: str) -> int:
+    # Same work the old views did: parse rows -> dicts -> DRF JSON render
+    from rest_framework.renderers import JSONRenderer
+
+    fc = feature_collection_from_sql(_legacy_sql(layer))
+    return len(JSONRenderer().render(fc))
+
+
+def _run_stream(layer: str) -> int:
+    sql, params = layer_rows_sql(layer)
+    size = 0
+    for chunk in iter_feature_collection_from_sql(sql, params):
+        size += len(chunk)
+    return size
+
+
+MODES = {"legacy": _run_legacy, "stream": _run_stream}
+
+
+class Command(BaseCommand):
+    help = "Benchmark GeoJSON endpoints: legacy (parse + re-serialize) vs streamed passthrough."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--layer", choices=sorted(GEOJSON_LAYERS), action="append",
+                            help="Layer(s) to benchmark (default: all)")
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--child", choices=sorted(MODES), help="internal: run one mode in this process")
+        parser.add_argument("--base-url", default="",
+                            help="Measure over HTTP instead, e.g. http://localhost/api/fire "
+                                 "(bytes on wire + time to first byte per Accept-Encoding)")
+
+    def handle(self, *args, **opts):
+        layers = opts["layer"] or sorted(GEOJSON_LAYERS)
+        repeat = max(1, opts["repeat"])
+
+        if opts["base_url"]:
+            self._wire(opts["base_url"].rstrip("/"), layers, repeat)
+            return
+
+        if opts["child"]:
+            # Child process: one mode, one layer, fresh interpreter => clean peak RSS
+            self._child(opts["child"], layers[0], repeat)
+            return
+
+        self.stdout.write(f"{'layer':<10} {'mode':<7} {'bytes':>12} {'ms/req':>10} {'py_peak_MB':>11} {'rss_peak_MB':>12}")
+        for layer in layers:
+            for mode in MODES:
+                out = subprocess.run(
+                    [sys.executable, sys.argv[0], "bench_geojson", "--child", mode,
+                     "--layer", layer, "--repeat", str(repeat)],
+                    capture_output=True, text=True,
+                )
+                if out.returncode != 0:
+                    raise CommandError(out.stderr.strip() or f"{mode} benchmark failed")
+                r = json.loads(out.stdout.strip().splitlines()[-1])
+                self.stdout.write(
+                    f"{layer:<10} {mode:<7} {r['bytes']:>12} {r['ms']:>10.1f} "
+                    f"{r['py_peak_mb']:>11.1f} {r['rss_peak_mb']:>12.1f}"
+                )
+
+    def _child(self, mode, layer, repeat):
+        fn = MODES[mode]
+        fn(layer)  # warm-up (connection, plans, imports)
+
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        size = 0
+        for _ in range(repeat):
+            size = fn(layer)
+        elapsed = (time.perf_counter() - t0) / repeat
+        _, py_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # ru_maxrss is KiB on Linux
+        rss_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+        self.stdout.write(json.dumps({
+            "bytes": size,
+            "ms": elapsed * 1000.0,
+            "py_peak_mb": py_peak / (1024.0 * 1024.0),
+            "rss_peak_mb": rss_peak,
+        }))
+
+    def _wire(self, base_url, layers, repeat):
+        import requests
+
+        self.stdout.write(f"{'layer':<10} {'accept':<9} {'encoding':<9} {'wire_bytes':>12} {'ttfb_ms':>9} {'total_ms':>9}")
+        with requests.Session() as s:
+            for layer in layers:
+                for accept in ("identity", "gzip", "br"):
+                    ttfb = total = 0.0
+                    size = 0
+                    enc = ""
+                    for _ in range(repeat):
+                        t0 = time.perf_counter()
+                        r = s.get(f"{base_url}/{layer}/", headers={"Accept-Encoding": accept},
+                                  stream=True, timeout=300)
+                        r.raise_for_status()
+                        size = 0
+                        first = None
+                        # raw stream: count compressed bytes as they arrive on the wire
+                        for chunk in r.raw.stream(64 * 1024, decode_content=False):
+                            if first is None:
+                                first = time.perf_counter()
+                            size += len(chunk)
+                        end = time.perf_counter()
+                        ttfb += ((first or end) - t0)
+                        total += (end - t0)
+                        enc = r.headers.get("Content-Encoding", "identity")
+                    self.stdout.write(
+                        f"{layer:<10} {accept:<9} {enc:<9} {size:>12} "
+                        f"{ttfb / repeat * 1000.0:>9.1f} {total / repeat * 1000.0:>9.1f}"
+                    )
@@ -0,0 +1,193 @@
+# fire/management/commands/bench_minio.py
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from urllib.parse import parse_qs, urlsplit
+
+from django.core.management.base import BaseCommand
+
+from fire.utils import minio_manager
+from fire.utils.minio_manager import DEFAULT_PART_SIZE, MinioManager
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    """
+    Just enough of the S3 API for MinioManager uploads (bucket checks,
+    policy, PUT, multipart). Bodies are read and dropped; every request
+    waits server.latency seconds to stand in for a network round trip.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _handle(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+        length = int(self.headers.get("Content-Length") or 0)
+        while length > 0:
+            length -= len(self.rfile.read(min(length, 1024 * 1024)))
+        time.sleep(server.latency)
+
+        url = urlsplit(self.path)
+        query = parse_qs(url.query, keep_blank_values=True)
+        body = b""
+        if self.command == "GET" and "location" in query:
+            body = b'<LocationConstraint xmlns="http://s3.amazonaws.com/doc/2006-03-01/"></LocationConstraint>'
+        elif self.command == "POST" and "uploads" in query:
+            body = (f"<InitiateMultipartUploadResult><UploadId>{uuid.uuid4().hex}</UploadId>"
+                    f"</InitiateMultipartUploadResult>").encode()
+        elif self.command == "POST" and "uploadId" in query:
+            body = (f"<CompleteMultipartUploadResult><Location>{url.path}</Location>"
+                    f"<ETag>\"{uuid.uuid4().hex}\"</ETag></CompleteMultipartUploadResult>").encode()
+
+        self.send_response(204 if self.command == "DELETE" else 200)
+        self.send_header("ETag", f"\"{uuid.uuid4().hex}\"")
+        self.send_header("Content-Length", str(len(body)))
+        if body:
+            self.send_header("Content-Type", "application/xml")
+        self.end_headers()
+        if body and self.command != "HEAD":
+            self.wfile.write(body)
+
+    do_GET = do_PUT = do_POST = do_HEAD = do_DELETE = _handle
+
+
+def _start_standin(latency_ms: float):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StandInHandler)
+    server.daemon_threads = True
+    server.latency = latency_ms / 1000.0
+    server.requests = 0
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _legacy_client():
+    # what every upload used to do: a fresh client (own pool, no region)
+    from minio import Minio
+
+    return Minio(
+        endpoint=os.getenv("MINIO_ENDPOINT", "minio:9000"),
+        access_key=os.getenv("MINIO_ACCESS_KEY") or os.getenv("MINIO_ROOT_USER", "minioadmin"),
+        secret_key=os.getenv("MINIO_SECRET_KEY") or os.getenv("MINIO_ROOT_PASSWORD", "minioadmin"),
+        secure=os.getenv("MINIO_SECURE", "false").lower() == "true",
+    )
+
+
+def _legacy_ensure(client, bucket):
+    if not client.bucket_exists(bucket):
+        client.make_bucket(bucket)
+    client.set_bucket_policy(bucket, MinioManager()._bucket_policy_public_download(bucket))
+
+
+def _legacy_put_bytes(bucket, name, content):
+    client = _legacy_client()
+    _legacy_ensure(client, bucket)
+    client.put_object(bucket, name, BytesIO(content), len(content), content_type="image/tiff")
+
+
+def _legacy_put_file(bucket, name, path):
+    client = _legacy_client()
+    _legacy_ensure(client, bucket)
+    client.fput_object(bucket, name, path, content_type="image/tiff", part_size=DEFAULT_PART_SIZE)
+
+
+def _pooled_put_bytes(bucket, name, content):
+    MinioManager().put_bytes(bucket, name, content, content_type="image/tiff")
+
+
+def _pooled_put_file(bucket, name, path):
+    MinioManager().put_file(bucket, name, path, content_type="image/tiff")
+
+
+MODES = {
+    "legacy": (_legacy_put_bytes, _legacy_put_file),
+    "pooled": (_pooled_put_bytes, _pooled_put_file),
+}
+
+
+class Command(BaseCommand):
+    help = ("Benchmark MinIO uploads: legacy (client + bucket checks per upload, sequential parts) "
+            "vs pooled (shared client, bucket cache, concurrent parts). Per-upload latency.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=20, help="Uploads per mode and size")
+        parser.add_argument("--small-mb", type=float, default=1.0, help="put_bytes object size (single PUT)")
+        parser.add_argument("--large-mb", type=float, default=64.0, help="put_file size (multipart)")
+        parser.add_argument("--bucket", default="bench-uploads")
+        parser.add_argument("--standin", action="store_true",
+                            help="Run against an in-process S3 stand-in instead of MINIO_ENDPOINT")
+        parser.add_argument("--latency-ms", type=float, default=2.0,
+                            help="Stand-in: delay per request (simulated round trip)")
+        parser.add_argument("--json", action="store_true", help="Print results as JSON lines")
+
+    def handle(self, *args, **opts):
+        server = None
+        if opts["standin"]:
+            server = _start_standin(opts["latency_ms"])
+            os.environ["MINIO_ENDPOINT"] = f"127.0.0.1:{server.server_address[1]}"
+            os.environ["MINIO_SECURE"] = "false"
+
+        count = max(1, opts["count"])
+        small = os.urandom(int(opts["small_mb"] * 1024 * 1024))
+        fd, large_path = tempfile.mkstemp(suffix=".tif")
+        with os.fdopen(fd, "wb") as fh:
+            remaining = int(opts["large_mb"] * 1024 * 1024)
+            while remaining > 0:
+                n = min(remaining, 8 * 1024 * 1024)
+                fh.write(os.urandom(n))
+                remaining -= n
+
+        if not opts["json"]:
+            self.stdout.write(f"{'mode':<7} {'upload':<14} {'n':>4} {'mean_ms':>9} {'p50_ms':>9} "
+                              f"{'p95_ms':>9} {'max_ms':>9} {'req/upload':>11}")
+        try:
+            for mode, (put_bytes, put_file) in MODES.items():
+                minio_manager.bucket_cache.invalidate()
+                for label, run in (
+                    (f"bytes {opts['small_mb']:g}MiB", lambda name: put_bytes(opts["bucket"], name, small)),
+                    (f"file {opts['large_mb']:g}MiB", lambda name: put_file(opts["bucket"], name, large_path)),
+                ):
+                    self._report(mode, label, self._measure(run, count, server), opts["json"])
+        finally:
+            os.unlink(large_path)
+            if server is not None:
+                server.shutdown()
+
+    def _measure(self, run, count, server):
+        times = []
+        requests_before = server.requests if server else 0
+        for i in range(count):
+            t0 = time.perf_counter()
+            run(f"bench/{uuid.uuid4().hex}.tif")
+            times.append((time.perf_counter() - t0) * 1000.0)
+        return times, ((server.requests - requests_before) / count if server else None)
+
+    def _report(self, mode, label, result, as_json):
+        times, req = result
+        times_sorted = sorted(times)
+        row = {
+            "mode": mode,
+            "upload": label,
+            "n": len(times),
+            "mean_ms": statistics.fmean(times),
+            "p50_ms": statistics.median(times),
+            "p95_ms": times_sorted[min(len(times) - 1, int(round(0.95 * (len(times) - 1))))],
+            "max_ms": times_sorted[-1],
+            "requests_per_upload": req,
+        }
+        if as_json:
+            self.stdout.write(json.dumps(row))
+            return
+        self.stdout.write(
+            f"{mode:<7} {label:<14} {row['n']:>4} {row['mean_ms']:>9.1f} {row['p50_ms']:>9.1f} "
+            f"{row['p95_ms']:>9.1f} {row['max_ms']:>9.1f} {req if req is not None else '-':>11}"
+        )
@@ -0,0 +1,24 @@
+# fire/management/commands/build_generalized.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from fire.utils.generalize import GENERALIZED_LAYERS, rebuild_generalized
+from fire.utils.snapshots import SNAPSHOT_LAYERS, write_snapshots
+from fire.utils.versioning import bump_layer_version
+
+
+class Command(BaseCommand):
+    help = "Rebuild zoom-band simplified geometry for boundary layers."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--kind", default="all", choices=["all"] + sorted(GENERALIZED_LAYERS))
+
+    @transaction.atomic
+    def handle(self, *args, **opts):
+        kinds = sorted(GENERALIZED_LAYERS) if opts["kind"] == "all" else [opts["kind"]]
+        for kind in kinds:
+            n = rebuild_generalized(kind)
+            version = bump_layer_version(kind)
+            if kind in SNAPSHOT_LAYERS:
+                transaction.on_commit(lambda k=kind, v=version: write_snapshots(k, v))
+            self.stdout.write(self.style.SUCCESS(f"{kind}: {n} rows"))
@@ -0,0 +1,21 @@
+# fire/management/commands/build_snapshots.py
+from django.core.management.base import BaseCommand
+
+from fire.utils.snapshots import SNAPSHOT_LAYERS, write_snapshots
+from fire.utils.versioning import get_layer_version
+
+
+class Command(BaseCommand):
+    help = "Write precompressed (gzip/brotli) GeoJSON snapshots for the current layer versions."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--kind", default="all", choices=["all"] + SNAPSHOT_LAYERS)
+
+    def handle(self, *args, **opts):
+        kinds = SNAPSHOT_LAYERS if opts["kind"] == "all" else [opts["kind"]]
+        for kind in kinds:
+            version = get_layer_version(kind)
+            sizes = write_snapshots(kind, version)
+            self.stdout.write(self.style.SUCCESS(
+                f"{kind} v{version}: " + ", ".join(f"{k}={v}B" for k, v in sizes.items())
+            ))
@@ -0,0 +1,61 @@
+# fire/management/commands/compute_zonal_stats.py
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from fire.models import IndexLayer
+from fire.utils.zonal import BATCH_ZONE_TYPES, ZONE_TYPES, raster_path, store_layer_zone_stats, zone_geometries
+
+
+class Command(BaseCommand):
+    help = "Zonal statistics of an index layer over every county/forest (one raster pass, process pool)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--index-layer", type=int, required=True, help="IndexLayer id")
+        parser.add_argument("--zone-type", action="append", choices=sorted(z for z in ZONE_TYPES if z != "aoi"),
+                            help=f"Zone layer(s) (default: {', '.join(BATCH_ZONE_TYPES)})")
+        parser.add_argument("--workers", type=int, default=0, help="Worker processes (default: all cores)")
+        parser.add_argument("--bench", default="",
+                            help="Comma separated worker counts, e.g. 1,2,4,8: time each, write nothing")
+
+    def handle(self, *args, **opts):
+        try:
+            obj = IndexLayer.objects.get(id=opts["index_layer"])
+        except IndexLayer.DoesNotExist:
+            raise CommandError(f"IndexLayer {opts['index_layer']} not found")
+        if not obj.minio_object:
+            raise CommandError("IndexLayer has no raster in MinIO")
+
+        zone_types = tuple(opts["zone_type"] or BATCH_ZONE_TYPES)
+
+        if opts["bench"]:
+            self._bench(obj, zone_types, opts["bench"])
+            return
+
+        t0 = time.perf_counter()
+        n = store_layer_zone_stats(obj, zone_types, workers=opts["workers"] or None)
+        self.stdout.write(self.style.SUCCESS(
+            f"{obj.index_name} {obj.date}: {n} zone rows in {time.perf_counter() - t0:.1f}s"
+        ))
+
+    def _bench(self, obj, zone_types, spec):
+        from fire.utils.zonal_batch import batch_zonal_stats
+
+        try:
+            counts = [int(c) for c in spec.split(",") if c.strip()]
+        except ValueError:
+            raise CommandError("--bench expects comma separated integers")
+
+        zones = [((zt, zid), g) for zt in zone_types for zid, g in zone_geometries(zt)]
+        path = raster_path(obj)
+        self.stdout.write(f"{len(zones)} zones, {os.cpu_count()} cores")
+        self.stdout.write(f"{'workers':>7} {'seconds':>9} {'speedup':>8}")
+
+        base = None
+        for n in counts:
+            t0 = time.perf_counter()
+            batch_zonal_stats(path, zones, workers=n)
+            elapsed = time.perf_counter() - t0
+            base = base or elapsed
+            self.stdout.write(f"{n:>7} {elapsed:>9.2f} {base / elapsed:>8.2f}")
@@ -7,6 +7,11 @@ from django.contrib.gis.geos import GEOSGeometry, MultiPolygon, MultiPoint
 from django.db import transaction
 
 from fire.models import IranProvince, IranCounty, IranForest, FireRiskArea
+from fire.utils.clusters import rebuild_clusters
+from fire.utils.generalize import GENERALIZED_LAYERS, rebuild_generalized
+from fire.utils.snapshots import SNAPSHOT_LAYERS, write_snapshots
+from fire.utils.tiles import prune_tile_cache
+from fire.utils.versioning import bump_layer_version
 
 
 def _read_geojson(path: str) -> dict:
@@ -224,6 +229,23 @@ class Command(BaseCommand):
             model.objects.bulk_create(objs, batch_size=batch)
             inserted += len(objs)
 
+        if kind in GENERALIZED_LAYERS:
+            n = rebuild_generalized(kind)
+            self.stdout.write(f"Generalized rows={n}")
+        elif kind == "fire-risk":
+            n = rebuild_clusters()
+            self.stdout.write(f"Cluster rows={n}")
+
+        version = bump_layer_version(kind)
+        transaction.on_commit(lambda: self._after_commit(kind, version))
+
         self.stdout.write(self.style.SUCCESS(
-            f"Inserted={inserted} | Skipped={skipped} | Table={model._meta.db_table}"
+            f"Inserted={inserted} | Skipped={skipped} | Table={model._meta.db_table} | Version={version}"
         ))
+
+    def _after_commit(self, kind, version):
+        prune_tile_cache(kind, version)
+
+        if kind in SNAPSHOT_LAYERS:
+            sizes = write_snapshots(kind, version)
+            self.stdout.write(f"Snapshots v{version}: " + ", ".join(f"{k}={v}B" for k, v in sizes.items()))
@@ -9,6 +9,7 @@ from django.utils.dateparse import parse_date, parse_datetime
 from django.contrib.gis.geos import Polygon
 
 from fire.models import IndexLayer, SatelliteImage
+from fire.utils.versioning import bump_layer_version
 
 
 class Command(BaseCommand):
@@ -85,6 +86,7 @@ class Command(BaseCommand):
             return
 
         obj.save()
+        bump_layer_version("index-layers" if kind == "index" else "satellite-images")
         self.stdout.write(self.style.SUCCESS(f"OK: inserted id={obj.id} kind={kind} file={p.name}"))
 
     def _extract_footprint_4326(self, tif_path: str):
@@ -0,0 +1,39 @@
+# fire/management/commands/run_jobs.py
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from fire.utils.jobs import JOB_HANDLERS, run_next, worker_name
+
+
+class Command(BaseCommand):
+    help = "Background job worker: claims jobs from fire_jobs (FOR UPDATE SKIP LOCKED) and runs them."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--kind", action="append", choices=sorted(JOB_HANDLERS),
+                            help="Only run these job kinds (default: all)")
+        parser.add_argument("--once", action="store_true", help="Run until the queue is empty, then exit")
+        parser.add_argument("--poll", type=float, default=2.0, help="Seconds to sleep when the queue is empty")
+
+    def handle(self, *args, **opts):
+        self._stop = False
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+
+        self.stdout.write(f"worker {worker_name()} started")
+        done = 0
+        while not self._stop:
+            close_old_connections()
+            if run_next(kinds=opts["kind"]):
+                done += 1
+                continue
+            if opts["once"]:
+                break
+            time.sleep(opts["poll"])
+        self.stdout.write(self.style.SUCCESS(f"worker {worker_name()} stopped after {done} job(s)"))
+
+    def _request_stop(self, signum, frame):
+        # finish the running job, then exit
+        self._stop = True
@@ -0,0 +1,55 @@
+# fire/management/commands/sample_index_layer.py
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from fire.models import IndexLayer
+from fire.utils.sampling import sample_fire_risk, sample_points
+from fire.utils.zonal import raster_path
+
+
+class Command(BaseCommand):
+    help = "Sample an index layer at all fire-risk points, or at points from a CSV (lon,lat columns)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--index-layer", type=int, required=True, help="IndexLayer id")
+        parser.add_argument("--csv", help="Input CSV with lon,lat columns (default: all fire-risk points)")
+        parser.add_argument("--out", help="Output CSV for --csv mode (default: stdout)")
+        parser.add_argument("--band", type=int, default=1)
+
+    def handle(self, *args, **opts):
+        try:
+            obj = IndexLayer.objects.get(id=opts["index_layer"])
+        except IndexLayer.DoesNotExist:
+            raise CommandError(f"IndexLayer {opts['index_layer']} not found")
+        if not obj.minio_object:
+            raise CommandError("IndexLayer has no raster in MinIO")
+
+        t0 = time.perf_counter()
+        if not opts["csv"]:
+            n = sample_fire_risk(obj, raster_path(obj))
+            self.stdout.write(self.style.SUCCESS(
+                f"{obj.index_name} {obj.date}: {n} fire-risk points in {time.perf_counter() - t0:.2f}s"
+            ))
+            return
+
+        with open(opts["csv"], newline="", encoding="utf-8") as fh:
+            rows = list(csv.DictReader(fh))
+        try:
+            coords = [(float(r["lon"]), float(r["lat"])) for r in rows]
+        except (KeyError, ValueError) as e:
+            raise CommandError(f"CSV needs numeric lon,lat columns: {e}")
+
+        values = sample_points(raster_path(obj), coords, band=opts["band"])
+
+        out = open(opts["out"], "w", newline="", encoding="utf-8") if opts["out"] else self.stdout
+        try:
+            writer = csv.writer(out)
+            writer.writerow(["lon", "lat", obj.index_name.lower()])
+            for (lon, lat), v in zip(coords, values.tolist()):
+                writer.writerow([lon, lat, "" if v != v else v])
+        finally:
+            if opts["out"]:
+                out.close()
+        self.stderr.write(f"{len(coords)} points in {time.perf_counter() - t0:.2f}s")
@@ -0,0 +1,35 @@
+# fire/management/commands/update_datacube.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from fire.models import IndexLayer
+from fire.utils.datacube import DataCube
+from fire.utils.zonal import raster_path
+
+
+class Command(BaseCommand):
+    help = "Append published index layers to their per-index_name datacube (already present layers are skipped)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--index-layer", type=int, help="Append this IndexLayer id only")
+        parser.add_argument("--index-name", help="Backfill every published layer of this index_name, oldest first")
+
+    def handle(self, *args, **opts):
+        if bool(opts["index_layer"]) == bool(opts["index_name"]):
+            raise CommandError("Give exactly one of --index-layer / --index-name")
+
+        qs = IndexLayer.objects.filter(is_published=True).exclude(minio_object__isnull=True).exclude(minio_object="")
+        if opts["index_layer"]:
+            qs = qs.filter(id=opts["index_layer"])
+            if not qs.exists():
+                raise CommandError(f"Published IndexLayer {opts['index_layer']} not found")
+        else:
+            qs = qs.filter(index_name=opts["index_name"])
+
+        for obj in qs.order_by("date", "id"):
+            t0 = time.perf_counter()
+            t = DataCube(obj.index_name).append(obj, raster_path(obj))
+            self.stdout.write(f"{obj.index_name} {obj.date} (layer {obj.id}) -> t={t} "
+                              f"in {time.perf_counter() - t0:.1f}s")
+        self.stdout.write(self.style.SUCCESS("Done"))
@@ -0,0 +1,25 @@
+# Generated by Django 6.0.2 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fire', '0007_indexlayer_error_message_indexlayer_geoserver_layer_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LayerVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('layer', models.CharField(max_length=50, unique=True)),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'fire_layer_versions',
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:05
+
+import django.contrib.gis.db.models.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fire', '0008_layerversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeneralizedBoundary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('layer', models.CharField(max_length=50)),
+                ('source_id', models.BigIntegerField()),
+                ('name', models.CharField(max_length=100)),
+                ('band', models.PositiveSmallIntegerField()),
+                ('geometry', django.contrib.gis.db.models.fields.MultiPolygonField(spatial_index=False, srid=4326)),
+            ],
+            options={
+                'db_table': 'fire_generalized_boundaries',
+                'indexes': [
+                    models.Index(fields=['layer', 'band'], name='fire_genb_layer_band_idx'),
+                    django.contrib.postgres.indexes.GistIndex(condition=models.Q(('band', 0)), fields=['geometry'], name='fire_genb_geom_band0'),
+                    django.contrib.postgres.indexes.GistIndex(condition=models.Q(('band', 1)), fields=['geometry'], name='fire_genb_geom_band1'),
+                    django.contrib.postgres.indexes.GistIndex(condition=models.Q(('band', 2)), fields=['geometry'], name='fire_genb_geom_band2'),
+                    django.contrib.postgres.indexes.GistIndex(condition=models.Q(('band', 3)), fields=['geometry'], name='fire_genb_geom_band3'),
+                ],
+            },
+        ),
+        # bands of data loaded before this table existed: see 0018
+    ]
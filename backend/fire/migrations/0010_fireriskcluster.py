@@ -0,0 +1,55 @@
+# Generated by Django 6.0.2 on 2026-10-18 11:40
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations, models
+
+
+# Cluster points loaded before this table existed. Frozen copy of
+# fire.utils.clusters.rebuild_clusters (zooms 0-12, 60 px cells) as of this
+# migration; later rebuilds go through load_geojson.
+BUILD_EXISTING_SQL = """
+INSERT INTO fire_risk_clusters (zoom, count, max_level, levels, geometry)
+SELECT
+  zoom, SUM(n), MAX(level),
+  jsonb_object_agg(level::text, n),
+  ST_Transform(ST_SetSRID(ST_MakePoint(SUM(sx) / SUM(n), SUM(sy) / SUM(n)), 3857), 4326)
+FROM (
+  SELECT zoom, cx, cy, level, COUNT(*) AS n, SUM(ST_X(g)) AS sx, SUM(ST_Y(g)) AS sy
+  FROM (
+    SELECT
+      z.zoom, p.level, p.g,
+      floor(ST_X(p.g) / (9392582.035682458 / power(2, z.zoom))) AS cx,
+      floor(ST_Y(p.g) / (9392582.035682458 / power(2, z.zoom))) AS cy
+    FROM (SELECT level, ST_Transform(geometry::geometry, 3857) AS g FROM fire_risk_areas) p
+    CROSS JOIN generate_series(0, 12) AS z(zoom)
+  ) s
+  GROUP BY zoom, cx, cy, level
+) t
+GROUP BY zoom, cx, cy;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fire', '0009_generalizedboundary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FireRiskCluster',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('zoom', models.PositiveSmallIntegerField()),
+                ('count', models.PositiveIntegerField()),
+                ('max_level', models.IntegerField()),
+                ('levels', models.JSONField(default=dict)),
+                ('geometry', django.contrib.gis.db.models.fields.PointField(srid=4326)),
+            ],
+            options={
+                'db_table': 'fire_risk_clusters',
+                'indexes': [models.Index(fields=['zoom'], name='fire_riskcl_zoom_idx')],
+            },
+        ),
+        migrations.RunSQL(BUILD_EXISTING_SQL, migrations.RunSQL.noop),
+    ]
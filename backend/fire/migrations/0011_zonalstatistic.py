@@ -0,0 +1,38 @@
+# Generated by Django 6.0.2 on 2026-10-18 12:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fire', '0010_fireriskcluster'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ZonalStatistic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('zone_type', models.CharField(max_length=20)),
+                ('zone_id', models.BigIntegerField()),
+                ('zone_version', models.PositiveIntegerField(default=0)),
+                ('index_name', models.CharField(max_length=50)),
+                ('date', models.DateField()),
+                ('count', models.BigIntegerField(default=0)),
+                ('mean', models.FloatField(blank=True, null=True)),
+                ('min', models.FloatField(blank=True, null=True)),
+                ('max', models.FloatField(blank=True, null=True)),
+                ('std', models.FloatField(blank=True, null=True)),
+                ('percentiles', models.JSONField(default=dict)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('index_layer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='zonal_stats', to='fire.indexlayer')),
+            ],
+            options={
+                'db_table': 'fire_zonal_stats',
+                'indexes': [models.Index(fields=['zone_type', 'zone_id', 'index_name', 'date'], name='fire_zonal_zone_idx')],
+                'constraints': [models.UniqueConstraint(fields=('index_layer', 'zone_type', 'zone_id', 'zone_version'), name='fire_zonal_stats_uniq')],
+            },
+        ),
+    ]
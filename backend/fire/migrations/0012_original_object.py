@@ -0,0 +1,23 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fire', '0011_zonalstatistic'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='indexlayer',
+            name='original_object',
+            field=models.CharField(blank=True, max_length=600, null=True),
+        ),
+        migrations.AddField(
+            model_name='satelliteimage',
+            name='original_object',
+            field=models.CharField(blank=True, max_length=600, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fire', '0012_original_object'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FireRiskSample',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.FloatField(blank=True, null=True)),
+                ('sampled_at', models.DateTimeField(auto_now=True)),
+                ('fire_risk_area', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='samples', to='fire.fireriskarea')),
+                ('index_layer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fire_risk_samples', to='fire.indexlayer')),
+            ],
+            options={
+                'db_table': 'fire_risk_samples',
+                'constraints': [models.UniqueConstraint(fields=('fire_risk_area', 'index_layer'), name='fire_risk_samples_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 6.0.2 on 2026-10-18 16:12
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fire', '0014_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('kind', models.CharField(max_length=20)),
+                ('file_name', models.CharField(max_length=255)),
+                ('size', models.BigIntegerField()),
+                ('chunk_size', models.PositiveIntegerField()),
+                ('metadata', models.JSONField(default=dict)),
+                ('staging_bucket', models.CharField(max_length=100)),
+                ('staging_object', models.CharField(max_length=600)),
+                ('upload_id', models.CharField(max_length=300)),
+                ('parts', models.JSONField(default=dict)),
+                ('status', models.CharField(choices=[('open', 'open'), ('completed', 'completed'), ('aborted', 'aborted')], default='open', max_length=20)),
+                ('object_id', models.BigIntegerField(blank=True, null=True)),
+                ('job_id', models.BigIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('expires_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'fire_upload_sessions',
+                'indexes': [models.Index(fields=['status', 'expires_at'], name='fire_upsess_status_idx')],
+            },
+        ),
+    ]
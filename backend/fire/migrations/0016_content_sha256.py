@@ -0,0 +1,31 @@
+# Generated by Django 6.0.2 on 2026-10-18 16:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fire', '0015_uploadsession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='indexlayer',
+            name='content_sha256',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='satelliteimage',
+            name='content_sha256',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='indexlayer',
+            constraint=models.UniqueConstraint(fields=('content_sha256',), name='index_content_sha256_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='satelliteimage',
+            constraint=models.UniqueConstraint(fields=('content_sha256',), name='satellite_images_sha256_uniq'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 6.0.2 on 2026-10-18 19:10
+
+from django.db import migrations
+
+
+# Frozen copy of fire.utils.generalize.rebuild_generalized (layers and
+# ZOOM_BANDS as of this migration). Replaces the per-feature
+# ST_SimplifyPreserveTopology bands, which left slivers and overlaps
+# between neighbours, with coverage simplification.
+LAYERS = {
+    "provinces": "iran_provinces",
+    "counties": "iran_counties",
+    "forests": "iran_forests",
+}
+BANDS = [(0, 2000.0), (1, 300.0), (2, 40.0), (3, 0.0)]
+
+INSERT_SQL = """
+INSERT INTO fire_generalized_boundaries (layer, source_id, name, band, geometry)
+SELECT %s, %s, %s, %s, g
+FROM (
+  SELECT ST_Multi(ST_CollectionExtract(ST_MakeValid(
+    ST_Transform(ST_GeomFromWKB(%s, 3857), 4326)
+  ), 3)) AS g
+) s
+WHERE NOT ST_IsEmpty(g);
+"""
+
+
+def rebuild_bands(apps, schema_editor):
+    import shapely
+    from django.db.models import F
+
+    LayerVersion = apps.get_model("fire", "LayerVersion")
+
+    with schema_editor.connection.cursor() as c:
+        for layer, table in LAYERS.items():
+            c.execute(f"""
+            SELECT id, name, ST_AsBinary(ST_Transform(geometry::geometry, 3857))
+            FROM {table}
+            WHERE geometry IS NOT NULL
+            ORDER BY id;
+            """)
+            rows = c.fetchall()
+            geoms = shapely.from_wkb([bytes(r[2]) for r in rows])
+            c.execute("DELETE FROM fire_generalized_boundaries WHERE layer = %s;", [layer])
+            for band, tol in BANDS:
+                simplified = shapely.coverage_simplify(geoms, tol) if tol and len(geoms) else geoms
+                c.executemany(INSERT_SQL, [
+                    (layer, r[0], r[1], band, shapely.to_wkb(g))
+                    for r, g in zip(rows, simplified)
+                ])
+            # cached tiles / snapshots of the old bands
+            LayerVersion.objects.get_or_create(layer=layer)
+            LayerVersion.objects.filter(layer=layer).update(version=F("version") + 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fire', '0017_uploadsession_direct'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_bands, migrations.RunPython.noop),
+    ]
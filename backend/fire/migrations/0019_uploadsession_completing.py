@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-18 19:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fire', '0018_rebuild_generalized_coverage'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='uploadsession',
+            name='status',
+            field=models.CharField(choices=[('open', 'open'), ('completing', 'completing'), ('completed', 'completed'), ('aborted', 'aborted')], default='open', max_length=20),
+        ),
+    ]
@@ -4,8 +4,12 @@ from django.contrib.gis.db import models as gis_models
 
 
 # fire/models.py
+import uuid
+
 from django.db import models
 from django.contrib.gis.db import models as gis_models
+from django.contrib.postgres.indexes import GistIndex
+from django.utils import timezone
 
 
 class IndexLayer(models.Model):
@@ -23,6 +27,8 @@ class IndexLayer(models.Model):
     # -------------------------
     minio_bucket = models.CharField(max_length=100, default="fire")
     minio_object = models.CharField(max_length=600, null=True, blank=True)  # object key/path in MinIO
+    original_object = models.CharField(max_length=600, null=True, blank=True)  # upload as received (COG is minio_object)
+    content_sha256 = models.CharField(max_length=64, null=True, blank=True)  # of the upload as received (dedup key)
 
     geoserver_workspace = models.CharField(max_length=100, default="fire")
     geoserver_store = models.CharField(max_length=200, null=True, blank=True)
@@ -44,6 +50,9 @@ class IndexLayer(models.Model):
 
     class Meta:
         db_table = "index"  # keep stable (do NOT rename now)
+        constraints = [
+            models.UniqueConstraint(fields=["content_sha256"], name="index_content_sha256_uniq"),
+        ]
         indexes = [
             models.Index(fields=["index_name", "date"]),
             models.Index(fields=["satellite_name", "date"]),
@@ -69,6 +78,8 @@ class SatelliteImage(models.Model):
     # -------------------------
     minio_bucket = models.CharField(max_length=100, default="fire")
     minio_object = models.CharField(max_length=600, null=True, blank=True)  # object key/path in MinIO
+    original_object = models.CharField(max_length=600, null=True, blank=True)  # upload as received (COG is minio_object)
+    content_sha256 = models.CharField(max_length=64, null=True, blank=True)  # of the upload as received (dedup key)
 
     geoserver_workspace = models.CharField(max_length=100, default="fire")
     geoserver_store = models.CharField(max_length=200, null=True, blank=True)
@@ -90,6 +101,9 @@ class SatelliteImage(models.Model):
 
     class Meta:
         db_table = "satellite_images"
+        constraints = [
+            models.UniqueConstraint(fields=["content_sha256"], name="satellite_images_sha256_uniq"),
+        ]
         indexes = [
             models.Index(fields=["satellite_name", "date_time"]),
             models.Index(fields=["status"]),
@@ -167,3 +181,212 @@ class FireRiskArea(gis_models.Model):
 
     def __str__(self):
         return self.name
+
+
+class LayerVersion(models.Model):
+    """
+    Data version per layer (table). Bumped by whatever writes the table;
+    derived artifacts (tiles, snapshots, ...) are keyed by it.
+    """
+    layer = models.CharField(max_length=50, unique=True)  # counties, forests, fire-risk, ...
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "fire_layer_versions"
+
+    def __str__(self):
+        return f"{self.layer} v{self.version}"
+
+
+class GeneralizedBoundary(gis_models.Model):
+    """
+    Pre-simplified copies of boundary layers, one row per (layer, feature, zoom band).
+    Planar 4326 geometry; each band has its own partial GiST index.
+    Rebuilt by load_geojson / build_generalized (see fire.utils.generalize).
+    """
+    layer = models.CharField(max_length=50)  # provinces | counties | forests
+    source_id = models.BigIntegerField()
+    name = models.CharField(max_length=100)
+    band = models.PositiveSmallIntegerField()  # 0 = coarsest
+    geometry = gis_models.MultiPolygonField(srid=4326, spatial_index=False)
+
+    class Meta:
+        db_table = "fire_generalized_boundaries"
+        indexes = [
+            models.Index(fields=["layer", "band"], name="fire_genb_layer_band_idx"),
+        ] + [
+            GistIndex(fields=["geometry"], condition=models.Q(band=b), name=f"fire_genb_geom_band{b}")
+            for b in range(4)
+        ]
+
+    def __str__(self):
+        return f"{self.layer} | {self.name} | band {self.band}"
+
+
+class FireRiskCluster(gis_models.Model):
+    """
+    Grid clusters of fire_risk_areas, one set per zoom (see fire.utils.clusters).
+    Rebuilt together with the fire-risk layer by load_geojson.
+    """
+    zoom = models.PositiveSmallIntegerField()
+    count = models.PositiveIntegerField()
+    max_level = models.IntegerField()
+    levels = models.JSONField(default=dict)  # {"<level>": count}
+    geometry = gis_models.PointField(srid=4326)  # mean position, planar
+
+    class Meta:
+        db_table = "fire_risk_clusters"
+        indexes = [
+            models.Index(fields=["zoom"], name="fire_riskcl_zoom_idx"),
+        ]
+
+    def __str__(self):
+        return f"z{self.zoom} | {self.count} points"
+
+
+class ZonalStatistic(models.Model):
+    """
+    Cached band-1 statistics of an index raster over one zone
+    (AOI / province / county / forest) at a given zone data version.
+    See fire.utils.zonal.
+    """
+    index_layer = models.ForeignKey(IndexLayer, on_delete=models.CASCADE, related_name="zonal_stats")
+    zone_type = models.CharField(max_length=20)  # aoi | provinces | counties | forests
+    zone_id = models.BigIntegerField()
+    zone_version = models.PositiveIntegerField(default=0)
+
+    # denormalized from the index layer, for per-zone time series
+    index_name = models.CharField(max_length=50)
+    date = models.DateField()
+
+    count = models.BigIntegerField(default=0)
+    mean = models.FloatField(null=True, blank=True)
+    min = models.FloatField(null=True, blank=True)
+    max = models.FloatField(null=True, blank=True)
+    std = models.FloatField(null=True, blank=True)
+    percentiles = models.JSONField(default=dict)  # {"50": value, ...}
+
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "fire_zonal_stats"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["index_layer", "zone_type", "zone_id", "zone_version"],
+                name="fire_zonal_stats_uniq",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["zone_type", "zone_id", "index_name", "date"], name="fire_zonal_zone_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.index_name} {self.date} | {self.zone_type}:{self.zone_id}"
+
+
+class FireRiskSample(models.Model):
+    """
+    Value of an index layer (NDVI, LST, ...) at a fire-risk point.
+    Filled by sample_index_layer / the sample endpoint (fire.utils.sampling).
+    """
+    fire_risk_area = models.ForeignKey(FireRiskArea, on_delete=models.CASCADE, related_name="samples")
+    index_layer = models.ForeignKey(IndexLayer, on_delete=models.CASCADE, related_name="fire_risk_samples")
+    value = models.FloatField(null=True, blank=True)  # null = outside raster / nodata
+    sampled_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "fire_risk_samples"
+        constraints = [
+            models.UniqueConstraint(fields=["fire_risk_area", "index_layer"], name="fire_risk_samples_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.fire_risk_area_id} @ {self.index_layer_id} = {self.value}"
+
+
+class Job(models.Model):
+    """
+    Background job (ingest -> publish pipeline, post-publish products).
+    Claimed by run_jobs workers with FOR UPDATE SKIP LOCKED; see fire.utils.jobs.
+    """
+    STATUS_CHOICES = [
+        ("queued", "queued"),
+        ("running", "running"),
+        ("succeeded", "succeeded"),
+        ("failed", "failed"),
+    ]
+
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="queued")
+
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)  # next attempt not before
+
+    locked_by = models.CharField(max_length=200, null=True, blank=True)  # host:pid of the worker
+    locked_at = models.DateTimeField(null=True, blank=True)
+
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "fire_jobs"
+        indexes = [
+            models.Index(fields=["status", "run_after"], name="fire_jobs_ready_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.id} | {self.status}"
+
+
+class UploadSession(models.Model):
+    """
+    Resumable upload: the client PUTs fixed-size chunks (any order, any
+    number of retries) that map 1:1 onto parts of a MinIO multipart upload
+    in the staging bucket, then finalizes into a SatelliteImage/IndexLayer.
+    A direct session hands out presigned URLs instead: the chunks go from
+    the browser straight into the staging bucket (parts stays empty).
+    """
+    STATUS_CHOICES = [
+        ("open", "open"),
+        ("completing", "completing"),  # assembling in MinIO, outside the row lock
+        ("completed", "completed"),
+        ("aborted", "aborted"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=20)  # satellite | index
+    file_name = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    metadata = models.JSONField(default=dict)  # upload form fields, validated again on finalize
+
+    staging_bucket = models.CharField(max_length=100)
+    staging_object = models.CharField(max_length=600)
+    upload_id = models.CharField(max_length=300, blank=True)  # MinIO multipart upload id ("" = single PUT)
+    parts = models.JSONField(default=dict)  # {"<part number>": "<etag>"}
+    direct = models.BooleanField(default=False)  # browser -> MinIO via presigned URLs
+    sha256 = models.CharField(max_length=64, null=True, blank=True)  # declared by the client, checked on ingest
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="open")
+    object_id = models.BigIntegerField(null=True, blank=True)  # created SatelliteImage/IndexLayer
+    job_id = models.BigIntegerField(null=True, blank=True)  # its ingest job
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        db_table = "fire_upload_sessions"
+        indexes = [
+            models.Index(fields=["status", "expires_at"], name="fire_upsess_status_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.file_name} | {self.status}"
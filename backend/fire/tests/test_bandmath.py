@@ -0,0 +1,72 @@
+import datetime
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+
+from fire.models import IndexLayer
+from fire.utils import bandmath
+from fire.utils.bandmath import Expression, create_derived_index_layer
+
+
+class ExpressionTests(SimpleTestCase):
+    def test_collects_input_names(self):
+        expr = Expression("where(pre > 0.1, (pre - post) / pre, 0)")
+        self.assertEqual(expr.names, {"pre", "post"})
+
+    def test_evaluates_arrays(self):
+        out = Expression("abs(a - b) * 2").evaluate({"a": np.array([1.0, 4.0]), "b": np.array([3.0, 1.0])})
+        np.testing.assert_array_equal(out, [4.0, 6.0])
+
+    def test_chained_comparison(self):
+        out = Expression("0 < a < 2").evaluate({"a": np.array([-1.0, 1.0, 3.0])})
+        np.testing.assert_array_equal(out, [False, True, False])
+
+    def test_rejects_syntax_outside_whitelist(self):
+        for text in (
+            "a.real",
+            "__import__('os')",
+            "a[0]",
+            "lambda: a",
+            "sum(a)",
+            "where(a, b, x=1)",
+            "sqrt",
+            "a if b else c",
+            "'text' + a",
+            "True + a",
+            "a @ b",
+        ):
+            with self.subTest(text=text), self.assertRaises(ValueError):
+                Expression(text)
+
+    def test_rejects_empty_long_and_invalid(self):
+        for text in ("", "   ", "a +", "a + " * 300 + "a"):
+            with self.subTest(text=text[:20]), self.assertRaises(ValueError):
+                Expression(text)
+
+    def test_rejects_expression_without_input(self):
+        with self.assertRaisesMessage(ValueError, "expression references no input"):
+            Expression("1 + 2")
+
+    def test_rejects_wrong_arity(self):
+        for text in ("where(a)", "where(a, b)", "where(a, b, 0, 1)", "abs(a, b)", "minimum(a)", "clip(a, 0)"):
+            with self.subTest(text=text), self.assertRaises(ValueError):
+                Expression(text)
+        with self.assertRaisesMessage(ValueError, "where() takes 3 arguments"):
+            Expression("where(a > 0)")
+
+
+class DerivedLayerRetryTests(TestCase):
+    def test_retry_returns_row_of_earlier_attempt(self):
+        source = IndexLayer.objects.create(title="NDVI", minio_link="", index_name="ndvi",
+                                           date=datetime.date(2026, 1, 1), satellite_name="SENTINEL2")
+        done = IndexLayer.objects.create(title="dNDVI", minio_link="http://minio/x", index_name="dndvi",
+                                         date=datetime.date(2026, 1, 1), satellite_name="SENTINEL2",
+                                         minio_bucket="idx-dndvi", minio_object="index/derived-k1.tif",
+                                         status="published", is_published=True)
+
+        with mock.patch.object(bandmath, "evaluate_to_geotiff", side_effect=AssertionError("evaluated again")):
+            obj = create_derived_index_layer("a * 2", {"a": (source, 1)}, None, title="dNDVI", index_name="dndvi",
+                                             date=datetime.date(2026, 1, 1), satellite_name="SENTINEL2", key="k1")
+        self.assertEqual(obj.id, done.id)
+        self.assertEqual(IndexLayer.objects.count(), 2)
@@ -0,0 +1,65 @@
+import tempfile
+from datetime import date
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+from shapely.geometry import box, mapping
+
+from fire.tests.test_zonal import _write_raster
+from fire.utils import datacube
+from fire.utils.datacube import DataCube
+
+
+class DataCubeTests(SimpleTestCase):
+    """Two 300 x 300 layers (two spatial chunks across): value = column index, and 2 west of column 256."""
+
+    def setUp(self):
+        self.settings = override_settings(DATACUBE_ROOT=tempfile.mkdtemp())
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+        patcher = mock.patch.object(datacube, "bump_layer_version")
+        self.bump = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        tmp = tempfile.mkdtemp()
+        columns = np.tile(np.arange(300, dtype="float32"), (300, 1))
+        west = np.full((300, 300), 2, dtype="float32")
+        west[:, 256:] = -1
+        self.paths = {"columns": f"{tmp}/columns.tif", "west": f"{tmp}/west.tif"}
+        _write_raster(self.paths["columns"], columns)
+        _write_raster(self.paths["west"], west, nodata=-1)
+
+        self.cube = DataCube("NDVI")
+        # appended out of date order: series come back sorted by date
+        self.assertEqual(self.cube.append(SimpleNamespace(id=7, date=date(2026, 2, 1)), self.paths["columns"]), 0)
+        self.assertEqual(self.cube.append(SimpleNamespace(id=8, date=date(2026, 1, 1)), self.paths["west"]), 1)
+
+    def test_append_is_idempotent(self):
+        self.assertEqual(self.cube.append(SimpleNamespace(id=7, date=date(2026, 2, 1)), self.paths["columns"]), 0)
+        self.assertEqual(len(self.cube.times), 2)
+        self.assertEqual(self.bump.call_count, 2)
+        self.bump.assert_called_with("datacube")
+
+    def test_chunks_hold_both_time_steps(self):
+        chunks = sorted(p.relative_to(self.cube.dir).as_posix() for p in self.cube.dir.rglob("*.npy"))
+        self.assertEqual(chunks, ["t0/y0_x0.npy", "t0/y0_x1.npy", "t0/y1_x0.npy", "t0/y1_x1.npy"])
+
+    def test_point_series(self):
+        series = self.cube.point_series(50.005 + 0.01 * 260, 35.995)
+        self.assertEqual(series, [("2026-01-01", None), ("2026-02-01", 260.0)])
+        self.assertEqual(self.cube.point_series(50.005, 35.995, date_from="2026-01-15"), [("2026-02-01", 0.0)])
+        self.assertIsNone(self.cube.point_series(49.0, 35.0))
+
+    def test_area_series_across_chunks(self):
+        # columns 250-269, rows 0-99
+        (d1, west), (d2, cols) = self.cube.area_series(mapping(box(52.5, 35.0, 52.7, 36.0)))
+        self.assertEqual((d1, d2), ("2026-01-01", "2026-02-01"))
+        self.assertEqual(west, {"mean": 2.0, "min": 2.0, "max": 2.0, "count": 600})
+        self.assertEqual(cols, {"mean": 259.5, "min": 250.0, "max": 269.0, "count": 2000})
+        self.assertEqual(self.cube.area_series(mapping(box(60, 20, 61, 21))), [])
+
+    def test_empty_cube(self):
+        self.assertIsNone(DataCube("NBR").point_series(50.5, 35.5))
+        self.assertIsNone(DataCube("NBR").area_series(mapping(box(50, 35, 51, 36))))
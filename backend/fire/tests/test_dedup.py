@@ -0,0 +1,48 @@
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from fire.models import Job, SatelliteImage
+from fire.utils import jobs
+from fire.utils.ingest import find_duplicate
+from fire.views import _create_pending
+
+SHA = "ab" * 32
+
+
+def _fields():
+    return {"satellite_name": "SENTINEL2", "date_time": timezone.now(), "image_name": "scene.tif"}
+
+
+class DedupTests(TestCase):
+    def test_duplicate_header_short_circuits_upload(self):
+        existing = SatelliteImage.objects.create(minio_link="http://minio/satellite/x.tif", status="published",
+                                                 content_sha256=SHA, minio_object="satellite/x.tif", **_fields())
+        resp = self.client.post(reverse("upload-satellite"), HTTP_X_CONTENT_SHA256=SHA.upper())
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.json()["duplicate"])
+        self.assertEqual(resp.json()["duplicate_of"], existing.id)
+        self.assertEqual(SatelliteImage.objects.count(), 1)
+        self.assertFalse(Job.objects.exists())
+
+    def test_final_ingest_failure_releases_hash(self):
+        obj, existing = _create_pending("satellite", _fields(), SHA)
+        self.assertIsNone(existing)
+        job = jobs.enqueue("ingest_raster", {"kind": "satellite", "id": obj.id}, max_attempts=1)
+
+        with mock.patch("fire.utils.jobs.staged_from_payload"), \
+                mock.patch("fire.utils.ingest.ingest_staged", side_effect=ConnectionError("minio down")):
+            self.assertTrue(jobs.run_next(job_id=job.id))
+
+        job.refresh_from_db()
+        obj.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+        self.assertEqual((obj.status, obj.error_message), ("failed", "minio down"))
+        self.assertIsNone(obj.content_sha256)
+        # the same bytes uploaded again are ingested, not answered with the dead row
+        self.assertIsNone(find_duplicate("satellite", SHA))
+        again, existing = _create_pending("satellite", _fields(), SHA)
+        self.assertIsNone(existing)
+        self.assertEqual(again.content_sha256, SHA)
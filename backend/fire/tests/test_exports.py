@@ -0,0 +1,92 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from shapely import wkb
+from shapely.geometry import MultiPolygon, box
+
+from fire.utils import exports
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = iter(rows)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.sql = sql
+
+    def fetchmany(self, n):
+        out = []
+        for r in self.rows:
+            out.append(r)
+            if len(out) >= n:
+                break
+        return out
+
+
+def _rows(n):
+    return [(i, f"County {i}", wkb.dumps(MultiPolygon([box(i, 0, i + 1, 1)]))) for i in range(n)]
+
+
+class ExportTests(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.settings = override_settings(EXPORT_ROOT=self.root, EXPORT_MAX_AOI_FILES=2)
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+
+    def _open(self, fmt, version, rows=(), aoi_id=None, aoi_version=None):
+        conn = mock.Mock()
+        conn.chunked_cursor.side_effect = lambda: FakeCursor(rows)
+        with mock.patch.object(exports, "connection", conn), mock.patch.object(exports, "EXPORT_CHUNK", 3):
+            fh, path = exports.open_export("counties", fmt, version, aoi_id, aoi_version)
+        self.addCleanup(fh.close)
+        return fh, path
+
+    def test_fgb_is_written_from_cursor_chunks(self):
+        import pyogrio
+
+        _, path = self._open("fgb", 1, _rows(7))
+        info = pyogrio.read_info(path)
+        self.assertEqual(info["features"], 7)
+        self.assertEqual(info["geometry_type"], "MultiPolygon")
+        self.assertEqual(list(info["fields"]), ["id", "name"])
+
+    def test_parquet_row_groups_follow_chunks(self):
+        import pyarrow.parquet as pq
+
+        _, path = self._open("parquet", 1, _rows(7))
+        meta = pq.ParquetFile(path).metadata
+        self.assertEqual((meta.num_rows, meta.num_row_groups), (7, 3))
+
+    def test_cached_export_is_reused(self):
+        _, first = self._open("parquet", 1, _rows(2))
+        fh, again = self._open("parquet", 1, [])  # no query: served from disk
+        self.assertEqual(first, again)
+        self.assertTrue(fh.read())
+
+    def test_open_file_survives_prune(self):
+        fh, old = self._open("parquet", 1, _rows(2))
+        self._open("parquet", 2, _rows(2))
+        self.assertFalse(old.exists())
+        self.assertTrue(fh.read(4))  # the response still streams the pruned file
+
+    def test_aoi_exports_are_pruned(self):
+        self._open("parquet", 1, _rows(1), aoi_id=1, aoi_version=1)
+        self._open("parquet", 1, _rows(1), aoi_id=2, aoi_version=2)  # AOI v1 is stale
+        self.assertEqual(sorted(os.listdir(os.path.join(self.root, "counties"))), ["v1.aoi2-v2.parquet"])
+        for aoi_id in (3, 4):
+            self._open("parquet", 1, _rows(1), aoi_id=aoi_id, aoi_version=2)
+        self.assertEqual(len(os.listdir(os.path.join(self.root, "counties"))), 2)
+
+    def test_stale_version_does_not_prune_newer(self):
+        self._open("parquet", 2, _rows(1))
+        self._open("parquet", 1, _rows(1))
+        self.assertIn("v2.parquet", os.listdir(os.path.join(self.root, "counties")))
@@ -0,0 +1,49 @@
+import random
+
+import shapely
+from django.test import SimpleTestCase
+from shapely.geometry import MultiPolygon, Polygon
+
+from fire.utils.generalize import ZOOM_BANDS, rebuild_generalized
+
+
+def _neighbours():
+    """Two ~100 km counties (3857 metres) sharing one jagged border."""
+    rnd = random.Random(1)
+    border = [(rnd.uniform(-3000, 3000), y) for y in range(0, 100_001, 1000)]
+    west = Polygon([(-100_000, 0)] + border + [(-100_000, 100_000)])
+    east = Polygon([(100_000, 0)] + border + [(100_000, 100_000)])
+    return [MultiPolygon([west]), MultiPolygon([east])]
+
+
+class FakeCursor:
+    def __init__(self, geoms):
+        self.source = [(i + 1, f"County {i + 1}", shapely.to_wkb(g)) for i, g in enumerate(geoms)]
+        self.inserted = []
+        self.rowcount = 0
+
+    def execute(self, sql, params=None):
+        self.rowcount = 0
+
+    def fetchall(self):
+        return self.source
+
+    def executemany(self, sql, rows):
+        rows = list(rows)
+        self.inserted += rows
+        self.rowcount = len(rows)
+
+
+class GeneralizeTests(SimpleTestCase):
+    def test_neighbours_keep_a_shared_border_in_every_band(self):
+        cursor = FakeCursor(_neighbours())
+        total = rebuild_generalized("counties", cursor=cursor)
+        self.assertEqual(total, 2 * len(ZOOM_BANDS))
+
+        for band, _, _ in ZOOM_BANDS:
+            west, east = (shapely.from_wkb(r[4]) for r in cursor.inserted if r[3] == band)
+            self.assertAlmostEqual(west.intersection(east).area, 0, delta=1e-6)  # no overlap
+            gap = west.union(east).envelope.area - west.union(east).area
+            self.assertAlmostEqual(gap, 0, delta=1e-3)  # no sliver
+            if band == 0:
+                self.assertLess(shapely.get_num_coordinates(west), 50)  # and it was simplified
@@ -0,0 +1,101 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from fire.models import Job, SatelliteImage
+from fire.utils import jobs
+
+
+def _pending_image(**fields):
+    fields.setdefault("status", "pending")
+    return SatelliteImage.objects.create(
+        satellite_name="SENTINEL2", date_time=timezone.now(), image_name="scene.tif", minio_link="", **fields,
+    )
+
+
+class JobQueueTests(TestCase):
+    def _run(self, job):
+        self.assertTrue(jobs.run_next(job_id=job.id))
+        job.refresh_from_db()
+        return job
+
+    def test_success_records_result(self):
+        with mock.patch.dict(jobs.JOB_HANDLERS, {"publish_raster": lambda payload: {"ok": payload["id"]}}):
+            job = self._run(jobs.enqueue("publish_raster", {"kind": "satellite", "id": 7}))
+        self.assertEqual(job.status, "succeeded")
+        self.assertEqual(job.result, {"ok": 7})
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNone(job.locked_by)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_transient_error_is_retried_with_backoff(self):
+        def boom(payload):
+            raise RuntimeError("minio down")
+
+        with mock.patch.dict(jobs.JOB_HANDLERS, {"publish_raster": boom}):
+            job = self._run(jobs.enqueue("publish_raster", {"kind": "satellite", "id": 7}))
+        self.assertEqual(job.status, "queued")
+        self.assertEqual(job.attempts, 1)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertTrue(job.error.startswith("minio down"))
+        self.assertIsNone(job.locked_at)
+        # not ready again until the backoff has passed
+        self.assertFalse(jobs.run_next(job_id=job.id))
+
+    def test_last_attempt_fails_job_and_row(self):
+        obj = _pending_image(content_sha256="a" * 64)
+
+        def boom(payload):
+            raise RuntimeError("geoserver down")
+
+        job = jobs.enqueue("ingest_raster", {"kind": "satellite", "id": obj.id}, max_attempts=2)
+        with mock.patch.dict(jobs.JOB_HANDLERS, {"ingest_raster": boom}):
+            job = self._run(job)
+            self.assertEqual(job.status, "queued")
+            obj.refresh_from_db()
+            self.assertEqual(obj.status, "pending")  # still retrying
+
+            Job.objects.filter(id=job.id).update(run_after=timezone.now() - timedelta(seconds=1))
+            job = self._run(job)
+
+        self.assertEqual(job.status, "failed")
+        self.assertEqual(job.attempts, 2)
+        obj.refresh_from_db()
+        self.assertEqual(obj.status, "failed")
+        self.assertEqual(obj.error_message, "geoserver down")
+
+    def test_permanent_error_fails_at_once(self):
+        obj = _pending_image()
+
+        def bad_input(payload):
+            raise jobs.PermanentJobError("not a raster")
+
+        with mock.patch.dict(jobs.JOB_HANDLERS, {"ingest_raster": bad_input}):
+            job = self._run(jobs.enqueue("ingest_raster", {"kind": "satellite", "id": obj.id}))
+        self.assertEqual((job.status, job.attempts), ("failed", 1))
+        obj.refresh_from_db()
+        self.assertEqual((obj.status, obj.error_message), ("failed", "not a raster"))
+
+    def test_failure_hook_leaves_stored_rows_alone(self):
+        obj = _pending_image(status="publish_failed", minio_object="satellite/x.tif")
+        jobs.mark_rows_failed("satellite", [obj.id], "boom")
+        obj.refresh_from_db()
+        self.assertEqual(obj.status, "publish_failed")
+
+    def test_expired_lock_is_reclaimed(self):
+        job = jobs.enqueue("publish_raster", {"kind": "satellite", "id": 7})
+        Job.objects.filter(id=job.id).update(
+            status="running", attempts=1, locked_by="dead:1",
+            locked_at=timezone.now() - timedelta(seconds=7200),
+        )
+        claimed = jobs.claim_job(job_id=job.id)
+        self.assertIsNotNone(claimed)
+        self.assertEqual(claimed.attempts, 2)
+        self.assertEqual(claimed.locked_by, jobs.worker_name())
+
+    def test_fresh_lock_is_not_reclaimed(self):
+        job = jobs.enqueue("publish_raster", {"kind": "satellite", "id": 7})
+        Job.objects.filter(id=job.id).update(status="running", locked_by="alive:1", locked_at=timezone.now())
+        self.assertIsNone(jobs.claim_job(job_id=job.id))
@@ -0,0 +1,23 @@
+import datetime
+
+from django.db.models import Q
+from django.test import SimpleTestCase
+
+from config.keyset import KeysetPaginator
+
+
+class KeysetAfterTests(SimpleTestCase):
+    def test_descending_ordering(self):
+        t = datetime.datetime(2026, 1, 2, 3, 4, 5, 678)
+        q = KeysetPaginator("-date_time", "-id")._after([t, 7])
+        self.assertEqual(q, Q(date_time__lt=t) | Q(date_time=t, id__lt=7))
+
+    def test_mixed_directions(self):
+        q = KeysetPaginator("name", "-date", "id")._after(["b", "2026-01-01", 3])
+        self.assertEqual(
+            q,
+            Q(name__gt="b") | Q(name="b", date__lt="2026-01-01") | Q(name="b", date="2026-01-01", id__gt=3),
+        )
+
+    def test_single_field(self):
+        self.assertEqual(KeysetPaginator("-id")._after([10]), Q(id__lt=10))
@@ -0,0 +1,108 @@
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from fire import views
+from fire.models import Job, SatelliteImage, UploadSession
+from fire.utils.resumable import chunk_part_number
+from fire.utils.upload_handlers import StagedUpload
+
+SHA = "cd" * 32
+
+
+class ChunkPartNumberTests(SimpleTestCase):
+    session = SimpleNamespace(size=25, chunk_size=10)
+
+    def test_offset(self):
+        self.assertEqual(chunk_part_number(self.session, offset="0", length=10), 1)
+        self.assertEqual(chunk_part_number(self.session, offset="10", length=10), 2)
+        self.assertEqual(chunk_part_number(self.session, offset="20", length=5), 3)
+
+    def test_content_range(self):
+        self.assertEqual(chunk_part_number(self.session, content_range="bytes 10-19/25", length=10), 2)
+        self.assertEqual(chunk_part_number(self.session, content_range="bytes 20-24/*", length=5), 3)
+
+    def test_rejects_bad_positions(self):
+        for kwargs in (
+            {},
+            {"offset": "-10", "length": 10},
+            {"offset": "ten", "length": 10},
+            {"offset": "5", "length": 10},
+            {"offset": "30", "length": 0},
+            {"offset": "20", "length": 10},
+            {"content_range": "bytes 0-9", "length": 10},
+            {"content_range": "bytes 0-9/26", "length": 10},
+            {"content_range": "bytes 0-9/25", "length": 9},
+        ):
+            with self.subTest(**kwargs), self.assertRaises(ValueError):
+                chunk_part_number(self.session, **kwargs)
+
+    def test_messages(self):
+        with self.assertRaisesMessage(ValueError, "offset must be an integer."):
+            chunk_part_number(self.session, offset="1.5", length=10)
+        with self.assertRaisesMessage(ValueError, "offset must not be negative."):
+            chunk_part_number(self.session, offset="-10", length=10)
+
+
+class CompleteUploadSessionTests(TestCase):
+    def setUp(self):
+        self.session = UploadSession.objects.create(
+            kind="satellite", file_name="scene.tif", size=20, chunk_size=10,
+            metadata={"satellite_name": "SENTINEL2", "date_time": "2026-01-01T10:00:00Z"},
+            staging_bucket="staging", staging_object="s/scene.tif", upload_id="u1",
+            parts={"1": "e1", "2": "e2"}, sha256=SHA, expires_at=timezone.now() + timedelta(hours=1),
+        )
+        self.url = reverse("upload-session-complete", args=[self.session.id])
+        self.staged = StagedUpload("staging", "s/scene.tif", "scene.tif", "image/tiff", 20, None)
+        self.staged.discard = mock.Mock()
+        patcher = mock.patch.object(views, "complete_upload_session", return_value=self.staged)
+        self.complete = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_creates_row_with_declared_hash_and_job(self):
+        resp = self.client.post(self.url)
+        self.assertEqual(resp.status_code, 202)
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.status, "completed")
+        obj = SatelliteImage.objects.get(id=self.session.object_id)
+        self.assertEqual((obj.status, obj.content_sha256), ("pending", SHA))
+        self.assertTrue(Job.objects.filter(id=self.session.job_id, kind="ingest_raster").exists())
+
+        # repeating it returns the same result without assembling again
+        again = self.client.post(self.url)
+        self.assertEqual(again.json()["object_id"], obj.id)
+        self.assertEqual(self.complete.call_count, 1)
+
+    def test_duplicate_hash_reuses_existing_row(self):
+        existing = SatelliteImage.objects.create(
+            satellite_name="SENTINEL2", date_time=timezone.now(), image_name="old.tif",
+            minio_link="http://minio/sat/old.tif", status="published", content_sha256=SHA,
+        )
+        resp = self.client.post(self.url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["duplicate_of"], existing.id)
+        self.staged.discard.assert_called_once()
+        self.assertEqual(SatelliteImage.objects.count(), 1)
+        self.assertFalse(Job.objects.exists())
+
+    def test_session_being_completed_is_409(self):
+        UploadSession.objects.filter(id=self.session.id).update(status="completing")
+        resp = self.client.post(self.url)
+        self.assertEqual(resp.status_code, 409)
+        self.complete.assert_not_called()
+
+    def test_abandoned_completion_is_taken_over(self):
+        UploadSession.objects.filter(id=self.session.id).update(
+            status="completing", updated_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(self.client.post(self.url).status_code, 202)
+
+    def test_minio_failure_reopens_session(self):
+        self.complete.side_effect = ConnectionError("minio down")
+        resp = self.client.post(self.url)
+        self.assertEqual(resp.status_code, 502)
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.status, "open")
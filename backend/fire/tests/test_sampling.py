@@ -0,0 +1,35 @@
+import numpy as np
+from django.test import SimpleTestCase
+
+from fire.tests.test_zonal import _write_raster
+from fire.utils.sampling import sample_points
+
+
+class SamplePointsTests(SimpleTestCase):
+    """Raster value = 1000 * row + column, 0.01 degree pixels from (50, 36), 64 x 64 blocks."""
+
+    def setUp(self):
+        from rasterio.io import MemoryFile
+
+        rows, cols = np.mgrid[0:200, 0:200]
+        data = (rows * 1000 + cols).astype("float32")
+        data[5, 5] = -1  # nodata
+        self.memfile = MemoryFile()
+        self.addCleanup(self.memfile.close)
+        _write_raster(self.memfile.name, data, nodata=-1)
+
+    def test_values_across_blocks_keep_input_order(self):
+        points = [(50.005, 35.995), (51.995, 34.005), (50.705, 35.305), (50.005, 35.995)]
+        out = sample_points(self.memfile.name, points)
+        np.testing.assert_array_equal(out, [0, 199199, 69070, 0])
+
+    def test_outside_and_nodata_are_nan(self):
+        out = sample_points(self.memfile.name, [(49.0, 35.0), (50.055, 35.945), (50.015, 35.995)])
+        self.assertTrue(np.isnan(out[0]))
+        self.assertTrue(np.isnan(out[1]))
+        self.assertEqual(out[2], 1)
+
+    def test_empty_input_and_bad_band(self):
+        self.assertEqual(sample_points(self.memfile.name, []).size, 0)
+        with self.assertRaisesMessage(ValueError, "band must be between 1 and 1."):
+            sample_points(self.memfile.name, [(50.5, 35.5)], band=2)
@@ -0,0 +1,75 @@
+import gzip
+import json
+import os
+import tempfile
+from unittest import mock, skipUnless
+
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from fire.utils import snapshots
+
+FEATURES = [b'{"type":"FeatureCollection","features":[', b'{"type":"Feature","id":1}', b"]}"]
+
+
+class NegotiateEncodingTests(SimpleTestCase):
+    def _negotiate(self, header):
+        return snapshots.negotiate_encoding(RequestFactory().get("/", HTTP_ACCEPT_ENCODING=header))
+
+    def test_preference_and_refusal(self):
+        self.assertEqual(self._negotiate("gzip, deflate"), "gzip")
+        self.assertEqual(self._negotiate("gzip;q=0.5, br"), "br" if snapshots.brotli else "gzip")
+        self.assertEqual(self._negotiate("br;q=0, gzip"), "gzip")
+        self.assertEqual(self._negotiate("*;q=0"), None)
+        self.assertEqual(self._negotiate("deflate"), None)
+        self.assertEqual(self._negotiate(""), None)
+
+    def test_br_skipped_without_brotli(self):
+        with mock.patch.object(snapshots, "brotli", None):
+            self.assertEqual(self._negotiate("br, gzip"), "gzip")
+            self.assertEqual(self._negotiate("br"), None)
+
+
+class WriteSnapshotsTests(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.settings = override_settings(SNAPSHOT_ROOT=self.root)
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+        for name, value in (("layer_rows_sql", mock.Mock(return_value=("SELECT 1", []))),
+                            ("iter_feature_collection_from_sql", mock.Mock(side_effect=lambda *a: iter(FEATURES)))):
+            patcher = mock.patch.object(snapshots, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_gzip_snapshot_round_trips(self):
+        sizes = snapshots.write_snapshots("counties", 3)
+        fh, enc = snapshots.open_snapshot("counties", 3, "gzip")
+        with fh:
+            body = gzip.decompress(fh.read())
+        self.assertEqual(enc, "gzip")
+        self.assertEqual(json.loads(body)["features"], [{"type": "Feature", "id": 1}])
+        self.assertEqual(sizes["gzip"], os.path.getsize(snapshots.snapshot_path("counties", 3, "gzip")))
+
+    @skipUnless(snapshots.brotli, "brotli not installed")
+    def test_br_snapshot_matches_gzip(self):
+        snapshots.write_snapshots("counties", 3)
+        with snapshots.open_snapshot("counties", 3, "br")[0] as br, \
+                snapshots.open_snapshot("counties", 3, "gzip")[0] as gz:
+            self.assertEqual(snapshots.brotli.decompress(br.read()), gzip.decompress(gz.read()))
+
+    def test_br_falls_back_to_gzip(self):
+        with mock.patch.object(snapshots, "brotli", None):
+            self.assertEqual(list(snapshots.write_snapshots("counties", 1)), ["gzip"])
+        fh, enc = snapshots.open_snapshot("counties", 1, "br")
+        fh.close()
+        self.assertEqual(enc, "gzip")
+
+    def test_missing_snapshot_and_identity(self):
+        self.assertEqual(snapshots.open_snapshot("counties", 9, "gzip"), (None, None))
+        self.assertEqual(snapshots.open_snapshot("counties", 9, None), (None, None))
+
+    def test_other_versions_are_removed(self):
+        with mock.patch.object(snapshots, "brotli", None):
+            snapshots.write_snapshots("counties", 1)
+            snapshots.write_snapshots("counties", 2)
+        self.assertEqual(os.listdir(os.path.join(self.root, "counties")), ["v2.geojson.gz"])
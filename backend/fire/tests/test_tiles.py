@@ -0,0 +1,83 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from fire.utils import tiles
+from fire.utils.versioning import bump_layer_version
+
+MVT = b"\x1a\x0cfake-tile"
+
+
+class TileCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.settings = override_settings(TILE_CACHE_ROOT=self.root, TILE_CACHE_MAX_ZOOM=10)
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+
+    def test_tile_is_rendered_once_per_version(self):
+        with mock.patch.object(tiles, "render_tile", return_value=MVT) as render:
+            self.assertEqual(tiles.get_tile("counties", 6, 40, 25, version=3), MVT)
+            self.assertEqual(tiles.get_tile("counties", 6, 40, 25, version=3), MVT)
+            self.assertEqual(render.call_count, 1)
+            tiles.get_tile("counties", 6, 40, 25, version=4)
+            self.assertEqual(render.call_count, 2)
+
+    def test_empty_and_deep_tiles_are_not_cached(self):
+        with mock.patch.object(tiles, "render_tile", return_value=b""):
+            self.assertEqual(tiles.get_tile("counties", 6, 0, 0, version=1), b"")
+        with mock.patch.object(tiles, "render_tile", return_value=MVT):
+            tiles.get_tile("counties", 11, 1300, 800, version=1)
+        self.assertEqual(list(tiles.tile_cache_root().rglob("*.mvt")), [])
+
+    def test_trim_drops_oldest_tiles(self):
+        with mock.patch.object(tiles, "render_tile", return_value=b"x" * 100):
+            for x in range(10):
+                tiles.get_tile("counties", 6, x, 0, version=1)
+                path = tiles.tile_cache_root() / "counties" / "v1" / "6" / str(x) / "0.mvt"
+                os.utime(path, (x, x))
+        self.assertEqual(tiles.trim_tile_cache(1000), 0)
+        self.assertEqual(tiles.trim_tile_cache(500), 6)  # down to 90% of the cap
+        left = sorted(int(p.parent.name) for p in tiles.tile_cache_root().rglob("*.mvt"))
+        self.assertEqual(left, [6, 7, 8, 9])
+
+
+class TileViewTests(TestCase):
+    def setUp(self):
+        self.settings = override_settings(TILE_CACHE_ROOT=tempfile.mkdtemp())
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+        self.url = reverse("fire-tiles", kwargs={"layer": "counties", "z": 6, "x": 40, "y": 25})
+
+    def test_etag_flow(self):
+        with mock.patch.object(tiles, "render_tile", return_value=MVT) as render:
+            resp = self.client.get(self.url)
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(resp.content, MVT)
+            etag = resp["ETag"]
+
+            # unchanged layer: 304 before the tile is even looked up
+            resp = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(resp.status_code, 304)
+            self.assertEqual(render.call_count, 1)
+
+            bump_layer_version("counties")
+            resp = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(resp.status_code, 200)
+            self.assertNotEqual(resp["ETag"], etag)
+            self.assertEqual(render.call_count, 2)
+
+    def test_empty_tile_is_204(self):
+        with mock.patch.object(tiles, "render_tile", return_value=b""):
+            resp = self.client.get(self.url)
+        self.assertEqual(resp.status_code, 204)
+        self.assertIn("ETag", resp)
+
+    def test_version_is_read_once(self):
+        with mock.patch.object(tiles, "render_tile", return_value=MVT), \
+                mock.patch.object(tiles, "get_layer_version") as get_version:
+            self.client.get(self.url)
+        get_version.assert_not_called()  # versioned_get already has it
@@ -0,0 +1,76 @@
+import shapely
+from django.test import SimpleTestCase
+from shapely.geometry import box
+
+from fire.tests.test_generalize import FakeCursor, _neighbours
+from fire.utils.generalize import rebuild_generalized
+from fire.utils.topojson import build_topology
+
+
+class TopologyTests(SimpleTestCase):
+    def _decode(self, topo, i):
+        # absolute grid points of arc i (negative index: reversed)
+        arc = topo["arcs"][~i if i < 0 else i]
+        points, x, y = [], 0, 0
+        for dx, dy in arc:
+            x, y = x + dx, y + dy
+            points.append((x, y))
+        return points[::-1] if i < 0 else points
+
+    def _ring(self, topo, arc_ids):
+        points = []
+        for i in arc_ids:
+            arc = self._decode(topo, i)
+            points.extend(arc if not points else arc[1:])
+        return points
+
+    def test_shared_border_is_stored_once(self):
+        topo = build_topology([
+            (1, {"name": "west"}, box(0, 0, 1, 1)),
+            (2, {"name": "east"}, box(1, 0, 2, 1)),
+        ], "zones", precision=0)
+
+        west, east = topo["objects"]["zones"]["geometries"]
+        self.assertEqual((west["id"], east["id"]), (1, 2))
+        self.assertEqual(west["properties"], {"name": "west"})
+        # two outer arcs + the shared border
+        self.assertEqual(len(topo["arcs"]), 3)
+
+        west_ids = set(west["arcs"][0][0])
+        east_ids = set(east["arcs"][0][0])
+        shared = {i if i >= 0 else ~i for i in west_ids} & {i if i >= 0 else ~i for i in east_ids}
+        self.assertEqual(len(shared), 1)
+        # traversed in opposite directions by the two neighbours
+        (s,) = shared
+        self.assertEqual({i for i in west_ids | east_ids if i in (s, ~s)}, {s, ~s})
+
+    def test_rings_decode_to_quantized_coordinates(self):
+        topo = build_topology([(1, {}, box(0, 0, 1, 1)), (2, {}, box(1, 0, 2, 1))], "zones", precision=0)
+        self.assertEqual(topo["transform"], {"scale": [1.0, 1.0], "translate": [0.0, 0.0]})
+        west, east = topo["objects"]["zones"]["geometries"]
+        for geom, corners in ((west, {(0, 0), (1, 0), (1, 1), (0, 1)}), (east, {(1, 0), (2, 0), (2, 1), (1, 1)})):
+            ring = self._ring(topo, geom["arcs"][0][0])
+            self.assertEqual(ring[0], ring[-1])
+            self.assertEqual(set(ring), corners)
+
+    def test_holes_and_empty_input(self):
+        outer = box(0, 0, 4, 4).difference(box(1, 1, 3, 3))
+        topo = build_topology([(1, {}, outer)], "zones", precision=0)
+        (geom,) = topo["objects"]["zones"]["geometries"]
+        self.assertEqual(len(geom["arcs"][0]), 2)  # exterior + hole
+
+        empty = build_topology([], "zones")
+        self.assertEqual(empty["arcs"], [])
+        self.assertEqual(empty["objects"]["zones"]["geometries"], [])
+
+    def test_neighbours_share_arcs_at_coarse_zoom(self):
+        cursor = FakeCursor(_neighbours())
+        rebuild_generalized("counties", cursor=cursor)
+        band0 = [(r[1], {}, shapely.from_wkb(r[4])) for r in cursor.inserted if r[3] == 0]
+
+        topo = build_topology(band0, "counties", precision=0)
+        west, east = topo["objects"]["counties"]["geometries"]
+        west_ids = {i if i >= 0 else ~i for i in west["arcs"][0][0]}
+        east_ids = {i if i >= 0 else ~i for i in east["arcs"][0][0]}
+        self.assertEqual(len(west_ids & east_ids), 1)  # the simplified border, stored once
+        self.assertEqual(len(topo["arcs"]), 3)
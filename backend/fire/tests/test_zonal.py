@@ -0,0 +1,77 @@
+import os
+import tempfile
+
+import numpy as np
+from django.test import SimpleTestCase
+from shapely.geometry import box, mapping
+
+from fire.utils.zonal import compute_zonal_stats
+from fire.utils.zonal_batch import batch_zonal_stats
+
+
+def _write_raster(path, data, nodata=None):
+    import rasterio
+    from rasterio.transform import from_origin
+
+    h, w = data.shape
+    with rasterio.open(path, "w", driver="GTiff", width=w, height=h, count=1, dtype=str(data.dtype),
+                       crs="EPSG:4326", transform=from_origin(50, 36, 0.01, 0.01), tiled=True,
+                       blockxsize=64, blockysize=64, nodata=nodata) as dst:
+        dst.write(data, 1)
+
+
+class BatchMatchesSingleZoneTests(SimpleTestCase):
+    def test_same_percentiles_on_both_paths(self):
+        rng = np.random.default_rng(0)
+        data = rng.normal(0.3, 0.2, (256, 256)).astype("float32")
+        fd, path = tempfile.mkstemp(suffix=".tif")
+        os.close(fd)
+        self.addCleanup(os.unlink, path)
+        _write_raster(path, data)
+
+        zones = [("west", mapping(box(50.1, 34.0, 50.9, 35.5))), ("east", mapping(box(51.2, 33.5, 52.4, 35.9)))]
+        batch = batch_zonal_stats(path, zones, workers=1)
+        for key, geom in zones:
+            single = compute_zonal_stats(path, geom)
+            with self.subTest(zone=key):
+                self.assertEqual(batch[key]["count"], single["count"])
+                self.assertEqual(batch[key]["percentiles"], single["percentiles"])
+                self.assertAlmostEqual(batch[key]["mean"], single["mean"], places=9)
+                self.assertEqual((batch[key]["min"], batch[key]["max"]), (single["min"], single["max"]))
+
+
+class ZonalStatsTests(SimpleTestCase):
+    """compute_zonal_stats on a small in-memory raster: value = column index, 0.01 degree pixels."""
+
+    def setUp(self):
+        from rasterio.io import MemoryFile
+
+        data = np.tile(np.arange(100, dtype="float32"), (100, 1))
+        data[:, 10:12] = -9999  # nodata columns inside the zone
+        self.memfile = MemoryFile()
+        self.addCleanup(self.memfile.close)
+        _write_raster(self.memfile.name, data, nodata=-9999)
+
+    def test_stats_over_zone(self):
+        # columns 10-19, rows 0-9 (pixel centres inside); columns 10-11 are nodata
+        stats = compute_zonal_stats(self.memfile.name, mapping(box(50.10, 35.90, 50.20, 36.0)))
+        self.assertEqual(stats["count"], 80)
+        self.assertEqual((stats["min"], stats["max"]), (12.0, 19.0))
+        self.assertAlmostEqual(stats["mean"], 15.5)
+        self.assertAlmostEqual(stats["std"], np.std(np.arange(12, 20)))
+        values = np.repeat(np.arange(12, 20), 10)
+        for p, v in stats["percentiles"].items():
+            self.assertAlmostEqual(v, np.percentile(values, int(p)), delta=1.0)
+        self.assertLessEqual(stats["percentiles"]["5"], stats["percentiles"]["95"])
+
+    def test_zone_outside_raster(self):
+        stats = compute_zonal_stats(self.memfile.name, mapping(box(60, 20, 61, 21)))
+        self.assertEqual(stats["count"], 0)
+        self.assertIsNone(stats["mean"])
+        self.assertEqual(set(stats["percentiles"].values()), {None})
+
+    def test_constant_zone(self):
+        stats = compute_zonal_stats(self.memfile.name, mapping(box(50.50, 35.50, 50.51, 35.60)))
+        self.assertEqual((stats["count"], stats["min"], stats["max"], stats["std"]), (10, 50.0, 50.0, 0.0))
+        self.assertEqual(set(stats["percentiles"].values()), {50.0})
+
@@ -3,17 +3,32 @@ from django.urls import path
 from .views import *
 
 urlpatterns = [
+    path("provinces/", ProvincesGeoJSONAPIView.as_view(), name="fire-provinces"),
     path("counties/", CountiesGeoJSONAPIView.as_view(), name="fire-counties"),
     path("forests/", ForestsGeoJSONAPIView.as_view(), name="fire-forests"),
     path("fire-risk/", FireRiskGeoJSONAPIView.as_view(), name="fire-risk"),
+    path("fire-risk/clusters/", FireRiskClustersAPIView.as_view(), name="fire-risk-clusters"),
+    path("reverse-geocode/", ReverseGeocodeAPIView.as_view(), name="fire-reverse-geocode"),
+    path("tiles/<str:layer>/<int:z>/<int:x>/<int:y>.mvt", VectorTileAPIView.as_view(), name="fire-tiles"),
 
     path("aoi/", AOIAPIView.as_view(), name="fire-aoi"),
     path("aoi/<int:aoi_id>/", AOIDetailAPIView.as_view(), name="fire-aoi-detail"),
 
     path("satellite-images/", SatelliteImagesAPIView.as_view(), name="fire-satellite-images"),
     path("index-layers/", IndexLayersAPIView.as_view(), name="fire-index-layers"),
+    path("index-layers/derive/", DeriveIndexLayerAPIView.as_view(), name="fire-index-derive"),
+    path("index-layers/<int:layer_id>/sample/", IndexLayerSampleAPIView.as_view(), name="fire-index-sample"),
+    path("index-layers/<int:layer_id>/zonal-stats/", IndexLayerZonalStatsAPIView.as_view(), name="fire-zonal-stats"),
+    path("datacube/<str:index_name>/timeseries/", DatacubeTimeSeriesAPIView.as_view(), name="fire-datacube-timeseries"),
+
+    path("jobs/<int:job_id>/", JobAPIView.as_view(), name="fire-job"),
 
     path("upload/satellite/", UploadSatelliteImageAPIView.as_view(), name="upload-satellite"),
     path("upload/index/", UploadIndexLayerAPIView.as_view(), name="upload-index"),
+    path("upload/bulk/", BulkUploadAPIView.as_view(), name="upload-bulk"),
+    path("upload/sessions/", UploadSessionsAPIView.as_view(), name="upload-sessions"),
+    path("upload/sessions/<uuid:session_id>/", UploadSessionDetailAPIView.as_view(), name="upload-session"),
+    path("upload/sessions/<uuid:session_id>/complete/", UploadSessionCompleteAPIView.as_view(),
+         name="upload-session-complete"),
     path("styles/<str:style_name>/legend/", StyleLegendAPIView.as_view(), name="fire-style-legend"),
 ]
\ No newline at end of file
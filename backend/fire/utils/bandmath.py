@@ -0,0 +1,327 @@
+# fire/utils/bandmath.py
+"""
+Band math over stored rasters, e.g. dNBR = "pre - post".
+
+Expressions are parsed with `ast` and only arithmetic, comparisons and a
+few NumPy functions are allowed (no attribute access, no arbitrary calls).
+Inputs are aligned on the grid of one of them via WarpedVRT, the output
+is computed per 512x512 block in a process pool and written as a tiled,
+compressed float32 GeoTIFF (NaN = nodata); memory is bounded by a few
+blocks per worker regardless of raster size.
+"""
+import ast
+import logging
+import multiprocessing
+import os
+import tempfile
+
+import numpy as np
+
+from .zonal import GDAL_HTTP_ENV
+
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_BLOCK = 512
+
+_FUNCS = {
+    "abs": np.abs,
+    "sqrt": np.sqrt,
+    "log": np.log,
+    "exp": np.exp,
+    "where": np.where,
+    "minimum": np.fmin,
+    "maximum": np.fmax,
+    "clip": np.clip,
+}
+
+# argument counts accepted per function (np.where with one argument
+# returns indices, not an array)
+_ARITY = {
+    "abs": (1,),
+    "sqrt": (1,),
+    "log": (1,),
+    "exp": (1,),
+    "where": (3,),
+    "minimum": (2,),
+    "maximum": (2,),
+    "clip": (3,),
+}
+
+_BINOPS = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.true_divide,
+    ast.Pow: np.power,
+}
+
+_CMPOPS = {
+    ast.Lt: np.less,
+    ast.LtE: np.less_equal,
+    ast.Gt: np.greater,
+    ast.GtE: np.greater_equal,
+    ast.Eq: np.equal,
+    ast.NotEq: np.not_equal,
+}
+
+_UNARYOPS = {
+    ast.USub: np.negative,
+    ast.UAdd: np.positive,
+    ast.Not: np.logical_not,
+}
+
+_BOOLOPS = {
+    ast.And: np.logical_and,
+    ast.Or: np.logical_or,
+}
+
+
+class Expression:
+    """
+    Validated band-math expression. Raises ValueError on anything outside
+    the whitelist or when it references no input; `names` are the input
+    variables it references.
+    """
+
+    def __init__(self, text: str):
+        self.text = (text or "").strip()
+        if not self.text or len(self.text) > 1000:
+            raise ValueError("expression is empty or too long")
+        try:
+            self.tree = ast.parse(self.text, mode="eval").body
+        except SyntaxError as e:
+            raise ValueError(f"invalid expression: {e.msg}")
+        self.names = set()
+        self._check(self.tree)
+        if not self.names:
+            raise ValueError("expression references no input")
+
+    def _check(self, node):
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINOPS:
+            self._check(node.left)
+            self._check(node.right)
+        elif isinstance(node, ast.UnaryOp) and type(node.op) in _UNARYOPS:
+            self._check(node.operand)
+        elif isinstance(node, ast.BoolOp) and type(node.op) in _BOOLOPS:
+            for v in node.values:
+                self._check(v)
+        elif isinstance(node, ast.Compare) and all(type(op) in _CMPOPS for op in node.ops):
+            self._check(node.left)
+            for c in node.comparators:
+                self._check(c)
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in _FUNCS:
+            if node.keywords:
+                raise ValueError("keyword arguments are not allowed")
+            arity = _ARITY.get(node.func.id)
+            if arity and len(node.args) not in arity:
+                raise ValueError(f"{node.func.id}() takes {' or '.join(map(str, arity))} arguments")
+            for a in node.args:
+                self._check(a)
+        elif isinstance(node, ast.Name):
+            if node.id in _FUNCS:
+                raise ValueError(f"{node.id} must be called")
+            self.names.add(node.id)
+        elif isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+            pass
+        else:
+            raise ValueError(f"unsupported syntax: {ast.dump(node)[:60]}")
+
+    def evaluate(self, env: dict):
+        return self._eval(self.tree, env)
+
+    def _eval(self, node, env):
+        if isinstance(node, ast.BinOp):
+            return _BINOPS[type(node.op)](self._eval(node.left, env), self._eval(node.right, env))
+        if isinstance(node, ast.UnaryOp):
+            return _UNARYOPS[type(node.op)](self._eval(node.operand, env))
+        if isinstance(node, ast.BoolOp):
+            out = self._eval(node.values[0], env)
+            for v in node.values[1:]:
+                out = _BOOLOPS[type(node.op)](out, self._eval(v, env))
+            return out
+        if isinstance(node, ast.Compare):
+            left = self._eval(node.left, env)
+            out = None
+            for op, c in zip(node.ops, node.comparators):
+                right = self._eval(c, env)
+                r = _CMPOPS[type(op)](left, right)
+                out = r if out is None else np.logical_and(out, r)
+                left = right
+            return out
+        if isinstance(node, ast.Call):
+            return _FUNCS[node.func.id](*[self._eval(a, env) for a in node.args])
+        if isinstance(node, ast.Name):
+            return env[node.id]
+        return node.value  # Constant
+
+
+def reference_grid(path: str) -> dict:
+    import rasterio
+
+    with rasterio.Env(**GDAL_HTTP_ENV), rasterio.open(path) as src:
+        return {"crs": src.crs.to_wkt() if src.crs else None, "transform": tuple(src.transform)[:6],
+                "width": src.width, "height": src.height}
+
+
+# per-worker state set by _init_worker
+_W = {}
+
+
+def _init_worker(expr_text, sources, grid):
+    import rasterio
+    from affine import Affine
+    from rasterio.enums import Resampling
+    from rasterio.vrt import WarpedVRT
+
+    env = rasterio.Env(**GDAL_HTTP_ENV)
+    env.__enter__()  # for the life of the worker
+    transform = Affine(*grid["transform"])
+    readers = {}
+    for name, (path, band) in sources.items():
+        src = rasterio.open(path)
+        same = (src.crs and grid["crs"] and src.crs.to_wkt() == grid["crs"] and src.transform == transform
+                and (src.width, src.height) == (grid["width"], grid["height"]))
+        reader = src if same else WarpedVRT(
+            src, crs=grid["crs"], transform=transform, width=grid["width"], height=grid["height"],
+            resampling=Resampling.bilinear,
+        )
+        readers[name] = (reader, band)
+    _W.update(env=env, expr=Expression(expr_text), readers=readers)
+
+
+def _eval_window(win):
+    from rasterio.windows import Window
+
+    window = Window(*win)
+    env = {}
+    for name, (reader, band) in _W["readers"].items():
+        data = reader.read(band, window=window, masked=True)
+        env[name] = np.ma.filled(data.astype(np.float32), np.nan)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        out = _W["expr"].evaluate(env)
+    out = np.broadcast_to(np.asarray(out, dtype=np.float32), (window.height, window.width))
+    return win, np.ascontiguousarray(out)
+
+
+def evaluate_to_geotiff(expr: Expression, sources: dict, grid: dict, out_path: str, workers=None):
+    """
+    sources: {name: (gdal path, band)}. Writes the result on `grid` to
+    out_path; returns its bounds in EPSG:4326 (minx, miny, maxx, maxy).
+    """
+    import rasterio
+    from affine import Affine
+    from rasterio.warp import transform_bounds
+    from rasterio.windows import Window
+
+    workers = workers or os.cpu_count() or 1
+    transform = Affine(*grid["transform"])
+    profile = {
+        "driver": "GTiff",
+        "width": grid["width"],
+        "height": grid["height"],
+        "count": 1,
+        "dtype": "float32",
+        "nodata": float("nan"),
+        "crs": grid["crs"],
+        "transform": transform,
+        "tiled": True,
+        "blockxsize": OUTPUT_BLOCK,
+        "blockysize": OUTPUT_BLOCK,
+        "compress": "deflate",
+        "predictor": 3,
+        "BIGTIFF": "IF_SAFER",
+    }
+
+    windows = [
+        (c, r, min(OUTPUT_BLOCK, grid["width"] - c), min(OUTPUT_BLOCK, grid["height"] - r))
+        for r in range(0, grid["height"], OUTPUT_BLOCK)
+        for c in range(0, grid["width"], OUTPUT_BLOCK)
+    ]
+
+    ctx = multiprocessing.get_context("spawn")  # GDAL is not fork-safe
+    with rasterio.open(out_path, "w", **profile) as dst, \
+            ctx.Pool(workers, initializer=_init_worker, initargs=(expr.text, sources, grid)) as pool:
+        # a few blocks in flight per worker keeps memory bounded
+        step = workers * 4
+        for i in range(0, len(windows), step):
+            for win, data in pool.imap_unordered(_eval_window, windows[i:i + step]):
+                dst.write(data, 1, window=Window(*win))
+
+        bounds = dst.bounds
+    if grid["crs"]:
+        return transform_bounds(grid["crs"], "EPSG:4326", *bounds)
+    return tuple(bounds)
+
+
+def create_derived_index_layer(expression: str, inputs: dict, grid_name: str, title: str,
+                               index_name: str, date, satellite_name: str, workers=None, key: str = None):
+    """
+    inputs: {name: (IndexLayer or SatelliteImage, band)}. Evaluates the
+    expression, stores the GeoTIFF in MinIO and registers + publishes it
+    as an IndexLayer through the regular ingest pipeline (publish errors
+    are recorded on the returned row, not raised). With a key (one per
+    request) the object name is derived from it, and a row already
+    created under that key is returned instead of a second one.
+    """
+    from django.conf import settings
+    from django.contrib.gis.geos import GEOSGeometry, Polygon
+
+    from fire.models import IndexLayer
+    from .ingest import publish_raster, safe_object_name, slug, to_cog
+    from .minio_manager import MinioManager
+    from .versioning import bump_layer_version
+    from .zonal import raster_path
+
+    def publish(obj):
+        try:
+            publish_raster(obj, "index")
+        except Exception:
+            # status/error_message are recorded on obj; the caller retries the publish
+            logger.warning("publishing derived index layer %s failed", obj.id, exc_info=True)
+        return obj
+
+    expr = Expression(expression)
+    missing = expr.names - set(inputs)
+    if missing:
+        raise ValueError(f"no input for: {', '.join(sorted(missing))}")
+
+    bucket = f"idx-{slug(index_name)}"
+    object_name = f"index/derived-{key}.tif" if key else safe_object_name("index", "derived.tif")
+    if key:
+        # a retried job whose earlier attempt got as far as the row
+        obj = IndexLayer.objects.filter(minio_bucket=bucket, minio_object=object_name).first()
+        if obj is not None:
+            return publish(obj) if obj.status == "minio_ok" else obj
+
+    sources = {name: (raster_path(obj), band) for name, (obj, band) in inputs.items() if name in expr.names}
+    grid = reference_grid(sources.get(grid_name, next(iter(sources.values())))[0])
+
+    tmp_dir = getattr(settings, "BANDMATH_TMP_DIR", None)
+    fd, out_path = tempfile.mkstemp(suffix=".tif", dir=tmp_dir)
+    os.close(fd)
+    fd, cog_path = tempfile.mkstemp(suffix=".cog.tif", dir=tmp_dir)
+    os.close(fd)
+    try:
+        minx, miny, maxx, maxy = evaluate_to_geotiff(expr, sources, grid, out_path, workers=workers)
+        to_cog(out_path, cog_path)
+
+        minio_url_public = MinioManager().put_file(bucket, object_name, cog_path, content_type="image/tiff")
+    finally:
+        os.unlink(out_path)
+        os.unlink(cog_path)
+
+    obj = IndexLayer.objects.create(
+        title=title,
+        minio_link=minio_url_public,
+        index_name=index_name,
+        date=date,
+        satellite_name=satellite_name,
+        geometry=GEOSGeometry(Polygon.from_bbox((minx, miny, maxx, maxy)).wkt, srid=4326),
+        minio_bucket=bucket,
+        minio_object=object_name,
+        status="minio_ok",
+        is_published=False,
+    )
+    bump_layer_version("index-layers")
+    return publish(obj)
@@ -0,0 +1,180 @@
+# fire/utils/bulk.py
+"""
+Bulk ingest (bulk_ingest job): many staged GeoTIFFs, or the members of a
+staged zip/tar archive, converted to COG, stored and published with a
+bounded thread pool. The work is I/O (MinIO, GeoServer REST) and GDAL,
+which releases the GIL, so throughput grows with the pool size.
+
+Items that fail for a transient reason are handed over to their own
+ingest_raster job (with its retries); bad rasters fail for good.
+"""
+import os
+import tarfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection
+
+from .minio_manager import MinioManager
+
+
+ARCHIVE_SUFFIXES = {
+    ".zip": "zip",
+    ".tar": "tar",
+    ".tar.gz": "tar",
+    ".tgz": "tar",
+    ".tar.bz2": "tar",
+    ".tar.xz": "tar",
+}
+
+
+def archive_type(name: str):
+    name = (name or "").lower()
+    for suffix, kind in ARCHIVE_SUFFIXES.items():
+        if name.endswith(suffix):
+            return kind
+    return None
+
+
+def default_concurrency() -> int:
+    return int(getattr(settings, "BULK_INGEST_WORKERS", 4))
+
+
+def _match_member(names, wanted: str):
+    """Archive member for a manifest file name: exact path, else a unique basename."""
+    if wanted in names:
+        return wanted
+    hits = [n for n in names if os.path.basename(n) == os.path.basename(wanted)]
+    return hits[0] if len(hits) == 1 else None
+
+
+def _copy_to_staging(mm, fileobj, name: str) -> dict:
+    """Stream a member into a new staging object; returns its payload fields."""
+    from .upload_handlers import open_staging_writer
+
+    writer = open_staging_writer(mm, name, "image/tiff")
+    try:
+        while True:
+            chunk = fileobj.read(writer.part_size)
+            if not chunk:
+                break
+            writer.write(chunk)
+        size, sha256 = writer.close()
+    except Exception:
+        writer.abort()
+        raise
+    return {"staging_bucket": writer.bucket, "staging_object": writer.object_name,
+            "file_name": os.path.basename(name), "size": size, "sha256": sha256}
+
+
+def _extract_tar(mm, archive: dict, items):
+    """
+    One sequential pass over a (possibly compressed) tar: matched members
+    are streamed into staging objects. Returns {file: payload fields}.
+    """
+    resp = mm.client.get_object(archive["bucket"], archive["object"])
+    staged = {}
+    try:
+        with tarfile.open(fileobj=resp, mode="r|*") as tf:
+            wanted = {it["file"] for it in items}
+            basenames = {}
+            for w in wanted:
+                basenames.setdefault(os.path.basename(w), []).append(w)
+            for member in tf:
+                if not member.isfile():
+                    continue
+                key = member.name if member.name in wanted else None
+                if key is None and len(basenames.get(os.path.basename(member.name), [])) == 1:
+                    key = basenames[os.path.basename(member.name)][0]
+                if key is None or key in staged:
+                    continue
+                staged[key] = _copy_to_staging(mm, tf.extractfile(member), member.name)
+    finally:
+        resp.close()
+        resp.release_conn()
+    return staged
+
+
+def _ingest_item(kind: str, item: dict, archive):
+    from .ingest import RASTER_KINDS, DuplicateUpload, ingest_staged, raster_model
+    from .jobs import enqueue, staged_from_payload
+    from .versioning import bump_layer_version
+
+    result = {"file": item["file"], "id": item["id"]}
+    obj = None
+    try:
+        obj = raster_model(kind).objects.get(id=item["id"])
+        staged_fields = item.get("staged")
+
+        if staged_fields is None and archive and archive["type"] == "zip":
+            mm = MinioManager()
+            with mm.open_object(archive["bucket"], archive["object"]) as fh, zipfile.ZipFile(fh) as zf:
+                member = _match_member(zf.namelist(), item["file"])
+                if member is not None:
+                    with zf.open(member) as src:
+                        staged_fields = _copy_to_staging(mm, src, member)
+
+        if staged_fields is None:
+            raise ValueError(f"{item['file']}: not found in the upload")
+
+        payload = {"kind": kind, "id": obj.id, "keep_original": item.get("keep_original"), **staged_fields}
+        try:
+            ingest_staged(obj, kind, staged_from_payload(payload), keep_original=payload["keep_original"])
+        except DuplicateUpload as e:
+            # archive member already stored: drop the placeholder row
+            obj.delete()
+            bump_layer_version(RASTER_KINDS[kind][2])
+            result.update(id=e.existing.id, status="duplicate", duplicate_of=e.existing.id)
+            return result
+        except Exception as e:
+            if isinstance(e, ValueError):
+                raise  # bad raster: marked failed below, never retried
+            # transient (MinIO / GeoServer): retried by a regular ingest job
+            job = enqueue("ingest_raster", payload, delay_seconds=10)
+            result.update(status="retrying", error=str(e), job_id=job.id)
+            return result
+
+        result.update(status=obj.status, geoserver_layer=obj.geoserver_layer)
+    except ValueError as e:
+        if obj is not None and obj.status != "failed":
+            obj.status = "failed"
+            obj.error_message = str(e)
+            obj.save(update_fields=["status", "error_message"])
+        result.update(status="failed", error=str(e))
+    finally:
+        connection.close()  # per-thread DB connection
+    return result
+
+
+def run_bulk_ingest(payload: dict) -> dict:
+    """
+    payload: {"kind", "concurrency", "archive": {"bucket", "object", "name", "type"} | None,
+              "items": [{"file", "id", "keep_original", "staged": {...} | None}]}
+    """
+    kind = payload["kind"]
+    items = payload["items"]
+    archive = payload.get("archive")
+    mm = MinioManager()
+
+    if archive and archive["type"] == "tar":
+        extracted = _extract_tar(mm, archive, [it for it in items if not it.get("staged")])
+        for it in items:
+            it["staged"] = it.get("staged") or extracted.get(it["file"])
+
+    # the client may only ask for fewer threads than BULK_INGEST_WORKERS
+    workers = max(1, min(int(payload.get("concurrency") or default_concurrency()), default_concurrency(),
+                         len(items) or 1))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda it: _ingest_item(kind, it, archive), items))
+
+    if archive:
+        mm.remove(archive["bucket"], archive["object"])
+
+    return {
+        "items": results,
+        "published": sum(1 for r in results if r.get("status") == "published"),
+        "failed": sum(1 for r in results if r.get("status") == "failed"),
+        "retrying": sum(1 for r in results if r.get("status") == "retrying"),
+        "duplicates": sum(1 for r in results if r.get("status") == "duplicate"),
+    }
@@ -0,0 +1,86 @@
+# fire/utils/clusters.py
+from django.db import connection
+
+
+# Zooms with precomputed clusters; above this the endpoint sends raw points.
+CLUSTER_MAX_ZOOM = 12
+
+# Grid cell edge in screen pixels (256px tiles), applied in EPSG:3857.
+CLUSTER_CELL_PX = 60
+
+_WORLD_M_PER_PX = 156543.03392804097  # metres per pixel at zoom 0
+
+
+def cell_size(zoom: int) -> float:
+    return _WORLD_M_PER_PX / (2 ** zoom) * CLUSTER_CELL_PX
+
+
+def rebuild_clusters(cursor=None) -> int:
+    """
+    Grid-cluster fire_risk_areas for every zoom up to CLUSTER_MAX_ZOOM.
+    Each cluster keeps count, max level, a per-level histogram and the
+    mean position of its points (planar 4326).
+    """
+
+    def _run(c):
+        c.execute("DELETE FROM fire_risk_clusters;")
+        total = 0
+        for zoom in range(CLUSTER_MAX_ZOOM + 1):
+            c.execute("""
+            INSERT INTO fire_risk_clusters (zoom, count, max_level, levels, geometry)
+            SELECT
+              %s, SUM(n), MAX(level),
+              jsonb_object_agg(level::text, n),
+              ST_Transform(ST_SetSRID(ST_MakePoint(SUM(sx) / SUM(n), SUM(sy) / SUM(n)), 3857), 4326)
+            FROM (
+              SELECT cx, cy, level, COUNT(*) AS n, SUM(ST_X(g)) AS sx, SUM(ST_Y(g)) AS sy
+              FROM (
+                SELECT level, g, floor(ST_X(g) / %s) AS cx, floor(ST_Y(g) / %s) AS cy
+                FROM (SELECT level, ST_Transform(geometry::geometry, 3857) AS g FROM fire_risk_areas) p
+              ) s
+              GROUP BY cx, cy, level
+            ) t
+            GROUP BY cx, cy;
+            """, [zoom, cell_size(zoom), cell_size(zoom)])
+            total += c.rowcount
+        return total
+
+    if cursor is not None:
+        return _run(cursor)
+    with connection.cursor() as c:
+        return _run(c)
+
+
+def cluster_rows_sql(zoom: int, bbox=None):
+    """
+    (sql, params) yielding one GeoJSON Feature per row, as in
+    fire.utils.geojson: precomputed clusters up to CLUSTER_MAX_ZOOM,
+    the raw points (count 1) above it.
+    """
+    if zoom <= CLUSTER_MAX_ZOOM:
+        sql = """
+        SELECT
+          '{"type":"Feature","properties":' || json_build_object(
+            'cluster', true, 'count', count, 'max_level', max_level, 'levels', levels)::text
+          || ',"geometry":' || ST_AsGeoJSON(geometry) || '}'
+        FROM fire_risk_clusters
+        WHERE zoom = %s
+        """
+        params = [zoom]
+        if bbox:
+            sql += " AND geometry && ST_MakeEnvelope(%s, %s, %s, %s, 4326)"
+            params += list(bbox)
+        return sql + ";", params
+
+    sql = """
+    SELECT
+      '{"type":"Feature","properties":' || json_build_object(
+        'cluster', false, 'count', 1, 'id', id, 'name', name, 'level', level)::text
+      || ',"geometry":' || ST_AsGeoJSON(geometry::geometry) || '}'
+    FROM fire_risk_areas
+    """
+    params = []
+    if bbox:
+        sql += " WHERE geometry && ST_MakeEnvelope(%s, %s, %s, %s, 4326)::geography"
+        params += list(bbox)
+    return sql + ";", params
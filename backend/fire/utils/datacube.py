@@ -0,0 +1,254 @@
+# fire/utils/datacube.py
+"""
+Per-index_name datacube on local disk: time x y x x float32 (NaN = nodata),
+stored as .npy chunks of CHUNK_T x CHUNK_Y x CHUNK_X:
+
+    <DATACUBE_ROOT>/<index>/grid.json        crs / transform / shape (from the first layer)
+    <DATACUBE_ROOT>/<index>/times.json       [{"t", "date", "index_layer_id"}], append order
+    <DATACUBE_ROOT>/<index>/t<ti>/y<yi>_x<xi>.npy
+
+Appending a layer warps it onto the cube grid and writes one time slot of
+each spatial chunk through a memmap. Time-series queries open only the
+chunks covering the point / AOI window. Writers hold an flock per cube.
+"""
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+from .versioning import bump_layer_version
+from .zonal import GDAL_HTTP_ENV
+
+
+CHUNK_T = 32
+CHUNK_Y = 256
+CHUNK_X = 256
+
+
+def datacube_root() -> Path:
+    return Path(getattr(settings, "DATACUBE_ROOT", None) or (Path(settings.BASE_DIR) / "data" / "datacube"))
+
+
+class DataCube:
+    def __init__(self, index_name: str):
+        from .ingest import slug
+
+        self.index_name = index_name
+        self.dir = datacube_root() / slug(index_name)
+
+    # ---- metadata -------------------------------------------------------
+
+    def _read_json(self, name, default):
+        try:
+            return json.loads((self.dir / name).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return default
+
+    def _write_json(self, name, value):
+        tmp = self.dir / (name + ".tmp")
+        tmp.write_text(json.dumps(value), encoding="utf-8")
+        os.replace(tmp, self.dir / name)
+
+    @property
+    def grid(self):
+        return self._read_json("grid.json", None)
+
+    @property
+    def times(self):
+        return self._read_json("times.json", [])
+
+    @contextmanager
+    def _locked(self):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        with open(self.dir / ".lock", "w") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _chunk_path(self, ti, yi, xi) -> Path:
+        return self.dir / f"t{ti}" / f"y{yi}_x{xi}.npy"
+
+    # ---- writes ---------------------------------------------------------
+
+    def append(self, index_layer, path: str) -> int:
+        """
+        Add one IndexLayer as the next time step (no-op if already present).
+        Returns its time index.
+        """
+        import rasterio
+        from affine import Affine
+        from rasterio.enums import Resampling
+        from rasterio.vrt import WarpedVRT
+        from rasterio.windows import Window
+
+        with self._locked():
+            times = self.times
+            for entry in times:
+                if entry["index_layer_id"] == index_layer.id:
+                    return entry["t"]
+
+            with rasterio.Env(**GDAL_HTTP_ENV), rasterio.open(path) as src:
+                grid = self.grid
+                if grid is None:
+                    grid = {"crs": src.crs.to_wkt() if src.crs else None, "transform": tuple(src.transform)[:6],
+                            "width": src.width, "height": src.height}
+                    self._write_json("grid.json", grid)
+
+                transform = Affine(*grid["transform"])
+                same = (src.crs and grid["crs"] and src.crs.to_wkt() == grid["crs"] and src.transform == transform
+                        and (src.width, src.height) == (grid["width"], grid["height"]))
+                reader = src if same else WarpedVRT(
+                    src, crs=grid["crs"], transform=transform, width=grid["width"], height=grid["height"],
+                    resampling=Resampling.bilinear,
+                )
+
+                t = len(times)
+                ti, slot = divmod(t, CHUNK_T)
+                (self.dir / f"t{ti}").mkdir(exist_ok=True)
+                for yi in range((grid["height"] + CHUNK_Y - 1) // CHUNK_Y):
+                    for xi in range((grid["width"] + CHUNK_X - 1) // CHUNK_X):
+                        r0, c0 = yi * CHUNK_Y, xi * CHUNK_X
+                        h = min(CHUNK_Y, grid["height"] - r0)
+                        w = min(CHUNK_X, grid["width"] - c0)
+                        data = reader.read(1, window=Window(c0, r0, w, h), masked=True)
+                        block = np.ma.filled(data.astype(np.float32), np.nan)
+
+                        p = self._chunk_path(ti, yi, xi)
+                        if p.exists():
+                            mm = np.lib.format.open_memmap(p, mode="r+")
+                        else:
+                            if np.isnan(block).all():
+                                continue  # chunk files are created on first data
+                            mm = np.lib.format.open_memmap(p, mode="w+", dtype=np.float32,
+                                                           shape=(CHUNK_T, CHUNK_Y, CHUNK_X))
+                            mm[:] = np.nan
+                        mm[slot, :h, :w] = block
+                        mm.flush()
+                        del mm
+
+                if reader is not src:
+                    reader.close()
+
+            times.append({"t": t, "date": index_layer.date.isoformat(), "index_layer_id": index_layer.id})
+            self._write_json("times.json", times)
+        bump_layer_version("datacube")
+        return t
+
+    # ---- reads ----------------------------------------------------------
+
+    def _selected_times(self, date_from=None, date_to=None):
+        out = []
+        for e in self.times:
+            if date_from and e["date"] < date_from:
+                continue
+            if date_to and e["date"] > date_to:
+                continue
+            out.append(e)
+        return sorted(out, key=lambda e: (e["date"], e["t"]))
+
+    def _load(self, ti, yi, xi):
+        p = self._chunk_path(ti, yi, xi)
+        return np.load(p, mmap_mode="r") if p.exists() else None
+
+    def point_series(self, lon: float, lat: float, date_from=None, date_to=None):
+        """
+        [(date, value or None)] at the pixel containing (lon, lat); None
+        when the point is outside the cube grid.
+        """
+        from affine import Affine
+        from rasterio.warp import transform as warp_transform
+
+        grid = self.grid
+        if grid is None:
+            return None
+        xs, ys = [lon], [lat]
+        if grid["crs"]:
+            xs, ys = warp_transform("EPSG:4326", grid["crs"], xs, ys)
+        col, row = ~Affine(*grid["transform"]) * (xs[0], ys[0])
+        row, col = int(np.floor(row)), int(np.floor(col))
+        if not (0 <= row < grid["height"] and 0 <= col < grid["width"]):
+            return None
+
+        yi, ry = divmod(row, CHUNK_Y)
+        xi, rx = divmod(col, CHUNK_X)
+        series = []
+        cache = {}
+        for e in self._selected_times(date_from, date_to):
+            ti, slot = divmod(e["t"], CHUNK_T)
+            if ti not in cache:
+                cache[ti] = self._load(ti, yi, xi)
+            chunk = cache[ti]
+            v = float(chunk[slot, ry, rx]) if chunk is not None else float("nan")
+            series.append((e["date"], None if v != v else v))
+        return series
+
+    def area_series(self, geom_4326: dict, date_from=None, date_to=None):
+        """
+        [(date, {"mean", "min", "max", "count"})] over a polygon, reading
+        only the chunks that intersect its bounding window.
+        """
+        from affine import Affine
+        from rasterio.features import geometry_mask
+        from rasterio.warp import transform_geom
+        from rasterio.windows import from_bounds
+        from shapely.geometry import shape
+
+        grid = self.grid
+        if grid is None:
+            return None
+        transform = Affine(*grid["transform"])
+        geom = transform_geom("EPSG:4326", grid["crs"], geom_4326) if grid["crs"] else geom_4326
+        win = from_bounds(*shape(geom).bounds, transform=transform)
+        r0 = max(int(np.floor(win.row_off)), 0)
+        c0 = max(int(np.floor(win.col_off)), 0)
+        r1 = min(int(np.ceil(win.row_off + win.height)), grid["height"])
+        c1 = min(int(np.ceil(win.col_off + win.width)), grid["width"])
+        if r0 >= r1 or c0 >= c1:
+            return []
+
+        inside = ~geometry_mask([geom], out_shape=(r1 - r0, c1 - c0),
+                                transform=transform * Affine.translation(c0, r0))
+        times = self._selected_times(date_from, date_to)
+        sums = {e["t"]: [0.0, 0, np.inf, -np.inf] for e in times}
+
+        for yi in range(r0 // CHUNK_Y, (r1 - 1) // CHUNK_Y + 1):
+            for xi in range(c0 // CHUNK_X, (c1 - 1) // CHUNK_X + 1):
+                # overlap of this chunk with the AOI window, in both frames
+                ya, yb = max(r0, yi * CHUNK_Y), min(r1, (yi + 1) * CHUNK_Y)
+                xa, xb = max(c0, xi * CHUNK_X), min(c1, (xi + 1) * CHUNK_X)
+                m = inside[ya - r0:yb - r0, xa - c0:xb - c0]
+                if not m.any():
+                    continue
+                by_ti = {}
+                for e in times:
+                    ti, slot = divmod(e["t"], CHUNK_T)
+                    if ti not in by_ti:
+                        by_ti[ti] = self._load(ti, yi, xi)
+                    chunk = by_ti[ti]
+                    if chunk is None:
+                        continue
+                    v = chunk[slot, ya - yi * CHUNK_Y:yb - yi * CHUNK_Y, xa - xi * CHUNK_X:xb - xi * CHUNK_X][m]
+                    v = v[np.isfinite(v)]
+                    if v.size:
+                        acc = sums[e["t"]]
+                        acc[0] += float(v.sum(dtype=np.float64))
+                        acc[1] += int(v.size)
+                        acc[2] = min(acc[2], float(v.min()))
+                        acc[3] = max(acc[3], float(v.max()))
+
+        out = []
+        for e in times:
+            total, count, vmin, vmax = sums[e["t"]]
+            out.append((e["date"], {
+                "mean": total / count if count else None,
+                "min": vmin if count else None,
+                "max": vmax if count else None,
+                "count": count,
+            }))
+        return out
@@ -0,0 +1,199 @@
+# fire/utils/exports.py
+import json
+import os
+import re
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection
+
+from .generalize import FULL_BAND, GENERALIZED_LAYERS
+
+
+EXPORT_FORMATS = {
+    "fgb": ("application/flatgeobuf", ".fgb"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+}
+
+# layer -> (extra property columns, GeoParquet geometry type)
+EXPORT_LAYERS = {
+    "provinces": ([], "MultiPolygon"),
+    "counties": ([], "MultiPolygon"),
+    "forests": ([], "MultiPolygon"),
+    "fire-risk": (["level"], "Point"),
+}
+
+EXPORT_CHUNK = int(getattr(settings, "EXPORT_CHUNK", 2000))
+
+
+def export_root() -> Path:
+    return Path(getattr(settings, "EXPORT_ROOT", None) or (Path(settings.MEDIA_ROOT) / "exports"))
+
+
+def export_path(layer: str, fmt: str, version: int, aoi_id=None, aoi_version=None) -> Path:
+    suffix = EXPORT_FORMATS[fmt][1]
+    name = f"v{version}" + (f".aoi{aoi_id}-v{aoi_version}" if aoi_id else "") + suffix
+    return export_root() / layer / name
+
+
+def _source_sql(layer: str, aoi_id=None) -> str:
+    """
+    SELECT id, name, [extra...], geom (planar 4326) for a layer, optionally
+    clipped to an AOI. aoi_id must already be an int.
+    """
+    extra, geom_type = EXPORT_LAYERS[layer]
+    cols = ", ".join(["l.id", "l.name"] + [f"l.{c}" for c in extra])
+
+    if layer in GENERALIZED_LAYERS:
+        src = (f"(SELECT source_id AS id, name, geometry FROM fire_generalized_boundaries "
+               f"WHERE layer = '{layer}' AND band = {FULL_BAND})")
+        geom = "l.geometry"
+    else:
+        src = {"fire-risk": "fire_risk_areas"}[layer]
+        geom = "l.geometry::geometry"
+
+    if not aoi_id:
+        return f"SELECT {cols}, {geom} AS geom FROM {src} l"
+
+    clipped = geom if geom_type == "Point" else f"ST_Multi(ST_CollectionExtract(ST_Intersection({geom}, a.geometry::geometry), 3))"
+    return (
+        f"SELECT {cols}, {clipped} AS geom FROM {src} l "
+        f"JOIN fire_aoi a ON a.id = {int(aoi_id)} "
+        f"WHERE ST_Intersects({geom}, a.geometry::geometry)"
+    )
+
+
+def _fields(layer: str):
+    import pyarrow as pa
+
+    extra, _ = EXPORT_LAYERS[layer]
+    fields = [pa.field("id", pa.int64()), pa.field("name", pa.string())]
+    fields += [pa.field(c, pa.int64()) for c in extra]
+    return fields + [pa.field("geometry", pa.binary())]  # WKB
+
+
+def _record_batches(layer: str, aoi_id, schema):
+    """The layer's rows as record batches, one per server-side cursor chunk."""
+    import pyarrow as pa
+
+    names = schema.names
+    select = ", ".join(f"t.{n}" for n in names[:-1]) + ", ST_AsBinary(t.geom)"
+    sql = f"SELECT {select} FROM ({_source_sql(layer, aoi_id)}) t"
+    with connection.chunked_cursor() as cursor:
+        cursor.execute(sql)
+        while True:
+            rows = cursor.fetchmany(EXPORT_CHUNK)
+            if not rows:
+                break
+            cols = list(zip(*rows))
+            arrays = [list(c) for c in cols[:-1]] + [[bytes(b) if b is not None else None for b in cols[-1]]]
+            yield pa.record_batch(arrays, schema=schema)
+
+
+def _write_fgb(layer: str, aoi_id, path):
+    """
+    FlatGeobuf with packed Hilbert R-tree index, written by GDAL (pyogrio)
+    from the cursor chunks. ST_AsFlatGeobuf is an aggregate that builds the
+    whole file in one bytea (1 GB limit), so it is not used.
+    """
+    import pyarrow as pa
+    from pyogrio.raw import write_arrow
+
+    _, geom_type = EXPORT_LAYERS[layer]
+    schema = pa.schema(_fields(layer))
+    reader = pa.RecordBatchReader.from_batches(schema, _record_batches(layer, aoi_id, schema))
+    write_arrow(reader, str(path), layer=layer, driver="FlatGeobuf", geometry_name="geometry",
+                geometry_type=geom_type, crs="EPSG:4326", layer_options={"SPATIAL_INDEX": "YES"})
+
+
+def _write_parquet(layer: str, aoi_id, path):
+    """
+    GeoParquet 1.0 (WKB geometry column), one row group per cursor chunk.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    _, geom_type = EXPORT_LAYERS[layer]
+    geo = {
+        "version": "1.0.0",
+        "primary_column": "geometry",
+        "columns": {"geometry": {"encoding": "WKB", "geometry_types": [geom_type]}},  # crs omitted => OGC:CRS84
+    }
+    schema = pa.schema(_fields(layer), metadata={b"geo": json.dumps(geo).encode("utf-8")})
+    with pq.ParquetWriter(str(path), schema, compression="zstd") as writer:
+        for batch in _record_batches(layer, aoi_id, schema):
+            writer.write_batch(batch)
+
+
+WRITERS = {"fgb": _write_fgb, "parquet": _write_parquet}
+
+
+_EXPORT_NAME = re.compile(r"^v(\d+)(?:\.aoi\d+-v(\d+))?\.")
+
+
+def _prune(path: Path, version: int, aoi_version=None) -> None:
+    """
+    Drop exports of older versions of this layer and, after an AOI export,
+    AOI exports of older AOI versions; then keep at most
+    EXPORT_MAX_AOI_FILES AOI exports per layer (newest first).
+    """
+    aoi_files = []
+    for f in path.parent.iterdir():
+        m = _EXPORT_NAME.match(f.name)
+        if f == path or not m:
+            continue
+        if int(m.group(1)) < version or (
+                m.group(2) and aoi_version is not None and int(m.group(2)) < aoi_version):
+            f.unlink(missing_ok=True)
+        elif m.group(2):
+            aoi_files.append(f)
+
+    limit = int(getattr(settings, "EXPORT_MAX_AOI_FILES", 50))
+    if len(aoi_files) >= limit:
+        def mtime(f):
+            try:
+                return f.stat().st_mtime
+            except FileNotFoundError:
+                return 0
+        for f in sorted(aoi_files, key=mtime, reverse=True)[limit - 1:]:
+            f.unlink(missing_ok=True)
+
+
+def open_export(layer: str, fmt: str, version: int, aoi_id=None, aoi_version=None):
+    """
+    (open file, path) of the export for (layer version [, AOI version]),
+    written once and then served from disk. Also reachable under MEDIA_URL,
+    where nginx answers HTTP range requests (FlatGeobuf index / Parquet
+    footer reads). The file is opened before anything can prune it, so a
+    concurrent build of a newer version does not pull it from under the
+    response.
+    """
+    path = export_path(layer, fmt, version, aoi_id, aoi_version)
+    try:
+        return open(path, "rb"), path
+    except FileNotFoundError:
+        pass
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # GDAL picks single-file FlatGeobuf output by the extension
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp" + EXPORT_FORMATS[fmt][1])
+    os.close(fd)
+    try:
+        WRITERS[fmt](layer, aoi_id, tmp)
+        fh = open(tmp, "rb")
+        os.replace(tmp, path)
+    except Exception:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+    _prune(path, version, aoi_version if aoi_id else None)
+    return fh, path
+
+
+def export_media_url(path: Path):
+    try:
+        rel = path.relative_to(Path(settings.MEDIA_ROOT))
+    except ValueError:
+        return None  # EXPORT_ROOT outside MEDIA_ROOT
+    return settings.MEDIA_URL.rstrip("/") + "/" + rel.as_posix()
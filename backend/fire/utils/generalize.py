@@ -0,0 +1,84 @@
+# fire/utils/generalize.py
+from django.db import connection
+
+
+# Boundary layers that get pre-simplified copies.
+GENERALIZED_LAYERS = {
+    "provinces": "iran_provinces",
+    "counties": "iran_counties",
+    "forests": "iran_forests",
+}
+
+# (band, max_zoom, tolerance in metres, applied in EPSG:3857)
+# Tolerances stay below one screen pixel at the band's max zoom
+# (~156543 / 2^z m/px). The last band is full resolution.
+ZOOM_BANDS = [
+    (0, 5, 2000.0),
+    (1, 8, 300.0),
+    (2, 11, 40.0),
+    (3, 22, 0.0),
+]
+
+FULL_BAND = ZOOM_BANDS[-1][0]
+
+
+def band_for_zoom(zoom):
+    if zoom is None:
+        return FULL_BAND
+    for band, max_zoom, _ in ZOOM_BANDS:
+        if zoom <= max_zoom:
+            return band
+    return FULL_BAND
+
+
+# Band geometry from the simplified polygon (EPSG:3857 WKB), stored as planar 4326.
+_INSERT_SQL = """
+INSERT INTO fire_generalized_boundaries (layer, source_id, name, band, geometry)
+SELECT %s, %s, %s, %s, g
+FROM (
+  SELECT ST_Multi(ST_CollectionExtract(ST_MakeValid(
+    ST_Transform(ST_GeomFromWKB(%s, 3857), 4326)
+  ), 3)) AS g
+) s
+WHERE NOT ST_IsEmpty(g);
+"""
+
+
+def rebuild_generalized(layer: str, cursor=None) -> int:
+    """
+    Recompute every zoom band of one layer from its source table.
+    Simplification is done in metres (3857) on the layer as a coverage
+    (shapely.coverage_simplify, GEOS >= 3.12): an edge shared by two
+    neighbours is simplified once, so bands get no slivers or overlaps.
+    Results are stored as planar 4326 geometry, so reads need no
+    cast/transform.
+    """
+    import shapely
+
+    table = GENERALIZED_LAYERS[layer]
+
+    def _run(c):
+        c.execute(f"""
+        SELECT id, name, ST_AsBinary(ST_Transform(geometry::geometry, 3857))
+        FROM {table}
+        WHERE geometry IS NOT NULL
+        ORDER BY id;
+        """)
+        rows = c.fetchall()
+        geoms = shapely.from_wkb([bytes(r[2]) for r in rows])
+
+        c.execute("DELETE FROM fire_generalized_boundaries WHERE layer = %s;", [layer])
+        total = 0
+        for band, _, tol in ZOOM_BANDS:
+            simplified = shapely.coverage_simplify(geoms, tol) if tol and len(geoms) else geoms
+            c.executemany(_INSERT_SQL, [
+                (layer, r[0], r[1], band, shapely.to_wkb(g))
+                for r, g in zip(rows, simplified)
+            ])
+            total += c.rowcount
+        return total
+
+    if cursor is not None:
+        return _run(cursor)
+    with connection.cursor() as c:
+        return _run(c)
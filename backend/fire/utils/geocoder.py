@@ -0,0 +1,82 @@
+# fire/utils/geocoder.py
+import threading
+
+import numpy as np
+import shapely
+from django.db import connection
+
+from .generalize import FULL_BAND, GENERALIZED_LAYERS
+
+
+GEOCODER_LAYERS = sorted(GENERALIZED_LAYERS)  # counties, forests, provinces
+
+# layer -> (version, STRtree, ids ndarray, {id: name}); one copy per worker process
+_indexes = {}
+_lock = threading.Lock()
+
+
+def _build(layer: str):
+    # full-resolution planar copy: already valid 4326, no cast per row
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT source_id, name, ST_AsBinary(geometry) FROM fire_generalized_boundaries "
+            "WHERE layer = %s AND band = %s ORDER BY source_id;",
+            [layer, FULL_BAND],
+        )
+        rows = cursor.fetchall()
+
+    geoms = shapely.from_wkb([bytes(r[2]) for r in rows]) if rows else np.empty(0, dtype=object)
+    shapely.prepare(geoms)
+    ids = np.array([r[0] for r in rows], dtype=np.int64)
+    names = {r[0]: r[1] for r in rows}
+    return shapely.STRtree(geoms), ids, names
+
+
+def get_index(layer: str, version: int):
+    """
+    (tree, ids, names) for the layer, rebuilt only when its version changed.
+    """
+    entry = _indexes.get(layer)
+    if entry is not None and entry[0] == version:
+        return entry[1:]
+
+    with _lock:
+        entry = _indexes.get(layer)
+        if entry is None or entry[0] != version:
+            entry = (version, *_build(layer))
+            _indexes[layer] = entry
+    return entry[1:]
+
+
+def lookup_points(layer: str, version: int, coords) -> list:
+    """
+    coords: sequence of (lon, lat). Returns the id of the containing feature
+    per point (None outside every feature; first hit where features overlap).
+    """
+    tree, ids, _ = get_index(layer, version)
+    xy = np.asarray(coords, dtype=float).reshape(-1, 2)
+    out = np.full(len(xy), -1, dtype=np.int64)
+    if len(xy) and len(ids):
+        pts, hits = tree.query(shapely.points(xy), predicate="intersects")
+        # fancy assignment keeps the last write: reverse so the first hit wins
+        out[pts[::-1]] = ids[hits[::-1]]
+    return [int(i) if i >= 0 else None for i in out]
+
+
+def lookup_geometries(layer: str, version: int, geoms) -> list:
+    """
+    geoms: shapely geometries (e.g. AOIs). Returns the ids of all features
+    each geometry intersects.
+    """
+    tree, ids, _ = get_index(layer, version)
+    out = [[] for _ in geoms]
+    if len(geoms) and len(ids):
+        src, hits = tree.query(np.asarray(geoms, dtype=object), predicate="intersects")
+        for s, h in zip(src.tolist(), ids[hits].tolist()):
+            out[s].append(h)
+    return out
+
+
+def feature_names(layer: str, version: int, wanted) -> dict:
+    _, _, names = get_index(layer, version)
+    return {i: names[i] for i in set(wanted) if i in names}
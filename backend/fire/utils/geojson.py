@@ -0,0 +1,98 @@
+# fire/utils/geojson.py
+from django.conf import settings
+from django.db import connection
+
+from .generalize import FULL_BAND, GENERALIZED_LAYERS
+
+
+# Per-layer (table, properties expression) for the vector GeoJSON endpoints.
+GEOJSON_LAYERS = {
+    "provinces": ("iran_provinces", "json_build_object('id', id, 'name', name)"),
+    "counties": ("iran_counties", "json_build_object('id', id, 'name', name)"),
+    "forests": ("iran_forests", "json_build_object('id', id, 'name', name)"),
+    "fire-risk": ("fire_risk_areas", "json_build_object('id', id, 'name', name, 'level', level)"),
+}
+
+GEOJSON_STREAM_CHUNK = int(getattr(settings, "GEOJSON_STREAM_CHUNK", 500))
+
+
+DEFAULT_PRECISION = 9  # ST_AsGeoJSON default maxdecimaldigits
+
+
+def geometry_json_sql(geom: str, precision=None) -> str:
+    """
+    ST_AsGeoJSON expression for `geom`. With a precision, vertices are first
+    snapped to a 10^-precision grid so points that collapse after rounding
+    are dropped instead of repeated.
+    """
+    if precision is None:
+        return f"ST_AsGeoJSON({geom})"
+    p = int(precision)
+    return f"ST_AsGeoJSON(ST_SnapToGrid({geom}, {10.0 ** -p!r}), {p})"
+
+
+def feature_rows_sql(layer: str, precision=None) -> str:
+    """
+    SQL returning one text column per row: a complete GeoJSON Feature
+    assembled by PostGIS (no json parsing on the Python side).
+    """
+    table, props = GEOJSON_LAYERS[layer]
+    geom = geometry_json_sql("geometry::geometry", precision)
+    return f"""
+    SELECT
+      '{{"type":"Feature","properties":' || {props}::text
+      || ',"geometry":' || COALESCE({geom}, 'null') || '}}'
+    FROM {table};
+    """
+
+
+def boundary_rows_sql(layer: str, band: int, bbox=None, precision=None):
+    """
+    Like feature_rows_sql, but reads the pre-simplified planar copy of a
+    boundary layer for one zoom band, optionally clipped to a bbox.
+    Returns (sql, params).
+    """
+    geom = geometry_json_sql("geometry", precision)
+    sql = f"""
+    SELECT
+      '{{"type":"Feature","properties":' || json_build_object('id', source_id, 'name', name)::text
+      || ',"geometry":' || COALESCE({geom}, 'null') || '}}'
+    FROM fire_generalized_boundaries
+    WHERE layer = %s AND band = %s
+    """
+    params = [layer, band]
+    if bbox:
+        sql += " AND geometry && ST_MakeEnvelope(%s, %s, %s, %s, 4326)"
+        params += list(bbox)
+    return sql + ";", params
+
+
+def iter_feature_collection_from_sql(sql, params=None, chunk_size=None):
+    """
+    Yield a FeatureCollection as bytes.
+    Rows come from a server-side cursor in chunks, so a worker never holds
+    more than `chunk_size` features at once.
+    """
+    chunk_size = chunk_size or GEOJSON_STREAM_CHUNK
+
+    yield b'{"type":"FeatureCollection","features":['
+    sep = ""
+    with connection.chunked_cursor() as cursor:
+        cursor.execute(sql, params or [])
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield (sep + ",".join(r[0] for r in rows)).encode("utf-8")
+            sep = ","
+    yield b"]}"
+
+
+def layer_rows_sql(layer: str):
+    """
+    (sql, params) for the full-resolution, unfiltered layer, i.e. what the
+    endpoint returns without query parameters.
+    """
+    if layer in GENERALIZED_LAYERS:
+        return boundary_rows_sql(layer, FULL_BAND)
+    return feature_rows_sql(layer), []
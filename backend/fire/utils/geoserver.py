@@ -1,13 +1,123 @@
 # fire/utils/geoserver.py
+"""
+GeoServer REST access. All calls go through one GeoServerClient per
+process (per base URL / user): a requests.Session whose pool keeps
+connections alive, with retries (jittered exponential backoff) on
+connection errors and 5xx for requests that can be replayed, and a TTL
+cache (GEOSERVER_CACHE_TTL) of the workspaces and coverage stores known
+to exist.
+"""
+import os
+import random
+import threading
+import time
+
 import requests
+from django.conf import settings
+
+
+RETRY_STATUSES = (500, 502, 503, 504)
+IDEMPOTENT_METHODS = ("GET", "HEAD", "PUT", "DELETE")
+
+
+class GeoServerClient:
+    def __init__(self, base_url: str, username: str, password: str):
+        from requests.adapters import HTTPAdapter
+
+        self.base_url = (base_url or "").rstrip("/")
+        self.session = requests.Session()
+        self.session.auth = (username, password)
+        pool_size = int(getattr(settings, "GEOSERVER_HTTP_POOL_SIZE", 16))
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.retries = int(getattr(settings, "GEOSERVER_RETRIES", 3))
+        self.backoff_base = float(getattr(settings, "GEOSERVER_BACKOFF_SECONDS", 0.5))
+        self.backoff_max = float(getattr(settings, "GEOSERVER_BACKOFF_MAX_SECONDS", 8.0))
+        self.cache_ttl = float(getattr(settings, "GEOSERVER_CACHE_TTL", 300))
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def url(self, path: str) -> str:
+        return path if path.startswith(("http://", "https://")) else f"{self.base_url}{path}"
+
+    def backoff_seconds(self, attempt: int) -> float:
+        """Exponential backoff with +-50% jitter (as for jobs)."""
+        delay = min(self.backoff_base * 2 ** max(attempt - 1, 0), self.backoff_max)
+        return delay * random.uniform(0.5, 1.5)
+
+    def request(self, method: str, path: str, timeout: float = 30, **kwargs) -> requests.Response:
+        """
+        Session request. Idempotent methods whose body can be sent again
+        (none, bytes, str) are retried on connection errors and 5xx; a
+        streamed body (iterator) is sent once.
+        """
+        method = method.upper()
+        data = kwargs.get("data")
+        replayable = method in IDEMPOTENT_METHODS and (data is None or isinstance(data, (bytes, str)))
+        attempts = 1 + (self.retries if replayable else 0)
+        url = self.url(path)
+
+        for attempt in range(1, attempts + 1):
+            try:
+                r = self.session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == attempts:
+                    raise
+            else:
+                if r.status_code not in RETRY_STATUSES or attempt == attempts:
+                    return r
+                r.close()
+            time.sleep(self.backoff_seconds(attempt))
+
+    # ---- TTL cache -----------------------------------------------------------
+
+    def cached(self, key):
+        """Cached value, or None when missing / expired."""
+        hit = self._cache.get(key)
+        if hit is None or hit[0] < time.monotonic():
+            return None
+        return hit[1]
+
+    def remember(self, key, value) -> None:
+        with self._lock:
+            self._cache[key] = (time.monotonic() + self.cache_ttl, value)
+
+    def forget(self, workspace: str = None) -> None:
+        """Drop cached state of a workspace (everything when None)."""
+        with self._lock:
+            if workspace is None:
+                self._cache.clear()
+            else:
+                for key in [k for k in self._cache if k[1] == workspace]:
+                    del self._cache[key]
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def geoserver_client(base_url: str, username: str, password: str) -> GeoServerClient:
+    """The process-wide client for this GeoServer (re-created after a fork)."""
+    key = (os.getpid(), (base_url or "").rstrip("/"), username, password)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _clients[key] = GeoServerClient(base_url, username, password)
+    return client
 
 
 class GeoServerManager:
     """
-    Reliable publishing:
-      - Django downloads GeoTIFF from MinIO (internal URL)
-      - Django uploads bytes to GeoServer via REST file.geotiff
-    This avoids GeoServer REST limitations around external URL inputs.
+    Publishing modes:
+      - COG store (cog:// URL, needs the cog-plugin extension): GeoServer
+        reads the COG in place from MinIO with HTTP range requests; no
+        bytes move through Django and none are copied into its data dir
+      - file.geotiff (fallback): Django streams the GeoTIFF from MinIO
+        (internal URL) into the REST upload, chunk by chunk
     """
 
     def __init__(self, base_url: str, username: str, password: str, workspace: str):
@@ -20,61 +130,97 @@ class GeoServerManager:
         if not username or not password:
             raise ValueError("GeoServer username/password is empty")
 
+        self.http = geoserver_client(self.base_url, username, password)
+
     def _url(self, path: str) -> str:
         return f"{self.base_url}{path}"
 
     def ensure_workspace(self) -> None:
         ws = self.workspace
+        if self.http.cached(("workspace", ws)):
+            return
 
-        r = requests.get(self._url(f"/rest/workspaces/{ws}.json"), auth=self.auth, timeout=30)
+        r = self.http.request("GET", f"/rest/workspaces/{ws}.json")
         if r.status_code == 200:
+            self.http.remember(("workspace", ws), True)
             return
         if r.status_code != 404:
             raise Exception(f"Workspace check failed (HTTP {r.status_code}): {r.text}")
 
         payload = {"workspace": {"name": ws}}
-        r = requests.post(
-            self._url("/rest/workspaces"),
+        r = self.http.request(
+            "POST",
+            "/rest/workspaces",
             json=payload,
-            auth=self.auth,
             headers={"Content-Type": "application/json"},
-            timeout=30,
         )
         if r.status_code not in (200, 201):
             raise Exception(f"Workspace creation failed (HTTP {r.status_code}): {r.text}")
+        self.http.remember(("workspace", ws), True)
+
+    def coveragestores(self) -> set:
+        """Names of the workspace's coverage stores (cached listing)."""
+        ws = self.workspace
+        stores = self.http.cached(("stores", ws))
+        if stores is None:
+            r = self.http.request("GET", f"/rest/workspaces/{ws}/coveragestores.json")
+            if r.status_code != 200:
+                raise Exception(f"Listing coveragestores failed (HTTP {r.status_code}): {r.text}")
+            # an empty workspace answers {"coverageStores": ""}
+            listing = (r.json() or {}).get("coverageStores")
+            items = (listing.get("coverageStore") or []) if isinstance(listing, dict) else []
+            stores = {item["name"] for item in items}
+            self.http.remember(("stores", ws), stores)
+        return stores
+
+    def _store_changed(self, store_name: str, exists: bool) -> None:
+        stores = self.http.cached(("stores", self.workspace))
+        if stores is not None:
+            stores = set(stores)
+            (stores.add if exists else stores.discard)(store_name)
+            self.http.remember(("stores", self.workspace), stores)
 
-    def delete_coveragestore_if_exists(self, store_name: str) -> None:
+    def delete_coveragestore_if_exists(self, store_name: str, purge: str = "all") -> None:
         """
         If a previous failed attempt left a broken store, remove it.
+        Use purge="metadata" for stores that reference MinIO objects: "all"
+        would try to delete the referenced file itself.
         """
         ws = self.workspace
-        r = requests.delete(
-            self._url(f"/rest/workspaces/{ws}/coveragestores/{store_name}?recurse=true&purge=all"),
-            auth=self.auth,
+        r = self.http.request(
+            "DELETE",
+            f"/rest/workspaces/{ws}/coveragestores/{store_name}?recurse=true&purge={purge}",
             timeout=60,
         )
         # 200/202 = deleted, 404 = not exists (ok)
         if r.status_code in (200, 202, 404):
+            self._store_changed(store_name, exists=False)
             return
         raise Exception(f"Delete coveragestore failed (HTTP {r.status_code}): {r.text}")
 
+    def _clear_store(self, store_name: str, purge: str) -> None:
+        """Delete a leftover store from an earlier attempt; skipped when it is known not to exist."""
+        if store_name in self.coveragestores():
+            self.delete_coveragestore_if_exists(store_name, purge=purge)
+
     def publish_geotiff_bytes(
         self,
-        geotiff_bytes: bytes,
+        geotiff_bytes,
         store_name: str,
         layer_name: str,
         configure: str = "first",
+        purge: str = "all",
     ) -> None:
         """
-        Upload GeoTIFF bytes directly to GeoServer.
-        This auto-creates the store + coverage + layer.
+        Upload GeoTIFF bytes (or an iterable of chunks, sent chunked)
+        directly to GeoServer. This auto-creates the store + coverage + layer.
         """
         ws = self.workspace
         self.ensure_workspace()
 
         # If store exists from previous attempt, delete it to avoid conflicts.
         # (This makes retries deterministic)
-        self.delete_coveragestore_if_exists(store_name)
+        self._clear_store(store_name, purge=purge)
 
         # Important: use file.geotiff endpoint
         # coverageName helps ensure deterministic layer naming
@@ -83,43 +229,101 @@ class GeoServerManager:
             f"?configure={configure}&coverageName={layer_name}"
         )
 
-        r = requests.put(
+        r = self.http.request(
+            "PUT",
             put_url,
             data=geotiff_bytes,
-            auth=self.auth,
             headers={"Content-Type": "image/tiff"},
             timeout=300,
         )
 
         if r.status_code not in (200, 201):
+            self.http.forget(ws)  # cached workspace/stores may be stale: re-check on retry
             raise Exception(
                 f"PUT {put_url} failed (HTTP {r.status_code}): {r.text}"
             )
+        self._store_changed(store_name, exists=True)
+
+    def publish_geotiff_cog(self, cog_url: str, store_name: str, layer_name: str) -> None:
+        """
+        Register a COG that GeoServer reads over HTTP range requests
+        (cog-plugin): only the URL is sent. cog_url must be readable by
+        GeoServer without credentials.
+        """
+        ws = self.workspace
+        self.ensure_workspace()
+        self._clear_store(store_name, purge="metadata")
+
+        store = {"coverageStore": {
+            "name": store_name,
+            "type": "GeoTIFF",
+            "enabled": True,
+            "workspace": ws,
+            "url": f"cog://{cog_url}",
+            "metadata": {"entry": {
+                "@key": "CogSettings.Key",
+                "cogSettings": {"useCachingStream": False, "rangeReaderSettings": "HTTP"},
+            }},
+        }}
+        r = self.http.request("POST", f"/rest/workspaces/{ws}/coveragestores", json=store, timeout=60)
+        if r.status_code not in (200, 201):
+            self.http.forget(ws)
+            raise Exception(f"COG store creation failed (HTTP {r.status_code}): {r.text}")
+        self._store_changed(store_name, exists=True)
+
+        # the COG reader names its single coverage after the file
+        native_name = os.path.splitext(cog_url.rsplit("/", 1)[-1])[0]
+        coverage = {"coverage": {"name": layer_name, "nativeName": native_name, "title": layer_name}}
+        r = self.http.request(
+            "POST", f"/rest/workspaces/{ws}/coveragestores/{store_name}/coverages", json=coverage, timeout=60,
+        )
+        if r.status_code not in (200, 201):
+            self.http.forget(ws)
+            raise Exception(f"COG coverage creation failed (HTTP {r.status_code}): {r.text}")
 
     def publish_geotiff_from_minio(
         self,
         minio_internal_url: str,
         store_name: str,
         layer_name: str,
-    ) -> None:
+        cog: bool = False,
+    ) -> str:
         """
-        1) GET GeoTIFF from MinIO (internal URL)
-        2) PUT bytes to GeoServer
+        Publish by reference (a COG store on minio_internal_url) when cog is
+        set, otherwise / on failure stream the object from MinIO into
+        file.geotiff. Returns the mode used: "cog" or "copy".
         """
-        # Download from MinIO
-        rr = requests.get(minio_internal_url, stream=True, timeout=300)
-        if rr.status_code != 200:
-            raise Exception(
-                f"MinIO download failed (HTTP {rr.status_code}): {minio_internal_url}"
-            )
+        cog_error = None
+        if cog:
+            try:
+                self.publish_geotiff_cog(minio_internal_url, store_name, layer_name)
+                return "cog"
+            except Exception as e:
+                cog_error = e
 
-        content = rr.content  # (برای فایل‌های خیلی بزرگ میشه stream کرد؛ فعلاً پایدار و ساده)
-        if not content or len(content) < 1024:
-            raise Exception("MinIO returned empty/too-small content (GeoTIFF bytes).")
+        rr = requests.get(minio_internal_url, stream=True, timeout=300)
+        try:
+            if rr.status_code != 200:
+                raise Exception(
+                    f"MinIO download failed (HTTP {rr.status_code}): {minio_internal_url}"
+                )
+            length = int(rr.headers.get("Content-Length") or 0)
+            if length and length < 1024:
+                raise Exception("MinIO returned empty/too-small content (GeoTIFF bytes).")
 
-        self.publish_geotiff_bytes(
-            geotiff_bytes=content,
-            store_name=store_name,
-            layer_name=layer_name,
-            configure="first",
-        )
\ No newline at end of file
+            try:
+                self.publish_geotiff_bytes(
+                    geotiff_bytes=rr.iter_content(chunk_size=1024 * 1024),
+                    store_name=store_name,
+                    layer_name=layer_name,
+                    configure="first",
+                    # a failed COG attempt may have left a store that points at the MinIO object
+                    purge="metadata" if cog_error else "all",
+                )
+            except Exception as e:
+                if cog_error:
+                    raise Exception(f"{e} (COG store also failed: {cog_error})")
+                raise
+        finally:
+            rr.close()
+        return "copy"
@@ -0,0 +1,391 @@
+# fire/utils/ingest.py
+"""
+Raster ingest pipeline shared by the upload views and derived products:
+MinIO object -> DB row -> GeoServer coverage, with status bookkeeping.
+"""
+import os
+import re
+import tempfile
+import uuid
+
+from django.conf import settings
+
+from .geoserver import GeoServerManager
+from .versioning import bump_layer_version
+
+
+# kind -> (bucket/store prefix, model attribute naming the bucket, LayerVersion name)
+RASTER_KINDS = {
+    "satellite": ("sat", "satellite_name", "satellite-images"),
+    "index": ("idx", "index_name", "index-layers"),
+}
+
+
+def slug(s: str) -> str:
+    s = (s or "").strip().lower()
+    s = re.sub(r"[^a-z0-9-]+", "-", s)
+    s = re.sub(r"-{2,}", "-", s).strip("-")
+    return s or "unknown"
+
+
+def safe_object_name(prefix: str, original_name: str) -> str:
+    _, ext = os.path.splitext(original_name or "")
+    ext = (ext or "").lower()
+    return f"{prefix}/{uuid.uuid4().hex}{ext}"
+
+
+def geoserver_cfg():
+    """
+    Internal base is used ONLY for server-to-server (web->geoserver) calls.
+    If someone mistakenly sets INTERNAL to localhost, fix it automatically.
+    """
+    base_url_internal = getattr(settings, "GEOSERVER_BASE_URL_INTERNAL", None)
+
+    # اگر internal اشتباهی localhost بود، داخل کانتینر جواب نمی‌دهد
+    if base_url_internal and ("localhost" in base_url_internal or "127.0.0.1" in base_url_internal):
+        base_url_internal = None
+
+    # fallback صحیح داخل شبکه docker
+    base_url_internal = base_url_internal or "http://geoserver:8080/geoserver"
+
+    user = getattr(settings, "GEOSERVER_ADMIN_USER", None) or "admin"
+    pwd = getattr(settings, "GEOSERVER_ADMIN_PASSWORD", None) or "geoserver"
+    ws = getattr(settings, "GEOSERVER_WORKSPACE", "fire") or "fire"
+    return base_url_internal, user, pwd, ws
+
+
+def geoserver_public_base():
+    """
+    Public base is used for URLs that the browser must reach (host->geoserver mapped port).
+    """
+    return (
+        getattr(settings, "GEOSERVER_BASE_URL_PUBLIC", None)
+        or getattr(settings, "GEOSERVER_BASE_URL", None)
+        or "http://localhost:8084/geoserver"
+    )
+
+
+def minio_internal_url(bucket: str, object_name: str) -> str:
+    host = getattr(settings, "MINIO_INTERNAL_HOST", "minio")
+    port = getattr(settings, "MINIO_INTERNAL_PORT", "9000")
+    return f"http://{host}:{port}/{bucket}/{object_name}"
+
+
+_TIFF_MAGIC = (b"II*\x00", b"MM\x00*", b"II+\x00", b"MM\x00+")
+
+
+def is_tiff_header(head: bytes) -> bool:
+    """First bytes of a (Big)TIFF, either byte order."""
+    return head[:4] in _TIFF_MAGIC
+
+
+# Lossless, internally tiled COG with overviews: GeoServer renders low zooms
+# from overviews and GDAL clients read it with HTTP range requests.
+COG_OPTIONS = {
+    "COMPRESS": "DEFLATE",
+    "PREDICTOR": "YES",
+    "BLOCKSIZE": 512,
+    "OVERVIEWS": "AUTO",
+    "OVERVIEW_RESAMPLING": "AVERAGE",
+    "BIGTIFF": "IF_SAFER",
+    "NUM_THREADS": "ALL_CPUS",
+}
+
+
+def to_cog(src_path: str, dst_path: str) -> None:
+    """
+    Rewrite any GDAL-readable raster as a Cloud-Optimized GeoTIFF.
+    Raises ValueError when the input is not a readable raster.
+    """
+    import rasterio
+    from rasterio.errors import RasterioIOError
+    from rasterio.shutil import copy as rio_copy
+
+    from .zonal import GDAL_HTTP_ENV
+
+    try:
+        with rasterio.Env(**GDAL_HTTP_ENV), rasterio.open(src_path) as src:
+            rio_copy(src, dst_path, driver="COG", **COG_OPTIONS)
+    except RasterioIOError as e:
+        raise ValueError(f"Not a readable GeoTIFF: {e}")
+
+
+def _staged_upload_path(uploaded):
+    """
+    Local path of an uploaded file: Django's temp file when it spilled to
+    disk, otherwise a temp copy (second value: whether to delete it).
+    """
+    if hasattr(uploaded, "temporary_file_path"):
+        return uploaded.temporary_file_path(), False
+    fd, path = tempfile.mkstemp(suffix=os.path.splitext(uploaded.name or "")[1] or ".tif")
+    with os.fdopen(fd, "wb") as fh:
+        for chunk in uploaded.chunks():
+            fh.write(chunk)
+    return path, True
+
+
+def store_uploaded_geotiff(mm, uploaded, bucket: str, prefix: str, keep_original=False):
+    """
+    Convert an uploaded GeoTIFF to COG and put it in MinIO, optionally
+    keeping the untouched upload next to it.
+    Returns (public url, object name, original object name or None).
+
+    A StagedUpload (already streamed into MinIO by the upload handler) is
+    read by GDAL with range requests, kept by a server-side copy and its
+    staging object removed once stored (or rejected as not a raster); on
+    other errors it is left in place so the ingest job can be retried.
+    """
+    from .upload_handlers import StagedUpload
+
+    staged = isinstance(uploaded, StagedUpload)
+    if staged:
+        src_path, cleanup = uploaded.gdal_path(mm), False
+    else:
+        src_path, cleanup = _staged_upload_path(uploaded)
+    fd, cog_path = tempfile.mkstemp(suffix=".tif")
+    os.close(fd)
+    try:
+        try:
+            to_cog(src_path, cog_path)
+        except ValueError:
+            if staged:
+                uploaded.discard(mm)
+            raise
+
+        object_name = safe_object_name(prefix, "cog.tif")
+        url = mm.put_file(bucket, object_name, cog_path, content_type="image/tiff")
+
+        original_object = None
+        if keep_original:
+            original_object = safe_object_name(f"{prefix}/original", uploaded.name)
+            if staged:
+                mm.copy_object(uploaded.bucket, uploaded.object_name, bucket, original_object)
+            else:
+                mm.put_file(bucket, original_object, src_path, content_type="image/tiff")
+    finally:
+        os.unlink(cog_path)
+        if cleanup:
+            os.unlink(src_path)
+
+    if staged:
+        uploaded.discard(mm)
+    return url, object_name, original_object
+
+
+def keep_original_requested(value) -> bool:
+    if value in (None, ""):
+        return bool(getattr(settings, "COG_KEEP_ORIGINAL", False))
+    return str(value).strip().lower() in ("1", "true", "yes", "on")
+
+
+class DuplicateUpload(Exception):
+    """The uploaded bytes are already stored as `existing`."""
+
+    def __init__(self, existing):
+        super().__init__(f"Same content as {existing.__class__.__name__} {existing.id}")
+        self.existing = existing
+
+
+def raster_model(kind: str):
+    from fire.models import IndexLayer, SatelliteImage
+
+    return {"satellite": SatelliteImage, "index": IndexLayer}[kind]
+
+
+def find_duplicate(kind: str, sha256: str):
+    """Row already holding an upload with this SHA-256, or None."""
+    if not sha256:
+        return None
+    return raster_model(kind).objects.filter(content_sha256=sha256.lower()).first()
+
+
+def claim_content_hash(obj, kind: str, sha256: str) -> None:
+    """
+    Record the upload hash on obj. Raises DuplicateUpload when another row
+    has it (the unique index settles concurrent uploads of the same file).
+    """
+    from django.db import IntegrityError, transaction
+
+    sha256 = sha256.lower()
+    existing = raster_model(kind).objects.filter(content_sha256=sha256).exclude(id=obj.id).first()
+    if existing is not None:
+        raise DuplicateUpload(existing)
+    obj.content_sha256 = sha256
+    try:
+        with transaction.atomic():
+            obj.save(update_fields=["content_sha256"])
+    except IntegrityError:
+        obj.content_sha256 = None
+        raise DuplicateUpload(raster_model(kind).objects.get(content_sha256=sha256))
+
+
+def object_sha256(mm, bucket: str, object_name: str) -> str:
+    """SHA-256 of a MinIO object, streamed (for uploads not hashed on arrival)."""
+    import hashlib
+
+    h = hashlib.sha256()
+    resp = mm.client.get_object(bucket, object_name)
+    try:
+        for chunk in resp.stream(1024 * 1024):
+            h.update(chunk)
+    finally:
+        resp.close()
+        resp.release_conn()
+    return h.hexdigest()
+
+
+def ingest_staged(obj, kind: str, staged, keep_original=False, expected_sha256=None) -> None:
+    """
+    Staged upload -> COG in MinIO -> GeoServer for a "pending" row.
+    ValueError (not a raster, or not the expected_sha256 the client
+    declared) marks the row failed and releases its content hash;
+    DuplicateUpload means the bytes are already stored (obj is left
+    untouched, staging object dropped); other errors propagate with the
+    staging object kept, so the caller can retry (and, once out of
+    attempts, the job's failure hook fails the row and releases the hash).
+    """
+    _, _, version_layer = RASTER_KINDS[kind]
+
+    if not obj.minio_object:
+        from .minio_manager import MinioManager
+
+        mm = MinioManager()
+        sha256 = staged.sha256 or object_sha256(mm, staged.bucket, staged.object_name)
+        if expected_sha256 and sha256 != expected_sha256.lower():
+            obj.status = "failed"
+            obj.error_message = "Uploaded content does not match the declared sha256."
+            obj.content_sha256 = None  # nothing stored: do not answer later uploads with this row
+            obj.save(update_fields=["status", "error_message", "content_sha256"])
+            bump_layer_version(version_layer)
+            staged.discard(mm)
+            raise ValueError(obj.error_message)
+        if obj.content_sha256 != sha256:
+            try:
+                claim_content_hash(obj, kind, sha256)
+            except DuplicateUpload:
+                staged.discard(mm)
+                raise
+
+        try:
+            url, object_name, original_object = store_uploaded_geotiff(
+                mm, staged, obj.minio_bucket, kind, keep_original=keep_original,
+            )
+        except ValueError as e:
+            obj.status = "failed"
+            obj.error_message = str(e)
+            obj.content_sha256 = None  # nothing stored: do not answer later uploads with this row
+            obj.save(update_fields=["status", "error_message", "content_sha256"])
+            bump_layer_version(version_layer)
+            raise
+
+        obj.minio_link = url
+        obj.minio_object = object_name
+        obj.original_object = original_object
+        obj.status = "minio_ok"
+        obj.error_message = None
+        obj.save(update_fields=["minio_link", "minio_object", "original_object", "status", "error_message"])
+        bump_layer_version(version_layer)
+
+    publish_raster(obj, kind)
+
+
+def staged_ingest_payload(obj, kind: str, staged, keep_original=False, expected_sha256=None) -> dict:
+    return {
+        "kind": kind,
+        "id": obj.id,
+        "staging_bucket": staged.bucket,
+        "staging_object": staged.object_name,
+        "file_name": staged.name,
+        "size": staged.size,
+        "sha256": staged.sha256,
+        "expected_sha256": expected_sha256,
+        "keep_original": bool(keep_original),
+    }
+
+
+def enqueue_staged_ingest(obj, kind: str, staged, keep_original=False, expected_sha256=None):
+    """
+    Queue COG conversion + MinIO + publish of a StagedUpload for a new
+    (status "pending") SatelliteImage/IndexLayer row. The job owns the
+    staging object from here on.
+    """
+    from .jobs import enqueue
+
+    job = enqueue("ingest_raster", staged_ingest_payload(obj, kind, staged, keep_original, expected_sha256))
+    staged.release()
+    return job
+
+
+def schedule_zonal_stats(index_layer_id: int):
+    """
+    Post-publish: per-county/forest statistics for the new layer, computed
+    by a background job.
+    """
+    from .jobs import enqueue
+
+    if not getattr(settings, "ZONAL_STATS_ON_PUBLISH", True):
+        return
+    enqueue("compute_zonal_stats", {"index_layer_id": index_layer_id})
+
+
+def schedule_datacube_append(index_layer_id: int):
+    """Post-publish: append the new layer to its index_name datacube."""
+    from .jobs import enqueue
+
+    if not getattr(settings, "DATACUBE_ON_PUBLISH", True):
+        return
+    enqueue("update_datacube", {"index_layer_id": index_layer_id})
+
+
+def publish_raster(obj, kind: str) -> None:
+    """
+    Publish a SatelliteImage/IndexLayer whose GeoTIFF is already in MinIO
+    (obj.minio_bucket / obj.minio_object) and record the outcome on obj.
+    On failure obj is marked publish_failed and the exception re-raised.
+    """
+    prefix, name_attr, version_layer = RASTER_KINDS[kind]
+
+    try:
+        base_url_internal, user, pwd, ws = geoserver_cfg()
+        if not base_url_internal or not user or not pwd:
+            raise Exception("GeoServer settings missing (GEOSERVER_BASE_URL_INTERNAL / GEOSERVER_ADMIN_USER / GEOSERVER_ADMIN_PASSWORD).")
+
+        gs = GeoServerManager(base_url=base_url_internal, username=user, password=pwd, workspace=ws)
+
+        store_name = f"{prefix}_{slug(getattr(obj, name_attr))}_{obj.id}"
+        layer_name = store_name
+
+        gs.publish_geotiff_from_minio(
+            minio_internal_url=minio_internal_url(bucket=obj.minio_bucket, object_name=obj.minio_object),
+            store_name=store_name,
+            layer_name=layer_name,
+            # stored objects are COGs: GeoServer range-reads them from MinIO
+            cog=getattr(settings, "GEOSERVER_COG_STORES", True),
+        )
+
+        public_base = geoserver_public_base()
+
+        obj.geoserver_workspace = ws
+        obj.geoserver_store = store_name
+        obj.geoserver_layer = f"{ws}:{layer_name}"
+        obj.wms_url = f"{public_base}/wms"
+        obj.wmts_url = f"{public_base}/gwc/service/wmts"
+        obj.status = "published"
+        obj.is_published = True
+        obj.error_message = None
+        obj.save(update_fields=[
+            "geoserver_workspace", "geoserver_store", "geoserver_layer",
+            "wms_url", "wmts_url", "status", "is_published", "error_message"
+        ])
+        bump_layer_version(version_layer)
+
+    except Exception as e:
+        obj.status = "publish_failed"
+        obj.error_message = str(e)
+        obj.save(update_fields=["status", "error_message"])
+        bump_layer_version(version_layer)
+        raise
+
+    if kind == "index":
+        schedule_zonal_stats(obj.id)
+        schedule_datacube_append(obj.id)
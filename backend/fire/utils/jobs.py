@@ -0,0 +1,358 @@
+# fire/utils/jobs.py
+"""
+Postgres-backed job queue (table fire_jobs), no external broker.
+
+    enqueue("publish_raster", {"kind": "index", "id": 12})
+
+Workers (manage.py run_jobs) claim ready jobs with
+SELECT ... FOR UPDATE SKIP LOCKED, so any number of them can poll the
+same table without handing a job out twice. A failing job is retried
+with exponential backoff + jitter until max_attempts. While a job runs,
+its worker refreshes locked_at every JOB_HEARTBEAT_SECONDS; a job whose
+worker died stops heartbeating and is picked up again once its lock is
+older than JOB_LOCK_TIMEOUT. When a job fails for good, the failure hook
+of its kind (JOB_FAILURE_HANDLERS) marks the catalog rows it was
+working on as failed.
+
+With JOBS_RUN_INLINE = True, enqueue() runs the job in-process (tests,
+local development without a worker).
+"""
+import hashlib
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_BASE_SECONDS = 10
+BACKOFF_MAX_SECONDS = 3600
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying cannot help (bad input)."""
+
+
+# ---- handlers: payload dict -> JSON-serializable result ---------------------
+
+def _raster_model(kind: str):
+    from .ingest import raster_model
+
+    return raster_model(kind)
+
+
+def staged_from_payload(payload):
+    from .upload_handlers import StagedUpload
+
+    return StagedUpload(
+        bucket=payload["staging_bucket"],
+        object_name=payload["staging_object"],
+        name=payload.get("file_name"),
+        content_type="image/tiff",
+        size=payload.get("size"),
+        sha256=payload.get("sha256"),
+    )
+
+
+def _ingest_raster(payload):
+    """
+    Staged upload -> COG in MinIO -> publish. The DB row already exists
+    (status "pending"); the staging object is consumed on success.
+    """
+    from fire.models import UploadSession
+    from .ingest import RASTER_KINDS, DuplicateUpload, ingest_staged
+    from .versioning import bump_layer_version
+
+    kind = payload["kind"]
+    obj = _raster_model(kind).objects.get(id=payload["id"])
+    try:
+        ingest_staged(obj, kind, staged_from_payload(payload), keep_original=payload.get("keep_original"),
+                      expected_sha256=payload.get("expected_sha256"))
+    except ValueError as e:
+        raise PermanentJobError(str(e))
+    except DuplicateUpload as e:
+        # hash only known now (resumable upload): fold the new row into the existing one
+        UploadSession.objects.filter(kind=kind, object_id=obj.id).update(object_id=e.existing.id)
+        obj.delete()
+        bump_layer_version(RASTER_KINDS[kind][2])
+        return {"id": e.existing.id, "duplicate_of": e.existing.id, "status": e.existing.status,
+                "minio_link": e.existing.minio_link}
+    return {"id": obj.id, "status": obj.status, "geoserver_layer": obj.geoserver_layer, "minio_link": obj.minio_link}
+
+
+def _bulk_ingest(payload):
+    from .bulk import run_bulk_ingest
+
+    return run_bulk_ingest(payload)
+
+
+def _publish_raster(payload):
+    from .ingest import publish_raster
+
+    obj = _raster_model(payload["kind"]).objects.get(id=payload["id"])
+    publish_raster(obj, payload["kind"])
+    return {"id": obj.id, "status": obj.status, "geoserver_layer": obj.geoserver_layer}
+
+
+def _compute_zonal_stats(payload):
+    from fire.models import IndexLayer
+    from .zonal import BATCH_ZONE_TYPES, store_layer_zone_stats
+
+    obj = IndexLayer.objects.get(id=payload["index_layer_id"])
+    n = store_layer_zone_stats(obj, tuple(payload.get("zone_types") or BATCH_ZONE_TYPES))
+    return {"zone_rows": n}
+
+
+def _update_datacube(payload):
+    from fire.models import IndexLayer
+    from .datacube import DataCube
+    from .zonal import raster_path
+
+    obj = IndexLayer.objects.get(id=payload["index_layer_id"])
+    return {"t": DataCube(obj.index_name).append(obj, raster_path(obj))}
+
+
+def _derive_index_layer(payload):
+    from django.utils.dateparse import parse_date
+    from .bandmath import create_derived_index_layer
+
+    inputs = {
+        name: (_raster_model(kind).objects.get(id=obj_id), band)
+        for name, (kind, obj_id, band) in payload["inputs"].items()
+    }
+    try:
+        obj = create_derived_index_layer(
+            payload["expression"], inputs, payload.get("grid"), title=payload["title"],
+            index_name=payload["index_name"], date=parse_date(payload["date"]),
+            satellite_name=payload.get("satellite_name"),
+            # retries reuse what an earlier attempt created
+            key=payload.get("request_key")
+            or hashlib.sha1(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest(),
+        )
+    except ValueError as e:
+        raise PermanentJobError(str(e))
+    if obj.status == "publish_failed":
+        # the raster is stored; only the GeoServer step is retried
+        enqueue("publish_raster", {"kind": "index", "id": obj.id}, delay_seconds=BACKOFF_BASE_SECONDS)
+    return {"id": obj.id, "status": obj.status}
+
+
+# ---- failure hooks: (payload, error message), run once a job fails for good --
+
+def mark_rows_failed(kind: str, ids, error: str) -> int:
+    """
+    Raster rows still waiting on ingest -> "failed" with the job's error.
+    Rows with nothing stored in MinIO also give up their content hash, so
+    a re-upload of the same bytes is ingested instead of answered with
+    the dead row.
+    """
+    from .ingest import RASTER_KINDS
+    from .versioning import bump_layer_version
+
+    qs = _raster_model(kind).objects.filter(id__in=ids, status__in=("pending", "minio_ok"))
+    n = qs.filter(Q(minio_object__isnull=True) | Q(minio_object="")) \
+        .update(status="failed", error_message=error, content_sha256=None)
+    n += qs.update(status="failed", error_message=error)
+    if n:
+        bump_layer_version(RASTER_KINDS[kind][2])
+    return n
+
+
+def _ingest_raster_failed(payload, error):
+    mark_rows_failed(payload["kind"], [payload["id"]], error)
+
+
+def _bulk_ingest_failed(payload, error):
+    from fire.models import Job
+
+    ids = [it["id"] for it in payload["items"]]
+    # items handed to their own ingest_raster retry job are settled by that job
+    retrying = Job.objects.filter(
+        kind="ingest_raster", status__in=("queued", "running"),
+        payload__kind=payload["kind"], payload__id__in=ids,
+    ).values_list("payload__id", flat=True)
+    mark_rows_failed(payload["kind"], set(ids) - set(retrying), error)
+
+
+JOB_HANDLERS = {
+    "ingest_raster": _ingest_raster,
+    "bulk_ingest": _bulk_ingest,
+    "publish_raster": _publish_raster,
+    "compute_zonal_stats": _compute_zonal_stats,
+    "update_datacube": _update_datacube,
+    "derive_index_layer": _derive_index_layer,
+}
+
+JOB_FAILURE_HANDLERS = {
+    "ingest_raster": _ingest_raster_failed,
+    "bulk_ingest": _bulk_ingest_failed,
+}
+
+
+# ---- queue ------------------------------------------------------------------
+
+def enqueue(kind: str, payload: dict, max_attempts: int = 5, delay_seconds: int = 0):
+    from fire.models import Job
+
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    job = Job.objects.create(
+        kind=kind,
+        payload=payload,
+        max_attempts=max_attempts,
+        run_after=timezone.now() + timedelta(seconds=delay_seconds),
+    )
+    if getattr(settings, "JOBS_RUN_INLINE", False):
+        # after commit, like a worker would see it
+        transaction.on_commit(lambda: run_next(job_id=job.id))
+    return job
+
+
+def backoff_seconds(attempt: int) -> float:
+    """Exponential backoff with +-50% jitter (spreads retries of a burst)."""
+    delay = min(BACKOFF_BASE_SECONDS * 2 ** max(attempt - 1, 0), BACKOFF_MAX_SECONDS)
+    return delay * random.uniform(0.5, 1.5)
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim_job(kinds=None, job_id=None):
+    """
+    Lock and mark running the oldest ready job (or job_id), or None.
+    Also reclaims running jobs whose lock expired (dead worker).
+    """
+    from fire.models import Job
+
+    now = timezone.now()
+    stale = now - timedelta(seconds=getattr(settings, "JOB_LOCK_TIMEOUT", 3600))
+    qs = Job.objects.filter(
+        Q(status="queued", run_after__lte=now) | Q(status="running", locked_at__lt=stale)
+    )
+    if kinds:
+        qs = qs.filter(kind__in=kinds)
+    if job_id is not None:
+        qs = qs.filter(id=job_id)
+
+    with transaction.atomic():
+        job = qs.select_for_update(skip_locked=True).order_by("run_after", "id").first()
+        if job is None:
+            return None
+        job.status = "running"
+        job.attempts += 1
+        job.locked_by = worker_name()
+        job.locked_at = now
+        job.save(update_fields=["status", "attempts", "locked_by", "locked_at", "updated_at"])
+    return job
+
+
+def heartbeat_seconds() -> float:
+    timeout = getattr(settings, "JOB_LOCK_TIMEOUT", 3600)
+    return getattr(settings, "JOB_HEARTBEAT_SECONDS", min(60, timeout / 3))
+
+
+class Heartbeat(threading.Thread):
+    """Keeps a running job's lock fresh (own DB connection) until stop()."""
+
+    def __init__(self, job):
+        super().__init__(name=f"job-{job.id}-heartbeat", daemon=True)
+        self.job_id = job.id
+        self.worker = job.locked_by
+        self.interval = heartbeat_seconds()
+        self._stopped = threading.Event()
+
+    def run(self):
+        from django.db import connection
+        from fire.models import Job
+
+        try:
+            while not self._stopped.wait(self.interval):
+                Job.objects.filter(id=self.job_id, status="running", locked_by=self.worker) \
+                    .update(locked_at=timezone.now())
+        finally:
+            connection.close()
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+def on_final_failure(job, error: Exception) -> None:
+    """Run the failure hook of job.kind; its own errors are only logged."""
+    hook = JOB_FAILURE_HANDLERS.get(job.kind)
+    if hook is None:
+        return
+    try:
+        hook(job.payload, str(error) or error.__class__.__name__)
+    except Exception:
+        logger.exception("failure hook of job %s (%s) failed", job.id, job.kind)
+
+
+def run_job(job) -> None:
+    """Run a claimed job and record success / retry / failure."""
+    heartbeat = Heartbeat(job)
+    heartbeat.start()
+    try:
+        result = JOB_HANDLERS[job.kind](job.payload)
+    except Exception as e:
+        heartbeat.stop()
+        job.error = f"{e}\n\n{traceback.format_exc()}"
+        final = isinstance(e, (PermanentJobError, ObjectDoesNotExist)) or job.attempts >= job.max_attempts
+        if final:
+            job.status = "failed"
+            job.finished_at = timezone.now()
+        else:
+            job.status = "queued"
+            job.run_after = timezone.now() + timedelta(seconds=backoff_seconds(job.attempts))
+        job.locked_by = None
+        job.locked_at = None
+        job.save(update_fields=["status", "error", "run_after", "finished_at", "locked_by", "locked_at", "updated_at"])
+        if final:
+            on_final_failure(job, e)
+        return
+    heartbeat.stop()
+
+    job.status = "succeeded"
+    job.result = result
+    job.error = None
+    job.finished_at = timezone.now()
+    job.locked_by = None
+    job.locked_at = None
+    job.save(update_fields=["status", "result", "error", "finished_at", "locked_by", "locked_at", "updated_at"])
+
+
+def run_next(kinds=None, job_id=None) -> bool:
+    """Claim and run one job; False when nothing is ready."""
+    job = claim_job(kinds=kinds, job_id=job_id)
+    if job is None:
+        return False
+    run_job(job)
+    return True
+
+
+def job_dict(job) -> dict:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "run_after": job.run_after,
+        "result": job.result,
+        "error": (job.error or "").split("\n\n", 1)[0] or None,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+        "finished_at": job.finished_at,
+    }
@@ -1,25 +1,290 @@
 # fire/utils/minio_manager.py
+"""
+MinIO access. One Minio client per process (per endpoint) is shared by
+every MinioManager: its urllib3 pool keeps connections alive across
+uploads and threads, and the fixed region spares the per-bucket location
+lookup a fresh client would make. Buckets already ensured (existence,
+public policy, lifecycle) are remembered for MINIO_BUCKET_CACHE_TTL
+seconds, so uploads do not re-check them every time.
+"""
+import hashlib
+import io
 import os
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from urllib.parse import urlsplit
+
 from minio import Minio
 from minio.error import S3Error
 
 
+# S3 multipart: every part but the last must be >= 5 MiB
+MIN_PART_SIZE = 5 * 1024 * 1024
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+DEFAULT_PART_CONCURRENCY = 4
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name) or default)
+    except ValueError:
+        return default
+
+
+# ---- process-wide clients ----------------------------------------------------
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _http_pool():
+    """
+    urllib3 pool shared by a client's threads (bulk ingest workers x
+    concurrent parts): sized so they do not open throwaway connections.
+    """
+    import certifi
+    import urllib3
+    from urllib3.util import Retry, Timeout
+
+    return urllib3.PoolManager(
+        num_pools=_env_int("MINIO_HTTP_NUM_POOLS", 4),
+        maxsize=_env_int("MINIO_HTTP_POOL_SIZE", 32),
+        timeout=Timeout(connect=_env_int("MINIO_CONNECT_TIMEOUT", 10), read=_env_int("MINIO_READ_TIMEOUT", 300)),
+        cert_reqs="CERT_REQUIRED",
+        ca_certs=os.environ.get("SSL_CERT_FILE") or certifi.where(),
+        retries=Retry(total=5, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504]),
+    )
+
+
+def shared_client(endpoint: str, access_key: str, secret_key: str, secure: bool, signing_only=False) -> Minio:
+    """
+    Minio client for this process (re-created after a fork). Minio is
+    thread-safe; signing_only clients never send requests and get no pool.
+    """
+    key = (os.getpid(), endpoint, access_key, secure, signing_only)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = Minio(
+                    endpoint=endpoint,
+                    access_key=access_key,
+                    secret_key=secret_key,
+                    secure=secure,
+                    region=os.getenv("MINIO_REGION", "us-east-1"),
+                    http_client=None if signing_only else _http_pool(),
+                )
+                _clients[key] = client
+    return client
+
+
+class BucketCache:
+    """
+    Bucket states this process already ensured ("exists", "public",
+    "lifecycle:<days>"). Entries expire after ttl seconds, so a
+    bucket removed or re-configured elsewhere is checked again; operations
+    failing with NoSuchBucket invalidate it at once.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._states = {}
+
+    def has(self, bucket: str, state: str) -> bool:
+        expires = self._states.get((bucket, state))
+        return expires is not None and expires > time.monotonic()
+
+    def add(self, bucket: str, state: str) -> None:
+        with self._lock:
+            self._states[(bucket, state)] = time.monotonic() + self.ttl
+
+    def invalidate(self, bucket: str = None) -> None:
+        with self._lock:
+            if bucket is None:
+                self._states.clear()
+            else:
+                for key in [k for k in self._states if k[0] == bucket]:
+                    del self._states[key]
+
+
+bucket_cache = BucketCache(ttl=_env_int("MINIO_BUCKET_CACHE_TTL", 300))
+
+
+class MultipartWriter:
+    """
+    Write-only stream into a MinIO multipart upload. Data is buffered up to
+    one part and hashed (sha256) as it goes; full parts are uploaded by up
+    to `concurrency` threads while the caller keeps writing, so memory
+    stays at part_size x (concurrency + 1) whatever the object size.
+    close() completes the upload, abort() drops it.
+    """
+
+    def __init__(self, client, bucket: str, object_name: str, content_type: str, part_size: int,
+                 concurrency: int = DEFAULT_PART_CONCURRENCY, checksum: bool = True):
+        self.client = client
+        self.bucket = bucket
+        self.object_name = object_name
+        self.part_size = max(int(part_size), MIN_PART_SIZE)
+        self.size = 0
+        self.sha256 = hashlib.sha256() if checksum else None
+        self._buf = bytearray()
+        self._next_part = 1
+        self._pending = []  # futures -> Part, in part order
+        self._parts = []
+        self._upload_id = client._create_multipart_upload(bucket, object_name, {"Content-Type": content_type})
+        self._concurrency = max(1, int(concurrency))
+        self._pool = ThreadPoolExecutor(max_workers=self._concurrency) if self._concurrency > 1 else None
+
+    def write(self, data) -> int:
+        if self.sha256 is not None:
+            self.sha256.update(data)
+        self.size += len(data)
+        if not self._buf and len(data) == self.part_size:
+            self._flush(bytes(data))  # whole part: no buffer copy
+            return len(data)
+        self._buf += data
+        while len(self._buf) >= self.part_size:
+            self._flush(bytes(self._buf[:self.part_size]))
+            del self._buf[:self.part_size]
+        return len(data)
+
+    def _upload(self, n: int, data: bytes):
+        from minio.datatypes import Part
+
+        return Part(n, self.client._upload_part(self.bucket, self.object_name, data, None, self._upload_id, n))
+
+    def _flush(self, data: bytes):
+        n, self._next_part = self._next_part, self._next_part + 1
+        if self._pool is None:
+            self._parts.append(self._upload(n, data))
+            return
+        # bounded in flight: wait for the oldest part (re-raises its error)
+        while len(self._pending) >= self._concurrency:
+            self._parts.append(self._pending.pop(0).result())
+        self._pending.append(self._pool.submit(self._upload, n, data))
+
+    def _drain(self):
+        while self._pending:
+            self._parts.append(self._pending.pop(0).result())
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def close(self):
+        """Complete the upload; returns (size, sha256 hex or None)."""
+        if self._buf or self._next_part == 1:
+            self._flush(bytes(self._buf))
+            self._buf = bytearray()
+        self._drain()
+        try:
+            self.client._complete_multipart_upload(self.bucket, self.object_name, self._upload_id, self._parts)
+        except S3Error as e:
+            raise Exception(f"MinIO complete_multipart_upload failed: {str(e)}")
+        return self.size, self.sha256.hexdigest() if self.sha256 is not None else None
+
+    def abort(self):
+        self._buf = bytearray()
+        for future in self._pending:
+            future.cancel()
+        self._pending = []
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        try:
+            self.client._abort_multipart_upload(self.bucket, self.object_name, self._upload_id)
+        except S3Error:
+            pass
+
+
+class ObjectReader(io.RawIOBase):
+    """
+    Seekable, read-only view of a MinIO object through ranged GETs, e.g.
+    for zipfile (central directory at the end). Wrap it in a
+    BufferedReader (MinioManager.open_object) so reads are batched.
+    """
+
+    def __init__(self, client, bucket: str, object_name: str):
+        super().__init__()
+        self.client = client
+        self.bucket = bucket
+        self.object_name = object_name
+        self.size = client.stat_object(bucket, object_name).size
+        self.pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self.pos, io.SEEK_END: self.size}[whence]
+        self.pos = max(base + offset, 0)
+        return self.pos
+
+    def readinto(self, b):
+        n = min(len(b), self.size - self.pos)
+        if n <= 0:
+            return 0
+        resp = self.client.get_object(self.bucket, self.object_name, offset=self.pos, length=n)
+        try:
+            data = resp.read()
+        finally:
+            resp.close()
+            resp.release_conn()
+        b[:len(data)] = data
+        self.pos += len(data)
+        return len(data)
+
+
+def _missing_bucket(e: S3Error) -> bool:
+    return e.code == "NoSuchBucket"
+
+
 class MinioManager:
+    """Cheap to create: the client and bucket state are shared per process."""
+
     def __init__(self):
         endpoint = os.getenv("MINIO_ENDPOINT", "minio:9000")
         access_key = os.getenv("MINIO_ACCESS_KEY") or os.getenv("MINIO_ROOT_USER", "minioadmin")
         secret_key = os.getenv("MINIO_SECRET_KEY") or os.getenv("MINIO_ROOT_PASSWORD", "minioadmin")
         secure = (os.getenv("MINIO_SECURE", "false").lower() == "true")
 
-        self.client = Minio(
-            endpoint=endpoint,
-            access_key=access_key,
-            secret_key=secret_key,
-            secure=secure,
-        )
+        self.client = shared_client(endpoint, access_key, secret_key, secure)
 
         self.public_base = os.getenv("MINIO_PUBLIC_BASE_URL", "http://localhost:9000").rstrip("/")
+        self._credentials = (access_key, secret_key)
+
+    @property
+    def public_client(self) -> Minio:
+        """
+        Client on the browser-facing endpoint, only used to sign URLs (the
+        signature covers the Host header). The region is fixed so signing
+        never makes a request.
+        """
+        url = urlsplit(self.public_base)
+        return shared_client(url.netloc, *self._credentials, secure=url.scheme == "https", signing_only=True)
+
+    def _make_bucket(self, bucket: str) -> None:
+        """Create the bucket unless it exists (cached)."""
+        if bucket_cache.has(bucket, "exists"):
+            return
+        if not self.client.bucket_exists(bucket):
+            try:
+                self.client.make_bucket(bucket)
+            except S3Error as e:
+                # created by another worker in the meantime
+                if e.code not in ("BucketAlreadyOwnedByYou", "BucketAlreadyExists"):
+                    raise
+        bucket_cache.add(bucket, "exists")
 
     def _bucket_policy_public_download(self, bucket: str) -> str:
         # Allows anonymous GET object
@@ -45,10 +310,11 @@ class MinioManager:
         if not bucket:
             raise ValueError("bucket is empty")
 
+        if bucket_cache.has(bucket, "public"):
+            return
+
         try:
-            found = self.client.bucket_exists(bucket)
-            if not found:
-                self.client.make_bucket(bucket)
+            self._make_bucket(bucket)
         except S3Error as e:
             raise Exception(f"MinIO bucket_exists/make_bucket failed: {str(e)}")
 
@@ -56,29 +322,220 @@ class MinioManager:
         try:
             self.client.set_bucket_policy(bucket, self._bucket_policy_public_download(bucket))
         except S3Error as e:
+            if _missing_bucket(e):
+                bucket_cache.invalidate(bucket)
             raise Exception(f"MinIO set_bucket_policy failed for {bucket}: {str(e)}")
+        bucket_cache.add(bucket, "public")
 
-    def put_bytes(self, bucket: str, object_name: str, content: bytes, content_type: str = "application/octet-stream"):
-        from io import BytesIO
+    def ensure_bucket(self, bucket: str, expire_days: int = 0) -> None:
+        """
+        Ensure a private bucket exists. With expire_days, objects (and
+        abandoned multipart uploads) are removed by a lifecycle rule.
+        """
+        from minio.commonconfig import ENABLED, Filter
+        from minio.lifecycleconfig import AbortIncompleteMultipartUpload, Expiration, LifecycleConfig, Rule
+
+        lifecycle = f"lifecycle:{expire_days}"
+        if bucket_cache.has(bucket, lifecycle if expire_days else "exists"):
+            return
+        try:
+            self._make_bucket(bucket)
+            if expire_days:
+                self.client.set_bucket_lifecycle(bucket, LifecycleConfig([Rule(
+                    ENABLED,
+                    rule_filter=Filter(prefix=""),
+                    rule_id="expire-staging",
+                    expiration=Expiration(days=expire_days),
+                    abort_incomplete_multipart_upload=AbortIncompleteMultipartUpload(days_after_initiation=expire_days),
+                )]))
+                bucket_cache.add(bucket, lifecycle)
+        except S3Error as e:
+            bucket_cache.invalidate(bucket)
+            raise Exception(f"MinIO ensure_bucket failed for {bucket}: {str(e)}")
+
+    def open_multipart(self, bucket: str, object_name: str, content_type: str = "application/octet-stream",
+                       part_size: int = DEFAULT_PART_SIZE, concurrency: int = None) -> MultipartWriter:
+        """
+        Streaming upload: write() chunks as they arrive, then close().
+        Parts go up `concurrency` at a time (MINIO_PART_CONCURRENCY).
+        The bucket must already exist.
+        """
+        if concurrency is None:
+            concurrency = _env_int("MINIO_PART_CONCURRENCY", DEFAULT_PART_CONCURRENCY)
+        try:
+            return MultipartWriter(self.client, bucket, object_name, content_type, part_size, concurrency)
+        except S3Error as e:
+            if _missing_bucket(e):
+                bucket_cache.invalidate(bucket)
+            raise Exception(f"MinIO create_multipart_upload failed: {str(e)}")
+
+    # ---- low-level multipart (resumable sessions keep the state in the DB) ----
+
+    def create_multipart(self, bucket: str, object_name: str, content_type: str = "application/octet-stream") -> str:
+        try:
+            return self.client._create_multipart_upload(bucket, object_name, {"Content-Type": content_type})
+        except S3Error as e:
+            raise Exception(f"MinIO create_multipart_upload failed: {str(e)}")
+
+    def upload_part(self, bucket: str, object_name: str, upload_id: str, part_number: int, data: bytes) -> str:
+        """Upload (or replace) one part; returns its ETag."""
+        try:
+            return self.client._upload_part(bucket, object_name, data, None, upload_id, part_number)
+        except S3Error as e:
+            raise Exception(f"MinIO upload_part failed: {str(e)}")
+
+    def complete_multipart(self, bucket: str, object_name: str, upload_id: str, parts) -> None:
+        """parts: [(part number, etag)] in ascending order."""
+        from minio.datatypes import Part
+
+        try:
+            self.client._complete_multipart_upload(
+                bucket, object_name, upload_id, [Part(n, etag) for n, etag in parts]
+            )
+        except S3Error as e:
+            raise Exception(f"MinIO complete_multipart_upload failed: {str(e)}")
+
+    def abort_multipart(self, bucket: str, object_name: str, upload_id: str) -> None:
+        try:
+            self.client._abort_multipart_upload(bucket, object_name, upload_id)
+        except S3Error:
+            pass
+
+    def list_parts(self, bucket: str, object_name: str, upload_id: str):
+        """Parts uploaded so far: [(part number, etag, size)] in ascending order."""
+        parts, marker = [], None
+        try:
+            while True:
+                result = self.client._list_parts(bucket, object_name, upload_id, part_number_marker=marker)
+                parts += [(p.part_number, p.etag, p.size) for p in result.parts]
+                if not result.is_truncated:
+                    break
+                marker = result.next_part_number_marker
+        except S3Error as e:
+            raise Exception(f"MinIO list_parts failed: {str(e)}")
+        return parts
+
+    def presigned_put(self, bucket: str, object_name: str, expires_seconds: int = 3600,
+                      upload_id: str = None, part_number: int = None) -> str:
+        """
+        Time-limited PUT URL on the public endpoint, for the object or (with
+        upload_id) for one part of a multipart upload. Browsers upload
+        straight to MinIO with it.
+        """
+        params = {"uploadId": upload_id, "partNumber": str(part_number)} if upload_id else None
+        return self.public_client.get_presigned_url(
+            "PUT", bucket, object_name, expires=timedelta(seconds=expires_seconds), extra_query_params=params,
+        )
+
+    def copy_object(self, src_bucket: str, src_object: str, bucket: str, object_name: str) -> str:
+        """
+        Server-side copy (any size; no bytes pass through Django).
+        """
+        from minio.commonconfig import ComposeSource
 
         self.ensure_bucket_public(bucket)
+        try:
+            self.client.compose_object(bucket, object_name, [ComposeSource(src_bucket, src_object)])
+        except S3Error as e:
+            raise Exception(f"MinIO compose_object failed: {str(e)}")
+        return f"{self.public_base}/{bucket}/{object_name}"
+
+    def open_object(self, bucket: str, object_name: str, buffer_size: int = 1024 * 1024):
+        """Seekable binary file over a MinIO object (ranged GETs of buffer_size)."""
+        return io.BufferedReader(ObjectReader(self.client, bucket, object_name), buffer_size=buffer_size)
+
+    def read_range(self, bucket: str, object_name: str, offset: int, length: int) -> bytes:
+        resp = self.client.get_object(bucket, object_name, offset=offset, length=length)
+        try:
+            return resp.read()
+        finally:
+            resp.close()
+            resp.release_conn()
+
+    def remove(self, bucket: str, object_name: str) -> None:
+        try:
+            self.client.remove_object(bucket, object_name)
+        except S3Error:
+            pass
+
+    def presigned_get(self, bucket: str, object_name: str, expires_seconds: int = 3600) -> str:
+        """
+        Time-limited GET URL on the internal endpoint (e.g. for GDAL /vsicurl/
+        reads of private staging objects from inside the docker network).
+        """
+        return self.client.presigned_get_object(bucket, object_name, expires=timedelta(seconds=expires_seconds))
+
+    def _retry_missing_bucket(self, bucket: str, upload):
+        """
+        Run upload(); when the (cached as existing) bucket is gone, forget
+        it, ensure it again and retry once.
+        """
+        self.ensure_bucket_public(bucket)
+        try:
+            return upload()
+        except S3Error as e:
+            if not _missing_bucket(e):
+                raise
+            bucket_cache.invalidate(bucket)
+        self.ensure_bucket_public(bucket)
+        return upload()
+
+    def put_bytes(self, bucket: str, object_name: str, content: bytes, content_type: str = "application/octet-stream"):
+        from io import BytesIO
 
-        data = BytesIO(content)
         length = len(content)
 
         try:
-            self.client.put_object(
+            self._retry_missing_bucket(bucket, lambda: self.client.put_object(
                 bucket_name=bucket,
                 object_name=object_name,
-                data=data,
+                data=BytesIO(content),
                 length=length,
                 content_type=content_type,
-            )
+            ))
         except S3Error as e:
             raise Exception(f"MinIO put_object failed: {str(e)}")
 
         return f"{self.public_base}/{bucket}/{object_name}"
 
+    def put_file(self, bucket: str, object_name: str, file_path: str, content_type: str = "application/octet-stream",
+                 part_size: int = DEFAULT_PART_SIZE):
+        """
+        Upload a local file: one PUT up to part_size, above that a multipart
+        upload with parts sent concurrently (streamed from disk).
+        """
+        def upload():
+            if os.path.getsize(file_path) <= part_size:
+                return self.client.fput_object(
+                    bucket_name=bucket,
+                    object_name=object_name,
+                    file_path=file_path,
+                    content_type=content_type,
+                )
+            return self._put_file_multipart(bucket, object_name, file_path, content_type, part_size)
+
+        try:
+            self._retry_missing_bucket(bucket, upload)
+        except S3Error as e:
+            raise Exception(f"MinIO fput_object failed: {str(e)}")
+
+        return f"{self.public_base}/{bucket}/{object_name}"
+
+    def _put_file_multipart(self, bucket, object_name, file_path, content_type, part_size):
+        writer = MultipartWriter(self.client, bucket, object_name, content_type, part_size,
+                                 _env_int("MINIO_PART_CONCURRENCY", DEFAULT_PART_CONCURRENCY), checksum=False)
+        try:
+            with open(file_path, "rb") as fh:
+                while True:
+                    chunk = fh.read(writer.part_size)
+                    if not chunk:
+                        break
+                    writer.write(chunk)
+            return writer.close()
+        except BaseException:
+            writer.abort()
+            raise
+
     def upload_satellite(self, satellite_name: str, file_name: str, content: bytes) -> str:
         bucket = f"sat-{(satellite_name or '').strip().lower()}"
         return self.put_bytes(bucket, file_name, content, content_type="image/tiff")
@@ -0,0 +1,296 @@
+# fire/utils/resumable.py
+"""
+Resumable uploads. Chunk i of a session is part i+1 of a MinIO multipart
+upload in the staging bucket, so chunks can be sent in any order, in
+parallel, and re-sent after a dropped connection; only the part ETags
+are kept (UploadSession.parts). Finalizing completes the multipart upload
+and hands the object to the regular ingest path.
+
+Each request carries one chunk (RESUMABLE_CHUNK_SIZE, default 16 MiB),
+so neither the proxy body limit nor worker memory bounds the file size.
+
+Direct sessions keep Django out of the data path: the client gets
+presigned PUT URLs (one for the object, or one per part) on the public
+MinIO endpoint and uploads into the private staging bucket. Finalizing
+checks the parts, size and TIFF header from MinIO; the ingest job
+verifies the declared sha256 and only then stores the COG in the public
+sat-*/idx-* bucket, so unverified bytes are never downloadable.
+"""
+import math
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .minio_manager import MIN_PART_SIZE, MinioManager
+
+
+MAX_PARTS = 10000  # S3 multipart limit
+DEFAULT_CHUNK_SIZE = 16 * 1024 * 1024
+SESSION_TTL = timedelta(days=1)  # staging bucket lifecycle aborts older multipart uploads
+COMPLETING_TIMEOUT = timedelta(minutes=10)  # a "completing" session older than this was abandoned
+
+_CONTENT_RANGE = re.compile(r"^bytes (\d+)-(\d+)/(\d+|\*)$")
+
+
+def chunk_size_for(size: int) -> int:
+    """Configured chunk size, grown (in MiB steps) when the file needs more than MAX_PARTS."""
+    chunk = max(int(getattr(settings, "RESUMABLE_CHUNK_SIZE", DEFAULT_CHUNK_SIZE)), MIN_PART_SIZE)
+    if size > chunk * MAX_PARTS:
+        mib = 1024 * 1024
+        chunk = math.ceil(size / MAX_PARTS / mib) * mib
+    return chunk
+
+
+def part_count(session) -> int:
+    return max(1, math.ceil(session.size / session.chunk_size))
+
+
+def _session_chunk_size(size: int) -> int:
+    if size <= 0:
+        raise ValueError("size must be positive.")
+    chunk = chunk_size_for(size)
+    if chunk > getattr(settings, "RESUMABLE_MAX_CHUNK_SIZE", 128 * 1024 * 1024):
+        raise ValueError("File is too large.")
+    return chunk
+
+
+def create_session(kind: str, file_name: str, size: int, metadata: dict, sha256=None):
+    from fire.models import UploadSession
+    from .upload_handlers import staging_bucket, staging_object_name
+
+    chunk = _session_chunk_size(size)
+    mm = MinioManager()
+    bucket, object_name = staging_bucket(), staging_object_name(file_name)
+    mm.ensure_bucket(bucket, expire_days=SESSION_TTL.days)
+    return UploadSession.objects.create(
+        kind=kind,
+        file_name=file_name,
+        size=size,
+        chunk_size=chunk,
+        metadata=metadata,
+        sha256=sha256,
+        staging_bucket=bucket,
+        staging_object=object_name,
+        upload_id=mm.create_multipart(bucket, object_name, "image/tiff"),
+        expires_at=timezone.now() + SESSION_TTL,
+    )
+
+
+def create_direct_session(kind: str, file_name: str, size: int, metadata: dict, sha256=None):
+    """
+    Session whose bytes go browser -> MinIO (staging bucket) through
+    presigned URLs: a single PUT up to one chunk, a multipart upload above.
+    """
+    from fire.models import UploadSession
+    from .upload_handlers import staging_bucket, staging_object_name
+
+    chunk = _session_chunk_size(size)
+    mm = MinioManager()
+    bucket, object_name = staging_bucket(), staging_object_name(file_name)
+    mm.ensure_bucket(bucket, expire_days=SESSION_TTL.days)
+    return UploadSession.objects.create(
+        kind=kind,
+        file_name=file_name,
+        size=size,
+        chunk_size=chunk,
+        metadata=metadata,
+        sha256=sha256,
+        direct=True,
+        staging_bucket=bucket,
+        staging_object=object_name,
+        upload_id=mm.create_multipart(bucket, object_name, "image/tiff") if size > chunk else "",
+        expires_at=timezone.now() + SESSION_TTL,
+    )
+
+
+def direct_upload_urls(session) -> dict:
+    """Fresh presigned PUT URLs of a direct session (ask again once they expire)."""
+    mm = MinioManager()
+    ttl = int(getattr(settings, "DIRECT_UPLOAD_URL_TTL", 3600))
+    if not session.upload_id:
+        return {"method": "PUT", "url": mm.presigned_put(session.staging_bucket, session.staging_object, ttl),
+                "expires_in": ttl}
+    parts = []
+    for n in range(1, part_count(session) + 1):
+        offset = (n - 1) * session.chunk_size
+        parts.append({
+            "part_number": n,
+            "offset": offset,
+            "size": min(session.chunk_size, session.size - offset),
+            "url": mm.presigned_put(session.staging_bucket, session.staging_object, ttl,
+                                    upload_id=session.upload_id, part_number=n),
+        })
+    return {"method": "PUT", "parts": parts, "expires_in": ttl}
+
+
+def chunk_part_number(session, content_range=None, offset=None, length=0) -> int:
+    """
+    Validate where a chunk goes (Content-Range header or ?offset=) and
+    return its part number. Raises ValueError with the 400 detail.
+    """
+    if content_range:
+        m = _CONTENT_RANGE.match(content_range.strip())
+        if not m:
+            raise ValueError("Content-Range must be 'bytes <start>-<end>/<size>'.")
+        start, end = int(m.group(1)), int(m.group(2))
+        if m.group(3) != "*" and int(m.group(3)) != session.size:
+            raise ValueError("Content-Range size does not match the session.")
+        if end - start + 1 != length:
+            raise ValueError("Content-Range does not match the body length.")
+    elif offset is not None:
+        try:
+            start = int(offset)
+        except (TypeError, ValueError):
+            raise ValueError("offset must be an integer.")
+    else:
+        raise ValueError("Content-Range header or offset is required.")
+
+    if start < 0:
+        raise ValueError("offset must not be negative.")
+    if start % session.chunk_size:
+        raise ValueError(f"Chunks must start at a multiple of chunk_size ({session.chunk_size}).")
+    part = start // session.chunk_size + 1
+    expected = min(session.chunk_size, session.size - start)
+    if start >= session.size or length != expected:
+        raise ValueError(f"Chunk at {start} must be {max(expected, 0)} bytes.")
+    return part
+
+
+def put_chunk(session, part_number: int, data: bytes):
+    """Upload one chunk as its multipart part and record the ETag."""
+    from fire.models import UploadSession
+
+    etag = MinioManager().upload_part(session.staging_bucket, session.staging_object,
+                                      session.upload_id, part_number, data)
+    # parallel chunks of one session: merge under a row lock
+    with transaction.atomic():
+        locked = UploadSession.objects.select_for_update().get(pk=session.pk)
+        locked.parts[str(part_number)] = etag
+        locked.save(update_fields=["parts", "updated_at"])
+    return locked
+
+
+def missing_parts(session):
+    return [n for n in range(1, part_count(session) + 1) if str(n) not in session.parts]
+
+
+def session_dict(session) -> dict:
+    received = [int(n) for n in session.parts]
+    received_bytes = sum(min(session.chunk_size, session.size - (n - 1) * session.chunk_size) for n in received)
+    return {
+        "id": str(session.id),
+        "kind": session.kind,
+        "file_name": session.file_name,
+        "size": session.size,
+        "chunk_size": session.chunk_size,
+        "parts": part_count(session),
+        "direct": session.direct,
+        # direct chunks bypass Django: progress is only known to the client
+        "received_bytes": None if session.direct else received_bytes,
+        "missing_parts": None if session.direct else missing_parts(session),
+        "status": session.status,
+        "object_id": session.object_id,
+        "job_id": session.job_id,
+        "expires_at": session.expires_at,
+    }
+
+
+def completing_expired(session) -> bool:
+    """True when a "completing" session was left behind by a request that died."""
+    return session.updated_at < timezone.now() - COMPLETING_TIMEOUT
+
+
+def complete_session(session):
+    """
+    Assemble the parts (server-side) and return the result as a
+    StagedUpload. Raises ValueError while chunks are missing. Safe to
+    repeat after an interrupted attempt: an assembled object is reused.
+    """
+    from .upload_handlers import StagedUpload
+
+    missing = missing_parts(session)
+    if missing:
+        raise ValueError(f"{len(missing)} chunk(s) missing, first: offset "
+                         f"{(missing[0] - 1) * session.chunk_size}.")
+    mm = MinioManager()
+    if _staged_object_size(mm, session) != session.size:
+        mm.complete_multipart(
+            session.staging_bucket, session.staging_object, session.upload_id,
+            sorted((int(n), etag) for n, etag in session.parts.items()),
+        )
+    return StagedUpload(
+        bucket=session.staging_bucket,
+        object_name=session.staging_object,
+        name=session.file_name,
+        content_type="image/tiff",
+        size=session.size,
+        sha256=None,
+    )
+
+
+def _staged_object_size(mm, session):
+    """Size of the uploaded object, or None while it does not exist."""
+    from minio.error import S3Error
+
+    try:
+        return mm.client.stat_object(session.staging_bucket, session.staging_object).size
+    except S3Error as e:
+        if e.code in ("NoSuchKey", "NoSuchObject"):
+            return None
+        raise Exception(f"MinIO stat_object failed: {str(e)}")
+
+
+def complete_direct_session(session):
+    """
+    Verify what the client uploaded (all parts at their expected sizes,
+    object size, TIFF header), completing the multipart upload on the way,
+    and return it as a StagedUpload. Raises ValueError with the 400 detail;
+    a file that is not a TIFF aborts the session.
+    """
+    from .ingest import is_tiff_header
+    from .upload_handlers import StagedUpload
+
+    mm = MinioManager()
+    size = _staged_object_size(mm, session)
+    if size is None and session.upload_id:
+        parts = {n: (etag, part_size) for n, etag, part_size in
+                 mm.list_parts(session.staging_bucket, session.staging_object, session.upload_id)}
+        for n in range(1, part_count(session) + 1):
+            expected = min(session.chunk_size, session.size - (n - 1) * session.chunk_size)
+            if n not in parts:
+                raise ValueError(f"Part {n} is missing.")
+            if parts[n][1] != expected:
+                raise ValueError(f"Part {n} is {parts[n][1]} bytes, expected {expected}.")
+        mm.complete_multipart(session.staging_bucket, session.staging_object, session.upload_id,
+                              sorted((n, etag) for n, (etag, _) in parts.items() if n <= part_count(session)))
+        size = _staged_object_size(mm, session)
+    if size is None:
+        raise ValueError("Nothing was uploaded to the presigned URL yet.")
+    if size != session.size:
+        raise ValueError(f"Uploaded object is {size} bytes, expected {session.size}.")
+
+    if not is_tiff_header(mm.read_range(session.staging_bucket, session.staging_object, 0, 4)):
+        abort_session(session)
+        raise ValueError("Uploaded file is not a GeoTIFF.")
+
+    return StagedUpload(
+        bucket=session.staging_bucket,
+        object_name=session.staging_object,
+        name=session.file_name,
+        content_type="image/tiff",
+        size=size,
+        sha256=None,
+    )
+
+
+def abort_session(session) -> None:
+    mm = MinioManager()
+    if session.upload_id:
+        mm.abort_multipart(session.staging_bucket, session.staging_object, session.upload_id)
+    if session.direct:
+        mm.remove(session.staging_bucket, session.staging_object)
+    session.status = "aborted"
+    session.save(update_fields=["status", "updated_at"])
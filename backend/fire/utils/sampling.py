@@ -0,0 +1,86 @@
+# fire/utils/sampling.py
+import numpy as np
+
+from .zonal import GDAL_HTTP_ENV
+
+
+def sample_points(path: str, lonlat, band: int = 1) -> np.ndarray:
+    """
+    Raster value at each (lon, lat) (float64, NaN outside the raster or on
+    nodata). Points are grouped by internal block and every touched block
+    is read once, so cost scales with the number of distinct blocks, not
+    with the number of points. Raises ValueError for a band the raster
+    does not have.
+    """
+    import rasterio
+    from rasterio.warp import transform as warp_transform
+    from rasterio.windows import Window
+
+    xy = np.asarray(lonlat, dtype=np.float64).reshape(-1, 2)
+    out = np.full(len(xy), np.nan)
+    if not len(xy):
+        return out
+
+    with rasterio.Env(**GDAL_HTTP_ENV), rasterio.open(path) as src:
+        if not 1 <= band <= src.count:
+            raise ValueError(f"band must be between 1 and {src.count}.")
+        xs, ys = xy[:, 0], xy[:, 1]
+        if src.crs and not src.crs.to_epsg() == 4326:
+            xs, ys = (np.asarray(a) for a in warp_transform("EPSG:4326", src.crs, xs, ys))
+
+        inv = ~src.transform
+        cols = np.floor(inv.a * xs + inv.b * ys + inv.c).astype(np.int64)
+        rows = np.floor(inv.d * xs + inv.e * ys + inv.f).astype(np.int64)
+        inside = np.flatnonzero((cols >= 0) & (cols < src.width) & (rows >= 0) & (rows < src.height))
+        if not inside.size:
+            return out
+
+        bh, bw = src.block_shapes[band - 1]
+        r, c = rows[inside], cols[inside]
+        blocks_per_row = (src.width + bw - 1) // bw
+        key = (r // bh) * blocks_per_row + (c // bw)
+
+        # sort once by block, then walk contiguous runs
+        order = np.argsort(key, kind="stable")
+        key, r, c, idx = key[order], r[order], c[order], inside[order]
+        starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+        ends = np.r_[starts[1:], len(key)]
+
+        for s, e in zip(starts, ends):
+            r0 = int(r[s] // bh) * bh
+            c0 = int(c[s] // bw) * bw
+            win = Window(c0, r0, min(bw, src.width - c0), min(bh, src.height - r0))
+            data = src.read(band, window=win, masked=True)
+            vals = data[r[s:e] - r0, c[s:e] - c0]
+            out[idx[s:e]] = np.ma.filled(vals.astype(np.float64), np.nan)
+
+    return out
+
+
+def sample_fire_risk(index_layer, path: str) -> int:
+    """
+    Sample the index layer at every FireRiskArea point and upsert the
+    values into fire_risk_samples. Returns the number of points.
+    """
+    from django.db import connection
+    from fire.models import FireRiskSample
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT id, ST_X(geometry::geometry), ST_Y(geometry::geometry) FROM fire_risk_areas;")
+        pts = cursor.fetchall()
+    if not pts:
+        return 0
+    values = sample_points(path, [(x, y) for _, x, y in pts])
+
+    rows = [
+        FireRiskSample(fire_risk_area_id=pid, index_layer=index_layer, value=None if np.isnan(v) else v)
+        for (pid, _, _), v in zip(pts, values.tolist())
+    ]
+    FireRiskSample.objects.bulk_create(
+        rows,
+        batch_size=5000,
+        update_conflicts=True,
+        unique_fields=["fire_risk_area", "index_layer"],
+        update_fields=["value", "sampled_at"],
+    )
+    return len(rows)
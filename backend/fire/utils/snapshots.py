@@ -0,0 +1,119 @@
+# fire/utils/snapshots.py
+import gzip
+import os
+from pathlib import Path
+
+from django.conf import settings
+
+from .geojson import GEOJSON_LAYERS, iter_feature_collection_from_sql, layer_rows_sql
+
+try:
+    import brotli
+except ImportError:  # optional: gzip snapshots still work without it
+    brotli = None
+
+
+# file suffix per Content-Encoding, in server preference order
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+# layers served as a whole by a GeoJSON endpoint
+SNAPSHOT_LAYERS = sorted(GEOJSON_LAYERS)
+
+
+def snapshot_root() -> Path:
+    return Path(getattr(settings, "SNAPSHOT_ROOT", None) or (Path(settings.MEDIA_ROOT) / "snapshots"))
+
+
+def snapshot_path(layer: str, version: int, encoding: str) -> Path:
+    suffix = dict(ENCODINGS)[encoding]
+    return snapshot_root() / layer / f"v{version}.geojson{suffix}"
+
+
+def negotiate_encoding(request):
+    """
+    Pick br/gzip from Accept-Encoding (q=0 means refused). None = identity.
+    """
+    accepted = set()
+    for part in (request.META.get("HTTP_ACCEPT_ENCODING") or "").split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if token:
+            accepted.add(token)
+
+    for enc, _ in ENCODINGS:
+        if enc in accepted or "*" in accepted:
+            if enc == "br" and brotli is None:
+                continue
+            return enc
+    return None
+
+
+def open_snapshot(layer: str, version: int, encoding):
+    """
+    Open the snapshot for the preferred encoding, falling back to gzip
+    (e.g. br accepted but the br file was not written). Returns
+    (file, encoding), or (None, None) if missing; opening (rather than
+    checking for) the file means a concurrent rewrite/prune cannot pull it
+    away between the check and the read.
+    """
+    if not encoding:
+        return None, None
+    candidates = [encoding] + (["gzip"] if encoding != "gzip" else [])
+    for enc in candidates:
+        try:
+            return open(snapshot_path(layer, version, enc), "rb"), enc
+        except FileNotFoundError:
+            continue
+    return None, None
+
+
+def write_snapshots(layer: str, version: int) -> dict:
+    """
+    Stream the full layer once from PostGIS into .gz and .br files
+    (compressors fed chunk by chunk; nothing holds the whole payload).
+    GeoJSON snapshots of other versions of the layer are removed.
+    Returns {encoding: size}.
+    """
+    out_dir = snapshot_root() / layer
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    gz_path = snapshot_path(layer, version, "gzip")
+    br_path = snapshot_path(layer, version, "br")
+    gz_tmp = gz_path.with_name(gz_path.name + ".tmp")
+    br_tmp = br_path.with_name(br_path.name + ".tmp")
+
+    sql, params = layer_rows_sql(layer)
+
+    br_fh = open(br_tmp, "wb") if brotli is not None else None
+    br_comp = brotli.Compressor(quality=11) if brotli is not None else None
+    try:
+        with open(gz_tmp, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=9, mtime=0) as gz:
+            for chunk in iter_feature_collection_from_sql(sql, params):
+                gz.write(chunk)
+                if br_comp is not None:
+                    br_fh.write(br_comp.process(chunk))
+        if br_comp is not None:
+            br_fh.write(br_comp.finish())
+    finally:
+        if br_fh is not None:
+            br_fh.close()
+
+    os.replace(gz_tmp, gz_path)
+    sizes = {"gzip": gz_path.stat().st_size}
+    if br_comp is not None:
+        os.replace(br_tmp, br_path)
+        sizes["br"] = br_path.stat().st_size
+
+    keep = {gz_path.name, br_path.name}
+    for f in out_dir.glob("v*.geojson.*"):
+        if f.name not in keep and not f.name.endswith(".tmp"):
+            f.unlink(missing_ok=True)
+
+    return sizes
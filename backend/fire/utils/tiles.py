@@ -0,0 +1,181 @@
+# fire/utils/tiles.py
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection
+
+from .versioning import get_layer_version
+
+
+# Vector tile layers.
+#   attrs: (from_zoom, columns) - the last entry with from_zoom <= z wins,
+#          so low zooms carry only what the map needs to draw.
+TILE_LAYERS = {
+    "provinces": {
+        "table": "iran_provinces",
+        "min_zoom": 0,
+        "attrs": [(0, ["id", "name"])],
+    },
+    "counties": {
+        "table": "iran_counties",
+        "min_zoom": 4,
+        "attrs": [(0, ["id"]), (7, ["id", "name"])],
+    },
+    "forests": {
+        "table": "iran_forests",
+        "min_zoom": 4,
+        "attrs": [(0, ["id"]), (8, ["id", "name"])],
+    },
+    "fire-risk": {
+        "table": "fire_risk_areas",
+        "min_zoom": 5,
+        "attrs": [(0, ["id", "level"]), (9, ["id", "name", "level"])],
+    },
+}
+
+MAX_ZOOM = 22
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+
+
+def tile_cache_root() -> Path:
+    return Path(getattr(settings, "TILE_CACHE_ROOT", None) or (Path(settings.MEDIA_ROOT) / "tiles"))
+
+
+def _columns_for_zoom(cfg: dict, z: int):
+    cols = cfg["attrs"][0][1]
+    for from_zoom, c in cfg["attrs"]:
+        if z >= from_zoom:
+            cols = c
+    return cols
+
+
+def valid_tile(z: int, x: int, y: int) -> bool:
+    if z < 0 or z > MAX_ZOOM:
+        return False
+    n = 1 << z
+    return 0 <= x < n and 0 <= y < n
+
+
+def render_tile(layer: str, z: int, x: int, y: int) -> bytes:
+    """
+    Build one MVT tile in PostGIS (ST_AsMVTGeom + ST_AsMVT).
+    The geography GiST index is hit via && on the tile envelope (+ buffer) in 4326.
+    """
+    cfg = TILE_LAYERS[layer]
+    if z < cfg["min_zoom"]:
+        return b""
+
+    cols = ", ".join(f"l.{c}" for c in _columns_for_zoom(cfg, z))
+    margin = TILE_BUFFER / TILE_EXTENT
+
+    sql = f"""
+    WITH bounds AS (
+      SELECT
+        ST_TileEnvelope(%s, %s, %s) AS geom,
+        ST_Transform(ST_TileEnvelope(%s, %s, %s, margin => %s), 4326)::geography AS geog
+    )
+    SELECT ST_AsMVT(t.*, %s, {TILE_EXTENT}, 'geom')
+    FROM (
+      SELECT
+        {cols},
+        ST_AsMVTGeom(ST_Transform(l.geometry::geometry, 3857), b.geom, {TILE_EXTENT}, {TILE_BUFFER}, true) AS geom
+      FROM {cfg["table"]} l, bounds b
+      WHERE l.geometry && b.geog
+    ) t
+    WHERE t.geom IS NOT NULL;
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [z, x, y, z, x, y, margin, layer])
+        row = cursor.fetchone()
+
+    return bytes(row[0]) if row and row[0] is not None else b""
+
+
+_writes = 0  # tiles written by this process
+
+
+def tile_cache_max_zoom() -> int:
+    """Tiles above this zoom cover little ground and are rendered on demand."""
+    return int(getattr(settings, "TILE_CACHE_MAX_ZOOM", 14))
+
+
+def get_tile(layer: str, z: int, x: int, y: int, version: int = None) -> bytes:
+    """
+    Disk cache in front of render_tile, keyed by layer data version:
+      <TILE_CACHE_ROOT>/<layer>/v<version>/<z>/<x>/<y>.mvt
+    A new version means a new directory, so stale tiles are never served.
+    Empty tiles and zooms above tile_cache_max_zoom() are not cached; every
+    TILE_CACHE_TRIM_EVERY writes the cache is trimmed to TILE_CACHE_MAX_BYTES.
+    Pass version when the caller already has it.
+    """
+    if version is None:
+        version = get_layer_version(layer)
+    cacheable = z <= tile_cache_max_zoom()
+    path = tile_cache_root() / layer / f"v{version}" / str(z) / str(x) / f"{y}.mvt"
+
+    if cacheable:
+        try:
+            return path.read_bytes()
+        except FileNotFoundError:
+            pass
+
+    data = render_tile(layer, z, x, y)
+    if not data or not cacheable:
+        return data
+
+    # write-then-rename so concurrent workers never read half a tile
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+
+    global _writes
+    _writes += 1
+    if _writes % int(getattr(settings, "TILE_CACHE_TRIM_EVERY", 500)) == 0:
+        trim_tile_cache(int(getattr(settings, "TILE_CACHE_MAX_BYTES", 2 * 1024 ** 3)))
+
+    return data
+
+
+def trim_tile_cache(max_bytes: int) -> int:
+    """
+    Delete the oldest cached tiles (by write time) until the cache is back
+    under 90% of max_bytes. Returns the number of tiles removed.
+    """
+    tiles = []
+    total = 0
+    for path in tile_cache_root().rglob("*.mvt"):
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            continue
+        tiles.append((st.st_mtime, st.st_size, path))
+        total += st.st_size
+    if total <= max_bytes:
+        return 0
+
+    removed = 0
+    for _, size, path in sorted(tiles):
+        if total <= max_bytes * 0.9:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+        removed += 1
+    return removed
+
+
+def prune_tile_cache(layer: str, keep_version: int) -> None:
+    """
+    Drop cached tiles of older versions of a layer.
+    """
+    root = tile_cache_root() / layer
+    if not root.exists():
+        return
+    for d in root.iterdir():
+        if d.is_dir() and d.name != f"v{keep_version}":
+            shutil.rmtree(d, ignore_errors=True)
@@ -0,0 +1,202 @@
+# fire/utils/topojson.py
+import json
+import os
+import tempfile
+
+from django.db import connection
+
+from .snapshots import snapshot_root
+
+
+def _quantize_ring(coords, x0, y0, kx, ky):
+    """
+    Lon/lat ring -> closed list of integer grid points without consecutive duplicates.
+    """
+    out = []
+    for x, y in coords:
+        p = (int(round((x - x0) * kx)), int(round((y - y0) * ky)))
+        if not out or out[-1] != p:
+            out.append(p)
+    if out and out[0] != out[-1]:
+        out.append(out[0])
+    return out if len(out) >= 4 else None
+
+
+def _find_junctions(rings):
+    """
+    A point is a junction when two ring visits see it with different
+    neighbours, i.e. where a shared border starts or ends.
+    """
+    seen = {}
+    junctions = set()
+    for ring in rings:
+        n = len(ring) - 1
+        for i in range(n):
+            p = ring[i]
+            nb = (ring[i - 1] if i else ring[n - 1], ring[i + 1])
+            first = seen.get(p)
+            if first is None:
+                seen[p] = nb
+            elif first != nb and first != (nb[1], nb[0]):
+                junctions.add(p)
+    return junctions
+
+
+def _cut_ring(ring, junctions):
+    n = len(ring) - 1
+    cuts = [i for i in range(n) if ring[i] in junctions]
+
+    if not cuts:
+        # closed ring without junctions: rotate to a canonical start so a
+        # fully shared ring (enclave) dedupes against its reversed twin
+        k = min(range(n), key=lambda i: ring[i])
+        return [ring[k:n] + ring[:k] + [ring[k]]]
+
+    j0 = cuts[0]
+    r = ring[j0:n] + ring[:j0] + [ring[j0]]
+    arcs = []
+    start = 0
+    for k in range(1, len(r)):
+        if k == len(r) - 1 or r[k] in junctions:
+            arcs.append(r[start:k + 1])
+            start = k
+    return arcs
+
+
+def build_topology(features, object_name: str, precision: int = 5) -> dict:
+    """
+    features: iterable of (id, properties dict, shapely (Multi)Polygon).
+    Returns a TopoJSON Topology where borders shared by neighbouring
+    features are stored once as arcs. Coordinates are quantized to a grid
+    of 10^-precision degrees and delta-encoded.
+    """
+    feats = [(fid, props, g) for fid, props, g in features if g is not None and not g.is_empty]
+    if not feats:
+        return {"type": "Topology", "objects": {object_name: {"type": "GeometryCollection", "geometries": []}}, "arcs": []}
+
+    minx = min(g.bounds[0] for _, _, g in feats)
+    miny = min(g.bounds[1] for _, _, g in feats)
+    maxx = max(g.bounds[2] for _, _, g in feats)
+    maxy = max(g.bounds[3] for _, _, g in feats)
+
+    step = 10.0 ** -precision
+    kx = ky = 1.0 / step
+
+    # 1) quantize: per feature -> list of polygons -> list of rings
+    shapes = []
+    all_rings = []
+    for fid, props, g in feats:
+        polys = list(g.geoms) if g.geom_type == "MultiPolygon" else [g]
+        qpolys = []
+        for poly in polys:
+            rings = []
+            outer = _quantize_ring(poly.exterior.coords, minx, miny, kx, ky)
+            if outer is None:
+                continue
+            rings.append(outer)
+            for hole in poly.interiors:
+                q = _quantize_ring(hole.coords, minx, miny, kx, ky)
+                if q is not None:
+                    rings.append(q)
+            qpolys.append(rings)
+            all_rings.extend(rings)
+        shapes.append((fid, props, qpolys))
+
+    # 2) junctions + cut + dedupe arcs
+    junctions = _find_junctions(all_rings)
+    arcs = []
+    index = {}
+
+    def arc_id(arc):
+        key = tuple(arc)
+        i = index.get(key)
+        if i is not None:
+            return i
+        i = index.get(tuple(reversed(arc)))
+        if i is not None:
+            return ~i
+        index[key] = len(arcs)
+        arcs.append(arc)
+        return len(arcs) - 1
+
+    geometries = []
+    for fid, props, qpolys in shapes:
+        if not qpolys:
+            continue
+        geometries.append({
+            "type": "MultiPolygon",
+            "id": fid,
+            "properties": props,
+            "arcs": [[[arc_id(a) for a in _cut_ring(ring, junctions)] for ring in rings] for rings in qpolys],
+        })
+
+    # 3) delta-encode
+    encoded = []
+    for arc in arcs:
+        px, py = arc[0]
+        out = [[px, py]]
+        for x, y in arc[1:]:
+            out.append([x - px, y - py])
+            px, py = x, y
+        encoded.append(out)
+
+    return {
+        "type": "Topology",
+        "bbox": [minx, miny, maxx, maxy],
+        "transform": {"scale": [step, step], "translate": [minx, miny]},
+        "objects": {object_name: {"type": "GeometryCollection", "geometries": geometries}},
+        "arcs": encoded,
+    }
+
+
+def boundary_topology(layer: str, band: int, precision: int, bbox=None) -> dict:
+    """
+    TopoJSON of one zoom band. Bands are simplified as a coverage (see
+    generalize.rebuild_generalized), so neighbours keep identical border
+    vertices and share arcs at every zoom.
+    """
+    import shapely
+
+    sql = """
+    SELECT source_id, name, ST_AsBinary(geometry)
+    FROM fire_generalized_boundaries
+    WHERE layer = %s AND band = %s
+    """
+    params = [layer, band]
+    if bbox:
+        sql += " AND geometry && ST_MakeEnvelope(%s, %s, %s, %s, 4326)"
+        params += list(bbox)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    geoms = shapely.from_wkb([bytes(r[2]) for r in rows]) if rows else []
+    features = ((r[0], {"id": r[0], "name": r[1]}, g) for r, g in zip(rows, geoms))
+    return build_topology(features, layer, precision=precision)
+
+
+def cached_boundary_topology(layer: str, version: int, band: int, precision: int) -> bytes:
+    """
+    Whole-layer TopoJSON, built once per (version, band, precision) and kept
+    next to the GeoJSON snapshots; writing one drops the caches of other
+    versions.
+    """
+    path = snapshot_root() / layer / f"v{version}.b{band}.p{precision}.topojson"
+    try:
+        return path.read_bytes()
+    except FileNotFoundError:
+        pass
+
+    data = json.dumps(boundary_topology(layer, band, precision), separators=(",", ":")).encode("utf-8")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+
+    for f in path.parent.glob("v*.b*.p*.topojson"):
+        if not f.name.startswith(f"v{version}."):
+            f.unlink(missing_ok=True)
+    return data
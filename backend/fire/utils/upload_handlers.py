@@ -0,0 +1,143 @@
+# fire/utils/upload_handlers.py
+"""
+Upload handler that forwards multipart file fields into a MinIO staging
+object while the request body is read from the socket: chunks go into a
+MultipartWriter (sha256 computed on the fly), nothing is written to local
+disk and memory per upload is bounded by the part size.
+
+Install it per view with StreamingUploadMixin; request.FILES then holds
+StagedUpload objects pointing at the staging object.
+"""
+import os
+import uuid
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+
+from .minio_manager import DEFAULT_PART_SIZE, MinioManager
+
+
+def staging_bucket() -> str:
+    return getattr(settings, "UPLOAD_STAGING_BUCKET", "upload-staging")
+
+
+def staging_object_name(file_name: str) -> str:
+    """New staging object key (keeps the file extension for GDAL)."""
+    _, ext = os.path.splitext(file_name or "")
+    return f"staging/{uuid.uuid4().hex}{ext.lower()}"
+
+
+def open_staging_writer(mm, file_name: str, content_type: str = None):
+    """
+    MultipartWriter into a new staging object.
+    Abandoned staging objects / parts expire on their own.
+    """
+    mm.ensure_bucket(staging_bucket(), expire_days=1)
+    return mm.open_multipart(
+        staging_bucket(),
+        staging_object_name(file_name),
+        content_type=content_type or "application/octet-stream",
+        part_size=getattr(settings, "MINIO_PART_SIZE", DEFAULT_PART_SIZE),
+    )
+
+
+class StagedUpload(UploadedFile):
+    """
+    An uploaded file that lives in MinIO (staging bucket), not on disk.
+    chunks()/read() stream it back if a consumer really needs the bytes.
+    """
+
+    def __init__(self, bucket, object_name, name, content_type, size, sha256, charset=None):
+        super().__init__(file=None, name=name, content_type=content_type, size=size, charset=charset)
+        self.bucket = bucket
+        self.object_name = object_name
+        self.sha256 = sha256
+        self.discarded = False
+
+    def gdal_path(self, mm=None) -> str:
+        """GDAL path for range reads of the staged object (presigned, internal endpoint)."""
+        return "/vsicurl/" + (mm or MinioManager()).presigned_get(self.bucket, self.object_name)
+
+    def open(self, mode="rb"):
+        self.file = MinioManager().client.get_object(self.bucket, self.object_name)
+        return self
+
+    def chunks(self, chunk_size=None):
+        resp = MinioManager().client.get_object(self.bucket, self.object_name)
+        try:
+            yield from resp.stream(chunk_size or self.DEFAULT_CHUNK_SIZE)
+        finally:
+            resp.close()
+            resp.release_conn()
+
+    def read(self, *args, **kwargs):
+        if self.file is None:
+            self.open()
+        return self.file.read(*args, **kwargs)
+
+    def release(self):
+        """Hand the staging object over to someone else (e.g. an ingest job)."""
+        self.discarded = True
+
+    def discard(self, mm=None):
+        if not self.discarded:
+            (mm or MinioManager()).remove(self.bucket, self.object_name)
+            self.discarded = True
+
+
+class MinioStreamingUploadHandler(FileUploadHandler):
+    chunk_size = 256 * 1024
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.mm = None
+        self.writer = None
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.mm = self.mm or MinioManager()
+        self.writer = open_staging_writer(self.mm, self.file_name, self.content_type)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.writer.write(raw_data)
+        return None  # consumed; no later handler sees this chunk
+
+    def file_complete(self, file_size):
+        writer, self.writer = self.writer, None
+        size, sha256 = writer.close()
+        return StagedUpload(
+            bucket=writer.bucket,
+            object_name=writer.object_name,
+            name=self.file_name,
+            content_type=self.content_type,
+            size=size,
+            sha256=sha256,
+            charset=self.charset,
+        )
+
+    def upload_interrupted(self):
+        if self.writer is not None:
+            self.writer.abort()
+            self.writer = None
+
+
+class StreamingUploadMixin:
+    """
+    APIView mixin: parse file fields with MinioStreamingUploadHandler and
+    drop staging objects the view did not consume (e.g. 400 responses).
+    """
+
+    def initialize_request(self, request, *args, **kwargs):
+        request.upload_handlers = [MinioStreamingUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        from rest_framework.request import Empty
+
+        if getattr(request, "_files", Empty) is not Empty:
+            for _, files in request._files.lists():
+                for f in files:
+                    if isinstance(f, StagedUpload):
+                        f.discard()
+        return super().finalize_response(request, response, *args, **kwargs)
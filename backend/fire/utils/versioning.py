@@ -0,0 +1,102 @@
+# fire/utils/versioning.py
+import hashlib
+from functools import wraps
+
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+
+def get_layer_version(layer: str) -> int:
+    from fire.models import LayerVersion
+
+    v = LayerVersion.objects.filter(layer=layer).values_list("version", flat=True).first()
+    return v or 0
+
+
+def bump_layer_version(layer: str) -> int:
+    """
+    Increment the data version of a layer and return the new value.
+    Call it from every code path that writes the layer's table.
+    """
+    from fire.models import LayerVersion
+
+    obj, _ = LayerVersion.objects.get_or_create(layer=layer)
+    LayerVersion.objects.filter(pk=obj.pk).update(version=F("version") + 1, updated_at=timezone.now())
+    return get_layer_version(layer)
+
+
+def request_layer_version(request, layer: str) -> int:
+    """
+    Version of a layer as already read by versioned_get for this request
+    (no second query), else from the database.
+    """
+    for name, version, _ in getattr(request, "_layer_versions", None) or ():
+        if name == layer:
+            return version
+    return get_layer_version(layer)
+
+
+def versioned_get(*layers, layer_kwarg=None):
+    """
+    Conditional GET for a read view whose output depends only on the given
+    layers' data versions (plus the request path/query).
+
+      @versioned_get("counties")
+      def get(self, request): ...
+
+    Emits a strong ETag + Last-Modified and answers If-None-Match /
+    If-Modified-Since with 304 before the view body (the heavy query) runs.
+    `layer_kwarg` names a URL kwarg holding an extra layer (e.g. tiles).
+    """
+    from fire.models import LayerVersion
+
+    def _versions(request, kwargs):
+        cached = getattr(request, "_layer_versions", None)
+        if cached is None:
+            names = set(layers)
+            if layer_kwarg:
+                names.add(kwargs.get(layer_kwarg))
+            rows = {
+                layer: (version, updated_at)
+                for layer, version, updated_at in LayerVersion.objects.filter(layer__in=names)
+                .values_list("layer", "version", "updated_at")
+            }
+            cached = [(n, *rows.get(n, (0, None))) for n in sorted(names)]
+            request._layer_versions = cached
+        return cached
+
+    def etag_func(request, *args, **kwargs):
+        from config.keyset import wants_ndjson
+        from .snapshots import negotiate_encoding
+
+        key = ";".join(f"{n}={v}" for n, v, _ in _versions(request, kwargs))
+        key += "|" + request.get_full_path()
+        # a precompressed snapshot is a different representation => different strong ETag
+        key += "|" + (negotiate_encoding(request) or "identity")
+        # so is NDJSON picked by the Accept header on the same URL
+        key += "|ndjson" if wants_ndjson(request) else "|json"
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def last_modified_func(request, *args, **kwargs):
+        stamps = [ts for _, _, ts in _versions(request, kwargs) if ts is not None]
+        return max(stamps) if stamps else None
+
+    cond = condition(etag_func=etag_func, last_modified_func=last_modified_func)
+
+    def decorator(view):
+        conditional_view = cond(view)
+
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            # cacheable, but the browser must revalidate (cheap 304) every time
+            patch_cache_control(response, no_cache=True)
+            patch_vary_headers(response, ["Accept-Encoding", "Accept"])
+            return response
+
+        return wrapped
+
+    return method_decorator(decorator)
@@ -0,0 +1,280 @@
+# fire/utils/zonal.py
+import json
+
+import numpy as np
+from django.db import connection
+
+from .generalize import FULL_BAND, GENERALIZED_LAYERS
+
+
+# zone_type -> LayerVersion name
+ZONE_TYPES = {
+    "aoi": "aoi",
+    "provinces": "provinces",
+    "counties": "counties",
+    "forests": "forests",
+}
+
+PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+HISTOGRAM_BINS = 4096
+
+# GDAL settings for reading COG/GeoTIFF straight from MinIO over HTTP ranges
+GDAL_HTTP_ENV = {
+    "GDAL_DISABLE_READDIR_ON_OPEN": "EMPTY_DIR",
+    "CPL_VSIL_CURL_ALLOWED_EXTENSIONS": ".tif,.tiff",
+    "GDAL_HTTP_MULTIRANGE": "YES",
+    "GDAL_HTTP_MERGE_CONSECUTIVE_RANGES": "YES",
+    "VSI_CACHE": "TRUE",
+}
+
+
+def raster_path(obj) -> str:
+    """
+    GDAL path of an IndexLayer/SatelliteImage raster: read from MinIO
+    (internal endpoint) with HTTP range requests.
+    """
+    from .ingest import minio_internal_url
+
+    return "/vsicurl/" + minio_internal_url(obj.minio_bucket, obj.minio_object)
+
+
+def zone_geometry(zone_type: str, zone_id: int):
+    """
+    Zone polygon as a GeoJSON dict in EPSG:4326, or None if it does not exist.
+    """
+    if zone_type == "aoi":
+        sql = "SELECT ST_AsGeoJSON(geometry::geometry) FROM fire_aoi WHERE id = %s;"
+        params = [zone_id]
+    elif zone_type in GENERALIZED_LAYERS:
+        sql = ("SELECT ST_AsGeoJSON(geometry) FROM fire_generalized_boundaries "
+               "WHERE layer = %s AND band = %s AND source_id = %s;")
+        params = [zone_type, FULL_BAND, zone_id]
+    else:
+        raise ValueError(f"Unknown zone_type: {zone_type}")
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def _zone_blocks(src, geom):
+    """
+    Yield (window, zone mask) for every internal block of band 1 that
+    intersects the zone. Only these blocks are ever read.
+    """
+    from rasterio.features import geometry_mask
+    from rasterio.windows import Window, from_bounds, intersection
+    from shapely.geometry import shape
+
+    full = Window(0, 0, src.width, src.height)
+    try:
+        zone_win = intersection(from_bounds(*shape(geom).bounds, transform=src.transform), full)
+    except Exception:  # zone outside the raster
+        return
+    zone_win = zone_win.round_offsets(op="floor").round_lengths(op="ceil")
+
+    for _, win in src.block_windows(1):
+        try:
+            w = intersection(win, zone_win)
+        except Exception:
+            continue
+        if w.width <= 0 or w.height <= 0:
+            continue
+        mask = ~geometry_mask([geom], out_shape=(int(w.height), int(w.width)),
+                              transform=src.window_transform(w), all_touched=False)
+        if mask.any():
+            yield w, mask
+
+
+def _valid_values(src, window, mask):
+    data = src.read(1, window=window, masked=True)
+    values = data.data[mask & ~np.ma.getmaskarray(data)]
+    if values.dtype.kind == "f":
+        values = values[np.isfinite(values)]
+    return values.astype(np.float64, copy=False)
+
+
+def block_moments(v):
+    """
+    (count, mean, M2, min, max) of one block's values.
+    """
+    if not v.size:
+        return (0, 0.0, 0.0, np.inf, -np.inf)
+    mean = float(v.mean())
+    return (int(v.size), mean, float(np.square(v - mean).sum()), float(v.min()), float(v.max()))
+
+
+def merge_moments(a, b):
+    """
+    Combine two partial (count, mean, M2, min, max) tuples (Chan et al.),
+    stable where sum/sum-of-squares would cancel.
+    """
+    na, ma, m2a, mina, maxa = a
+    nb, mb, m2b, minb, maxb = b
+    if nb == 0:
+        return a
+    if na == 0:
+        return b
+    n = na + nb
+    delta = mb - ma
+    return (n, ma + delta * nb / n, m2a + m2b + delta * delta * na * nb / n, min(mina, minb), max(maxa, maxb))
+
+
+def raster_value_range(src) -> tuple:
+    """
+    (min, max) of band 1 from GDAL's approximate statistics: the fixed
+    range every zone histogram of a raster is binned over, by the single
+    zone and the batch path alike, so both give the same percentiles.
+    """
+    if hasattr(src, "stats"):  # rasterio >= 1.4
+        st = src.stats(indexes=[1], approx=True)[0]
+    else:
+        st = src.statistics(1, approx=True)
+    lo, hi = float(st.min), float(st.max)
+    return (lo, hi) if hi > lo else (lo, lo + 1.0)
+
+
+def zone_histogram(v, value_range):
+    """HISTOGRAM_BINS counts of v over value_range (values outside it land in the end bins)."""
+    lo, hi = value_range
+    return np.histogram(np.clip(v, lo, hi), bins=HISTOGRAM_BINS, range=(lo, hi))[0]
+
+
+def zone_percentiles(hist, count, value_range, vmin, vmax, percentiles=PERCENTILES) -> dict:
+    if vmax > vmin:
+        return histogram_percentiles(hist, count, value_range, (vmin, vmax), percentiles)
+    return {str(p): vmin for p in percentiles}
+
+
+def histogram_percentiles(hist, count, value_range, clamp, percentiles=PERCENTILES) -> dict:
+    """
+    Percentiles interpolated inside the HISTOGRAM_BINS bins spanning
+    value_range, clamped to the exact (min, max) of the values.
+    """
+    lo, hi = value_range
+    cum = np.cumsum(hist)
+    edges = np.linspace(lo, hi, HISTOGRAM_BINS + 1)
+    pct = {}
+    for p in percentiles:
+        rank = p / 100.0 * count
+        i = min(int(np.searchsorted(cum, rank, side="left")), HISTOGRAM_BINS - 1)
+        before = cum[i - 1] if i else 0
+        frac = (rank - before) / hist[i] if hist[i] else 0.0
+        value = float(edges[i] + frac * (edges[i + 1] - edges[i]))
+        pct[str(p)] = min(max(value, clamp[0]), clamp[1])
+    return pct
+
+
+def compute_zonal_stats(path: str, geom_4326: dict, percentiles=PERCENTILES) -> dict:
+    """
+    Stats of band 1 of a raster over a polygon, reading only the blocks
+    that intersect the zone (memory is bounded by one block, not the raster).
+
+    One pass merges per-block count/mean/M2/min/max and a HISTOGRAM_BINS
+    histogram over raster_value_range(), from which percentiles are
+    interpolated (error <= (raster max - raster min) / HISTOGRAM_BINS),
+    exactly as batch_zonal_stats does.
+    """
+    import rasterio
+    from rasterio.warp import transform_geom
+
+    with rasterio.Env(**GDAL_HTTP_ENV), rasterio.open(path) as src:
+        geom = transform_geom("EPSG:4326", src.crs, geom_4326) if src.crs else geom_4326
+
+        value_range = raster_value_range(src)
+        moments = (0, 0.0, 0.0, np.inf, -np.inf)
+        hist = np.zeros(HISTOGRAM_BINS, dtype=np.int64)
+        for w, mask in _zone_blocks(src, geom):
+            v = _valid_values(src, w, mask)
+            if v.size:
+                moments = merge_moments(moments, block_moments(v))
+                hist += zone_histogram(v, value_range)
+
+    count, mean, m2, vmin, vmax = moments
+    if count == 0:
+        return {"count": 0, "mean": None, "min": None, "max": None, "std": None,
+                "percentiles": {str(p): None for p in percentiles}}
+    return {"count": int(count), "mean": mean, "min": vmin, "max": vmax, "std": float(np.sqrt(m2 / count)),
+            "percentiles": zone_percentiles(hist, count, value_range, vmin, vmax, percentiles)}
+
+
+def cached_zonal_stats(index_layer, zone_type: str, zone_id: int, raster_path: str):
+    """
+    ZonalStatistic row for (index layer, zone, zone version), computed on
+    first request. Returns None if the zone does not exist.
+    """
+    from fire.models import ZonalStatistic
+    from .versioning import get_layer_version
+
+    zone_version = get_layer_version(ZONE_TYPES[zone_type])
+    key = dict(index_layer=index_layer, zone_type=zone_type, zone_id=zone_id, zone_version=zone_version)
+
+    row = ZonalStatistic.objects.filter(**key).first()
+    if row is not None:
+        return row
+
+    geom = zone_geometry(zone_type, zone_id)
+    if geom is None:
+        return None
+
+    stats = compute_zonal_stats(raster_path, geom)
+    row, _ = ZonalStatistic.objects.update_or_create(
+        **key,
+        defaults=dict(index_name=index_layer.index_name, date=index_layer.date, **stats),
+    )
+    return row
+
+
+# zone types precomputed for every new index layer (dashboard choropleths)
+BATCH_ZONE_TYPES = ("counties", "forests")
+
+
+def zone_geometries(zone_type: str):
+    """
+    [(zone_id, GeoJSON dict)] for every feature of a boundary layer.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT source_id, ST_AsGeoJSON(geometry) FROM fire_generalized_boundaries "
+            "WHERE layer = %s AND band = %s ORDER BY source_id;",
+            [zone_type, FULL_BAND],
+        )
+        return [(r[0], json.loads(r[1])) for r in cursor.fetchall()]
+
+
+def store_layer_zone_stats(index_layer, zone_types=BATCH_ZONE_TYPES, workers=None) -> int:
+    """
+    Stats of one index layer over every zone of the given types, computed
+    in one pass over the raster (fire.utils.zonal_batch) and written with
+    a single bulk upsert. Returns the number of rows written.
+    """
+    from fire.models import ZonalStatistic
+    from .versioning import get_layer_version
+    from .zonal_batch import batch_zonal_stats
+
+    zones = []
+    versions = {}
+    for zone_type in zone_types:
+        versions[zone_type] = get_layer_version(ZONE_TYPES[zone_type])
+        zones += [((zone_type, zid), geom) for zid, geom in zone_geometries(zone_type)]
+    if not zones:
+        return 0
+
+    results = batch_zonal_stats(raster_path(index_layer), zones, workers=workers)
+
+    rows = [
+        ZonalStatistic(
+            index_layer=index_layer, zone_type=zone_type, zone_id=zid, zone_version=versions[zone_type],
+            index_name=index_layer.index_name, date=index_layer.date, **stats,
+        )
+        for (zone_type, zid), stats in results.items()
+    ]
+    ZonalStatistic.objects.bulk_create(
+        rows,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=["index_layer", "zone_type", "zone_id", "zone_version"],
+        update_fields=["index_name", "date", "count", "mean", "min", "max", "std", "percentiles", "computed_at"],
+    )
+    return len(rows)
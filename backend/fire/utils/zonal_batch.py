@@ -0,0 +1,172 @@
+# fire/utils/zonal_batch.py
+"""
+All-zones zonal statistics for one raster in a single pass.
+
+The parent reads the raster in full-width strips straight into shared
+memory (double-buffered: the next strip is read while workers reduce the
+current one). Workers attach to the strip by name, so no pixel data is
+pickled; each reduces its share of the zones crossing the strip to
+partial moments + a histogram, which the parent merges.
+"""
+import multiprocessing
+import os
+import sys
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .zonal import (
+    GDAL_HTTP_ENV, PERCENTILES, block_moments, merge_moments, raster_value_range, zone_histogram, zone_percentiles,
+)
+
+
+# per buffer; two are alive at once. Keep 2 x pixels x itemsize well under
+# the container's /dev/shm (docker-compose sets shm_size).
+STRIP_PIXELS = 4 * 1024 * 1024
+
+_EMPTY = (0, 0.0, 0.0, np.inf, -np.inf)
+
+# per-worker state set by _init_worker
+_W = {}
+
+
+def _attach(name):
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    return shared_memory.SharedMemory(name=name)
+
+
+def _init_worker(geoms, windows, transform, width, dtype, nodata, value_range):
+    _W.update(geoms=geoms, windows=windows, transform=transform, width=width,
+              dtype=np.dtype(dtype), nodata=nodata, value_range=value_range)
+
+
+def _reduce_strip(args):
+    """
+    Worker: partial (moments, histogram) for the given zones over one strip.
+    """
+    from rasterio.features import geometry_mask
+    from rasterio.windows import Window, transform as window_transform
+
+    shm_name, row0, nrows, zone_idx = args
+    shm = _attach(shm_name)
+    try:
+        strip = np.ndarray((nrows, _W["width"]), dtype=_W["dtype"], buffer=shm.buf)
+        nodata = _W["nodata"]
+        out = []
+        for zi in zone_idx:
+            c0, r0, c1, r1 = _W["windows"][zi]
+            a, b = max(r0, row0), min(r1, row0 + nrows)
+            if a >= b:
+                continue
+            win = Window(c0, a, c1 - c0, b - a)
+            inside = ~geometry_mask([_W["geoms"][zi]], out_shape=(b - a, c1 - c0),
+                                    transform=window_transform(win, _W["transform"]))
+            v = strip[a - row0:b - row0, c0:c1][inside]
+            if nodata is not None:
+                v = v[v != nodata]
+            v = v.astype(np.float64, copy=False)
+            v = v[np.isfinite(v)]
+            if not v.size:
+                continue
+            out.append((zi, block_moments(v), zone_histogram(v, _W["value_range"])))
+        del strip
+        return out
+    finally:
+        shm.close()
+
+
+def batch_zonal_stats(path: str, zones, workers=None, percentiles=PERCENTILES) -> dict:
+    """
+    zones: list of (key, GeoJSON geometry in EPSG:4326).
+    Returns {key: stats dict as compute_zonal_stats}.
+
+    Histograms share the raster-wide value range (raster_value_range, as
+    in compute_zonal_stats), so percentile resolution is
+    (raster max - raster min) / HISTOGRAM_BINS.
+    """
+    import rasterio
+    from rasterio.warp import transform_geom
+    from rasterio.windows import from_bounds
+    from shapely.geometry import shape
+
+    workers = workers or os.cpu_count() or 1
+    keys = [k for k, _ in zones]
+
+    with rasterio.Env(**GDAL_HTTP_ENV), rasterio.open(path) as src:
+        width, height = src.width, src.height
+        dtype = src.dtypes[0]
+        nodata = src.nodata
+
+        value_range = raster_value_range(src)
+
+        geoms = []
+        windows = []
+        for _, g in zones:
+            g = transform_geom("EPSG:4326", src.crs, g) if src.crs else g
+            w = from_bounds(*shape(g).bounds, transform=src.transform)
+            c0 = max(int(np.floor(w.col_off)), 0)
+            r0 = max(int(np.floor(w.row_off)), 0)
+            c1 = min(int(np.ceil(w.col_off + w.width)), width)
+            r1 = min(int(np.ceil(w.row_off + w.height)), height)
+            geoms.append(g)
+            windows.append((c0, r0, c1, r1) if c0 < c1 and r0 < r1 else (0, 0, 0, 0))
+
+        block_h = src.block_shapes[0][0]
+        rows = max(block_h, (STRIP_PIXELS // max(width, 1)) // block_h * block_h)
+        nbytes = rows * width * np.dtype(dtype).itemsize
+
+        moments = [_EMPTY] * len(zones)
+        hists = [None] * len(zones)
+
+        ctx = multiprocessing.get_context("spawn")  # GDAL is not fork-safe
+        buffers = [shared_memory.SharedMemory(create=True, size=nbytes) for _ in range(2)]
+        try:
+            init = (geoms, windows, src.transform, width, dtype, nodata, value_range)
+            with ctx.Pool(workers, initializer=_init_worker, initargs=init) as pool:
+                pending = None
+                for i, row0 in enumerate(range(0, height, rows)):
+                    nrows = min(rows, height - row0)
+                    buf = buffers[i % 2]
+                    arr = np.ndarray((nrows, width), dtype=dtype, buffer=buf.buf)
+                    src.read(1, window=((row0, row0 + nrows), (0, width)), out=arr)
+                    del arr
+
+                    # strip i-2 (same buffer) was merged last iteration; strip i-1
+                    # is still being reduced from the other buffer while we read
+                    if pending is not None:
+                        _merge(pending.get(), moments, hists)
+
+                    crossing = [z for z, (c0, r0, c1, r1) in enumerate(windows)
+                                if c0 < c1 and r0 < row0 + nrows and r1 > row0]
+                    tasks = [(buf.name, row0, nrows, crossing[k::workers]) for k in range(workers)]
+                    pending = pool.map_async(_reduce_strip, [t for t in tasks if t[3]])
+                if pending is not None:
+                    _merge(pending.get(), moments, hists)
+        finally:
+            for b in buffers:
+                b.close()
+                b.unlink()
+
+    result = {}
+    for key, (count, mean, m2, vmin, vmax), hist in zip(keys, moments, hists):
+        if count == 0:
+            result[key] = {"count": 0, "mean": None, "min": None, "max": None, "std": None,
+                           "percentiles": {str(p): None for p in percentiles}}
+            continue
+        result[key] = {
+            "count": int(count),
+            "mean": mean,
+            "min": vmin,
+            "max": vmax,
+            "std": float(np.sqrt(m2 / count)),
+            "percentiles": zone_percentiles(hist, count, value_range, vmin, vmax, percentiles),
+        }
+    return result
+
+
+def _merge(parts, moments, hists):
+    for chunk in parts:
+        for zi, m, hist in chunk:
+            moments[zi] = merge_moments(moments[zi], m)
+            hists[zi] = hist if hists[zi] is None else hists[zi] + hist
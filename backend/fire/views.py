@@ -3,15 +3,16 @@ import json
 import os
 import re
 import uuid
-import base64
-import urllib.request
-import urllib.error
 import xml.etree.ElementTree as ET
 
-from django.db import connection
+from django.db import IntegrityError, connection, transaction
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
 from django.utils.dateparse import parse_datetime, parse_date
 from django.contrib.gis.geos import GEOSGeometry
-from django.conf import settings
+from django.urls import reverse
+from django.utils import timezone
+from shapely.geometry import shape
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -19,9 +20,46 @@ from rest_framework.permissions import AllowAny
 from rest_framework import status
 from rest_framework.parsers import MultiPartParser, FormParser
 
-from .models import AOI, SatelliteImage, IndexLayer
-from .utils.minio_manager import MinioManager
-from .utils.geoserver import GeoServerManager
+from config.keyset import KeysetPaginator, ndjson_response, wants_ndjson
+
+from .models import AOI, SatelliteImage, IndexLayer, Job, LayerVersion, UploadSession
+from .utils.ingest import (
+    enqueue_staged_ingest,
+    find_duplicate,
+    geoserver_cfg as _geoserver_cfg,
+    keep_original_requested,
+    slug as _slug,
+    staged_ingest_payload,
+)
+from .utils.bandmath import Expression
+from .utils.bulk import archive_type, default_concurrency as default_bulk_concurrency
+from .utils.clusters import cluster_rows_sql
+from .utils.datacube import DataCube
+from .utils.exports import EXPORT_FORMATS, export_media_url, open_export
+from .utils.generalize import band_for_zoom
+from .utils.geoserver import geoserver_client
+from .utils.geocoder import GEOCODER_LAYERS, feature_names, lookup_geometries, lookup_points
+from .utils.jobs import enqueue, job_dict
+from .utils.geojson import boundary_rows_sql, feature_rows_sql, iter_feature_collection_from_sql
+from .utils.resumable import (
+    abort_session as abort_upload_session,
+    chunk_part_number,
+    complete_direct_session as complete_direct_upload,
+    complete_session as complete_upload_session,
+    completing_expired,
+    create_direct_session as create_direct_upload,
+    create_session as create_upload_session,
+    direct_upload_urls,
+    put_chunk as put_upload_chunk,
+    session_dict as upload_session_dict,
+)
+from .utils.sampling import sample_fire_risk, sample_points
+from .utils.snapshots import negotiate_encoding, open_snapshot
+from .utils.tiles import TILE_LAYERS, get_tile, valid_tile
+from .utils.topojson import boundary_topology, cached_boundary_topology
+from .utils.upload_handlers import StreamingUploadMixin
+from .utils.versioning import bump_layer_version, get_layer_version, request_layer_version, versioned_get
+from .utils.zonal import ZONE_TYPES, cached_zonal_stats, raster_path, zone_geometry
 
 
 def feature_collection_from_sql(sql, params=None):
@@ -43,118 +81,371 @@ def feature_collection_from_sql(sql, params=None):
     return {"type": "FeatureCollection", "features": features}
 
 
-def _slug(s: str) -> str:
-    s = (s or "").strip().lower()
-    s = re.sub(r"[^a-z0-9-]+", "-", s)
-    s = re.sub(r"-{2,}", "-", s).strip("-")
-    return s or "unknown"
+def _parse_bbox(value):
+    """
+    "minx,miny,maxx,maxy" in lon/lat -> tuple of floats (or None).
+    """
+    if not value:
+        return None
+    parts = [float(p) for p in value.split(",")]
+    if len(parts) != 4 or parts[0] >= parts[2] or parts[1] >= parts[3]:
+        raise ValueError("bbox must be minx,miny,maxx,maxy")
+    return tuple(parts)
+
+
+def _parse_precision(value):
+    if value in (None, ""):
+        return None
+    p = int(value)
+    if p < 0 or p > 15:
+        raise ValueError("precision must be between 0 and 15")
+    return p
+
+
+def _parse_zoom(value):
+    if value in (None, ""):
+        return None
+    z = int(value)
+    if z < 0 or z > 22:
+        raise ValueError("zoom must be between 0 and 22")
+    return z
+
+
+def geojson_stream_response(sql, params=None):
+    return StreamingHttpResponse(
+        iter_feature_collection_from_sql(sql, params),
+        content_type="application/geo+json",
+    )
+
+
+# =========================
+# GeoJSON APIs (raw passthrough, streamed)
+# =========================
+
+def snapshot_response(request, layer: str):
+    """
+    Whole-layer requests (no query params) are answered from the gzip/br
+    snapshot written at load time: no query, no serialization, no compression.
+    Returns None when no matching snapshot exists.
+    """
+    if request.GET:
+        return None
 
+    fh, encoding = open_snapshot(layer, get_layer_version(layer), negotiate_encoding(request))
+    if fh is None:
+        return None
 
-def _safe_object_name(prefix: str, original_name: str) -> str:
-    _, ext = os.path.splitext(original_name or "")
-    ext = (ext or "").lower()
-    return f"{prefix}/{uuid.uuid4().hex}{ext}"
+    response = FileResponse(fh, content_type="application/geo+json")
+    response["Content-Encoding"] = encoding
+    patch_vary_headers(response, ["Accept-Encoding"])
+    return response
 
 
-def _geoserver_cfg():
+TOPOJSON_LAYERS = ("provinces", "counties")
+TOPOJSON_DEFAULT_PRECISION = 5
+
+
+def export_response(request, layer: str, fmt: str):
     """
-    Internal base is used ONLY for server-to-server (web->geoserver) calls.
-    If someone mistakenly sets INTERNAL to localhost, fix it automatically.
+    ?format=fgb|parquet whole-layer download, optionally clipped with ?aoi_id=.
+    Built once per layer (and AOI) version, then served from disk.
     """
-    base_url_internal = getattr(settings, "GEOSERVER_BASE_URL_INTERNAL", None)
+    aoi_id = request.GET.get("aoi_id")
+    aoi_version = None
+    if aoi_id:
+        try:
+            aoi_id = int(aoi_id)
+        except ValueError:
+            return Response({"detail": "aoi_id must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        if not AOI.objects.filter(id=aoi_id).exists():
+            return Response({"detail": "AOI not found."}, status=status.HTTP_404_NOT_FOUND)
+        aoi_version = get_layer_version("aoi")
 
-    # اگر internal اشتباهی localhost بود، داخل کانتینر جواب نمی‌دهد
-    if base_url_internal and ("localhost" in base_url_internal or "127.0.0.1" in base_url_internal):
-        base_url_internal = None
+    try:
+        fh, path = open_export(layer, fmt, get_layer_version(layer), aoi_id, aoi_version)
+    except ImportError as e:
+        return Response({"detail": f"{fmt} export is not available: {e}"},
+                        status=status.HTTP_501_NOT_IMPLEMENTED)
 
-    # fallback صحیح داخل شبکه docker
-    base_url_internal = base_url_internal or "http://geoserver:8080/geoserver"
+    content_type, suffix = EXPORT_FORMATS[fmt]
+    filename = f"{layer}{f'_aoi{aoi_id}' if aoi_id else ''}{suffix}"
+    response = FileResponse(fh, content_type=content_type, as_attachment=True, filename=filename)
 
-    user = getattr(settings, "GEOSERVER_ADMIN_USER", None) or "admin"
-    pwd = getattr(settings, "GEOSERVER_ADMIN_PASSWORD", None) or "geoserver"
-    ws = getattr(settings, "GEOSERVER_WORKSPACE", "fire") or "fire"
-    return base_url_internal, user, pwd, ws
+    # same bytes as a static file (nginx serves HTTP range requests there)
+    media_url = export_media_url(path)
+    if media_url:
+        response["Content-Location"] = media_url
+    return response
 
 
-def _geoserver_public_base():
+def boundary_geojson_response(request, layer: str):
     """
-    Public base is used for URLs that the browser must reach (host->geoserver mapped port).
+    ?zoom= picks the simplified band, ?bbox= limits features to the viewport,
+    ?precision= caps coordinate decimals. Without any, the full-resolution
+    band is returned. ?format=topojson (provinces/counties) shares borders
+    between neighbours as arcs.
     """
-    return (
-        getattr(settings, "GEOSERVER_BASE_URL_PUBLIC", None)
-        or getattr(settings, "GEOSERVER_BASE_URL", None)
-        or "http://localhost:8084/geoserver"
-    )
+    fmt = (request.GET.get("format") or "geojson").lower()
+    if fmt not in ("geojson", "topojson") and fmt not in EXPORT_FORMATS:
+        return Response({"detail": "format must be geojson, topojson, fgb or parquet."},
+                        status=status.HTTP_400_BAD_REQUEST)
+    if fmt == "topojson" and layer not in TOPOJSON_LAYERS:
+        return Response({"detail": f"topojson is not available for {layer}."}, status=status.HTTP_400_BAD_REQUEST)
+    if fmt in EXPORT_FORMATS:
+        return export_response(request, layer, fmt)
+
+    if fmt == "geojson":
+        snap = snapshot_response(request, layer)
+        if snap is not None:
+            return snap
 
+    try:
+        bbox = _parse_bbox(request.GET.get("bbox"))
+        zoom = _parse_zoom(request.GET.get("zoom"))
+        precision = _parse_precision(request.GET.get("precision"))
+    except ValueError as e:
+        return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-def _minio_internal_url(bucket: str, object_name: str) -> str:
-    host = getattr(settings, "MINIO_INTERNAL_HOST", "minio")
-    port = getattr(settings, "MINIO_INTERNAL_PORT", "9000")
-    return f"http://{host}:{port}/{bucket}/{object_name}"
+    band = band_for_zoom(zoom)
 
+    if fmt == "topojson":
+        precision = TOPOJSON_DEFAULT_PRECISION if precision is None else precision
+        if bbox:
+            return Response(boundary_topology(layer, band, precision, bbox))
+        data = cached_boundary_topology(layer, get_layer_version(layer), band, precision)
+        return HttpResponse(data, content_type="application/json")
+
+    sql, params = boundary_rows_sql(layer, band, bbox, precision)
+    return geojson_stream_response(sql, params)
+
+
+class ProvincesGeoJSONAPIView(APIView):
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    @versioned_get("provinces")
+    def get(self, request):
+        return boundary_geojson_response(request, "provinces")
 
-# =========================
-# GeoJSON APIs (unchanged)
-# =========================
 
 class CountiesGeoJSONAPIView(APIView):
     authentication_classes = []
     permission_classes = [AllowAny]
 
+    @versioned_get("counties")
     def get(self, request):
-        sql = """
-        SELECT
-          json_build_object('id', id, 'name', name)::text,
-          ST_AsGeoJSON(geometry::geometry)::text
-        FROM iran_counties;
-        """
-        return Response(feature_collection_from_sql(sql))
+        return boundary_geojson_response(request, "counties")
 
 
 class ForestsGeoJSONAPIView(APIView):
     authentication_classes = []
     permission_classes = [AllowAny]
 
+    @versioned_get("forests")
     def get(self, request):
-        sql = """
-        SELECT
-          json_build_object('id', id, 'name', name)::text,
-          ST_AsGeoJSON(geometry::geometry)::text
-        FROM iran_forests;
-        """
-        return Response(feature_collection_from_sql(sql))
+        return boundary_geojson_response(request, "forests")
 
 
 class FireRiskGeoJSONAPIView(APIView):
     authentication_classes = []
     permission_classes = [AllowAny]
 
+    @versioned_get("fire-risk")
+    def get(self, request):
+        fmt = (request.GET.get("format") or "geojson").lower()
+        if fmt in EXPORT_FORMATS:
+            return export_response(request, "fire-risk", fmt)
+        if fmt != "geojson":
+            return Response({"detail": "format must be geojson, fgb or parquet."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        snap = snapshot_response(request, "fire-risk")
+        if snap is not None:
+            return snap
+
+        try:
+            precision = _parse_precision(request.GET.get("precision"))
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return geojson_stream_response(feature_rows_sql("fire-risk", precision))
+
+
+class FireRiskClustersAPIView(APIView):
+    """
+    GET /api/fire/fire-risk/clusters/?zoom=&bbox=
+    Precomputed grid clusters (count, max_level, levels histogram) for the
+    zoom; individual points once zoomed in past CLUSTER_MAX_ZOOM.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    @versioned_get("fire-risk")
     def get(self, request):
-        sql = """
-        SELECT
-          json_build_object('id', id, 'name', name, 'level', level)::text,
-          ST_AsGeoJSON(geometry::geometry)::text
-        FROM fire_risk_areas;
-        """
-        return Response(feature_collection_from_sql(sql))
+        try:
+            zoom = _parse_zoom(request.GET.get("zoom"))
+            bbox = _parse_bbox(request.GET.get("bbox"))
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if zoom is None:
+            return Response({"detail": "zoom is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        sql, params = cluster_rows_sql(zoom, bbox)
+        return geojson_stream_response(sql, params)
+
+
+# =========================
+# Reverse geocoding (point / geometry -> province, county, forest)
+# POST /api/fire/reverse-geocode/
+# =========================
+
+REVERSE_GEOCODE_MAX_POINTS = 50000
+REVERSE_GEOCODE_MAX_GEOMETRIES = 500
+
+
+class ReverseGeocodeAPIView(APIView):
+    """
+    Body: {"points": [[lon, lat], ...], "geometries": [GeoJSON, ...], "layers": [...]}
+    Answered from per-worker STRtrees (fire.utils.geocoder), reloaded when
+    a layer's data version changes.
+    Response: per layer, one id (or null) per point and a list of ids per
+    geometry, plus {id: name} for every id returned.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        points = request.data.get("points") or []
+        geometries = request.data.get("geometries") or []
+        layers = request.data.get("layers") or GEOCODER_LAYERS
+
+        if not isinstance(layers, list) or any(l not in GEOCODER_LAYERS for l in layers):
+            return Response({"detail": f"layers must be a subset of {GEOCODER_LAYERS}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(points, list) or not isinstance(geometries, list):
+            return Response({"detail": "points and geometries must be lists."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(points) > REVERSE_GEOCODE_MAX_POINTS or len(geometries) > REVERSE_GEOCODE_MAX_GEOMETRIES:
+            return Response({"detail": f"At most {REVERSE_GEOCODE_MAX_POINTS} points and "
+                                       f"{REVERSE_GEOCODE_MAX_GEOMETRIES} geometries per request."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            coords = [(float(p[0]), float(p[1])) for p in points]
+            geoms = [shape(g) for g in geometries]
+        except Exception as e:
+            return Response({"detail": f"Invalid input: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        versions = dict(LayerVersion.objects.filter(layer__in=layers).values_list("layer", "version"))
+
+        result = {"points": {}, "geometries": {}, "names": {}}
+        for layer in layers:
+            v = versions.get(layer, 0)
+            hits = lookup_points(layer, v, coords)
+            per_geom = lookup_geometries(layer, v, geoms)
+            result["points"][layer] = hits
+            result["geometries"][layer] = per_geom
+            wanted = [i for i in hits if i is not None] + [i for ids in per_geom for i in ids]
+            result["names"][layer] = feature_names(layer, v, wanted)
+        result["versions"] = {layer: versions.get(layer, 0) for layer in layers}
+        return Response(result)
+
+
+# =========================
+# Vector tiles (MVT)
+# GET /api/fire/tiles/<layer>/<z>/<x>/<y>.mvt
+# =========================
+
+class VectorTileAPIView(APIView):
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    @versioned_get(layer_kwarg="layer")
+    def get(self, request, layer: str, z: int, x: int, y: int):
+        if layer not in TILE_LAYERS:
+            return Response({"detail": f"Unknown layer: {layer}"}, status=status.HTTP_404_NOT_FOUND)
+        if not valid_tile(z, x, y):
+            return Response({"detail": "Invalid tile coordinates."}, status=status.HTTP_400_BAD_REQUEST)
+
+        data = get_tile(layer, z, x, y, version=request_layer_version(request, layer))
+        if not data:
+            return HttpResponse(status=status.HTTP_204_NO_CONTENT)  # empty tile: nothing to draw
+        return HttpResponse(data, content_type="application/vnd.mapbox-vector-tile")
+
+
+def _aoi_dict(obj):
+    return {
+        "id": obj.id,
+        "name": obj.name,
+        "source": obj.source,
+        "created_at": obj.created_at,
+        "geometry": json.loads(obj.geometry.geojson)
+    }
+
+
+def _satellite_image_dict(obj):
+    return {
+        "id": obj.id,
+        "satellite_name": obj.satellite_name,
+        "date_time": obj.date_time,
+        "image_name": obj.image_name,
+        "minio_link": obj.minio_link,
+        "geoserver_layer": getattr(obj, "geoserver_layer", None),
+        "wms_url": getattr(obj, "wms_url", None),
+        "wmts_url": getattr(obj, "wmts_url", None),
+        "is_published": obj.is_published,
+        "status": obj.status,
+        "error_message": getattr(obj, "error_message", None),
+        "content_sha256": obj.content_sha256,
+    }
+
+
+def _index_layer_dict(obj):
+    return {
+        "id": obj.id,
+        "title": obj.title,
+        "index_name": obj.index_name,
+        "satellite_name": obj.satellite_name,
+        "date": obj.date,
+        "minio_link": obj.minio_link,
+        "geoserver_layer": getattr(obj, "geoserver_layer", None),
+        "wms_url": getattr(obj, "wms_url", None),
+        "wmts_url": getattr(obj, "wmts_url", None),
+        "is_published": obj.is_published,
+        "status": obj.status,
+        "error_message": getattr(obj, "error_message", None),
+        "content_sha256": obj.content_sha256,
+    }
+
+
+def list_response(request, qs, keyset, to_dict):
+    """
+    ?format=ndjson (or Accept: application/x-ndjson) -> streamed NDJSON.
+    ?limit= / ?cursor= -> one keyset page + next_cursor.
+    Otherwise the legacy {"results": [...]} with every row.
+    """
+    if wants_ndjson(request):
+        return ndjson_response(qs, to_dict)
+
+    if keyset.requested(request):
+        try:
+            rows, next_cursor = keyset.paginate(qs, request)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"results": [to_dict(o) for o in rows], "next_cursor": next_cursor})
+
+    return Response({"results": [to_dict(o) for o in qs]})
 
 
 class AOIAPIView(APIView):
     authentication_classes = []
     permission_classes = [AllowAny]
 
+    keyset = KeysetPaginator("-created_at", "-id")
+
+    @versioned_get("aoi")
     def get(self, request):
-        qs = AOI.objects.all()
-        results = []
-        for obj in qs:
-            results.append({
-                "id": obj.id,
-                "name": obj.name,
-                "source": obj.source,
-                "created_at": obj.created_at,
-                "geometry": json.loads(obj.geometry.geojson)
-            })
-        return Response({"results": results})
+        return list_response(request, AOI.objects.all(), self.keyset, _aoi_dict)
 
     def post(self, request):
         name = request.data.get("name", "AOI")
@@ -174,14 +465,9 @@ class AOIAPIView(APIView):
                             status=status.HTTP_400_BAD_REQUEST)
 
         obj = AOI.objects.create(name=name, source="draw", geometry=geos)
+        bump_layer_version("aoi")
 
-        return Response({
-            "id": obj.id,
-            "name": obj.name,
-            "source": obj.source,
-            "created_at": obj.created_at,
-            "geometry": json.loads(obj.geometry.geojson)
-        }, status=status.HTTP_201_CREATED)
+        return Response(_aoi_dict(obj), status=status.HTTP_201_CREATED)
 
 
 class AOIDetailAPIView(APIView):
@@ -196,13 +482,16 @@ class AOIDetailAPIView(APIView):
                             status=status.HTTP_404_NOT_FOUND)
 
         obj.delete()
+        bump_layer_version("aoi")
         return Response({"detail": "deleted"})
 
 
 class SatelliteImagesAPIView(APIView):
     authentication_classes = []
     permission_classes = [AllowAny]
+    keyset = KeysetPaginator("-date_time", "-id")
 
+    @versioned_get("satellite-images", "aoi")
     def get(self, request):
         satellite_name = request.GET.get("satellite_name")
         date_from = request.GET.get("date_from")
@@ -229,31 +518,17 @@ class SatelliteImagesAPIView(APIView):
             except AOI.DoesNotExist:
                 pass
 
-        qs = qs.order_by("-date_time")
+        qs = qs.order_by("-date_time", "-id")
 
-        results = []
-        for obj in qs:
-            results.append({
-                "id": obj.id,
-                "satellite_name": obj.satellite_name,
-                "date_time": obj.date_time,
-                "image_name": obj.image_name,
-                "minio_link": obj.minio_link,
-                "geoserver_layer": getattr(obj, "geoserver_layer", None),
-                "wms_url": getattr(obj, "wms_url", None),
-                "wmts_url": getattr(obj, "wmts_url", None),
-                "is_published": obj.is_published,
-                "status": obj.status,
-                "error_message": getattr(obj, "error_message", None),
-            })
-
-        return Response({"results": results})
+        return list_response(request, qs, self.keyset, _satellite_image_dict)
 
 
 class IndexLayersAPIView(APIView):
     authentication_classes = []
     permission_classes = [AllowAny]
+    keyset = KeysetPaginator("-date", "-id")
 
+    @versioned_get("index-layers")
     def get(self, request):
         index_name = request.GET.get("index_name")
         satellite_name = request.GET.get("satellite_name")
@@ -271,285 +546,797 @@ class IndexLayersAPIView(APIView):
             dt = parse_date(date)
             qs = qs.filter(date=dt)
 
-        qs = qs.order_by("-date")
+        qs = qs.order_by("-date", "-id")
 
-        results = []
-        for obj in qs:
-            results.append({
-                "id": obj.id,
-                "title": obj.title,
-                "index_name": obj.index_name,
-                "satellite_name": obj.satellite_name,
-                "date": obj.date,
-                "minio_link": obj.minio_link,
-                "geoserver_layer": getattr(obj, "geoserver_layer", None),
-                "wms_url": getattr(obj, "wms_url", None),
-                "wmts_url": getattr(obj, "wmts_url", None),
-                "is_published": obj.is_published,
-                "status": obj.status,
-                "error_message": getattr(obj, "error_message", None),
-            })
+        return list_response(request, qs, self.keyset, _index_layer_dict)
 
-        return Response({"results": results})
 
+def _zonal_stat_dict(obj):
+    return {
+        "index_layer_id": obj.index_layer_id,
+        "index_name": obj.index_name,
+        "date": obj.date,
+        "zone_type": obj.zone_type,
+        "zone_id": obj.zone_id,
+        "zone_version": obj.zone_version,
+        "count": obj.count,
+        "mean": obj.mean,
+        "min": obj.min,
+        "max": obj.max,
+        "std": obj.std,
+        "percentiles": obj.percentiles,
+        "computed_at": obj.computed_at,
+    }
 
-# ==========================================================
-# Upload APIs (MinIO + DB + GeoServer publish)
-# ==========================================================
 
-class UploadSatelliteImageAPIView(APIView):
-    parser_classes = (MultiPartParser, FormParser)
+class IndexLayerZonalStatsAPIView(APIView):
+    """
+    GET /api/fire/index-layers/<id>/zonal-stats/?zone_type=aoi|provinces|counties|forests&zone_id=
+    Computed blockwise on first request, then cached per zone version.
+    """
     authentication_classes = []
     permission_classes = [AllowAny]
 
-    def post(self, request):
-        f = request.FILES.get("file")
-        satellite_name = request.data.get("satellite_name")
-        date_time = request.data.get("date_time")
-        image_name = request.data.get("image_name") or (f.name if f else None)
-        geometry = request.data.get("geometry")
+    @versioned_get("index-layers", *sorted(set(ZONE_TYPES.values())))
+    def get(self, request, layer_id: int):
+        zone_type = request.GET.get("zone_type")
+        if zone_type not in ZONE_TYPES:
+            return Response({"detail": f"zone_type must be one of {sorted(ZONE_TYPES)}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            zone_id = int(request.GET.get("zone_id"))
+        except (TypeError, ValueError):
+            return Response({"detail": "zone_id must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
 
-        if not f:
-            return Response({"detail": "file is required."}, status=status.HTTP_400_BAD_REQUEST)
-        if not satellite_name:
-            return Response({"detail": "satellite_name is required."}, status=status.HTTP_400_BAD_REQUEST)
-        if not date_time:
-            return Response({"detail": "date_time is required."}, status=status.HTTP_400_BAD_REQUEST)
-
-        dt = parse_datetime(date_time)
-        if not dt:
-            return Response({"detail": "date_time is invalid. Use ISO datetime."},
+        try:
+            obj = IndexLayer.objects.get(id=layer_id)
+        except IndexLayer.DoesNotExist:
+            return Response({"detail": "Index layer not found."}, status=status.HTTP_404_NOT_FOUND)
+        if not obj.minio_object:
+            return Response({"detail": "Index layer has no raster in MinIO."}, status=status.HTTP_409_CONFLICT)
+
+        try:
+            row = cached_zonal_stats(obj, zone_type, zone_id, raster_path(obj))
+        except Exception as e:
+            return Response({"detail": f"Zonal statistics failed: {str(e)}"},
+                            status=status.HTTP_502_BAD_GATEWAY)
+        if row is None:
+            return Response({"detail": "Zone not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response(_zonal_stat_dict(row))
+
+
+SAMPLE_MAX_POINTS = 200000
+
+
+class IndexLayerSampleAPIView(APIView):
+    """
+    POST /api/fire/index-layers/<id>/sample/
+      {"points": [[lon, lat], ...], "band": 1} -> {"values": [v | null, ...]}
+      {"fire_risk": true}                     -> every FireRiskArea point, stored in fire_risk_samples
+    Points are grouped by raster block; each block is read once.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request, layer_id: int):
+        try:
+            obj = IndexLayer.objects.get(id=layer_id)
+        except IndexLayer.DoesNotExist:
+            return Response({"detail": "Index layer not found."}, status=status.HTTP_404_NOT_FOUND)
+        if not obj.minio_object:
+            return Response({"detail": "Index layer has no raster in MinIO."}, status=status.HTTP_409_CONFLICT)
+
+        if request.data.get("fire_risk"):
+            try:
+                n = sample_fire_risk(obj, raster_path(obj))
+            except Exception as e:
+                return Response({"detail": f"Sampling failed: {str(e)}"}, status=status.HTTP_502_BAD_GATEWAY)
+            return Response({"index_layer_id": obj.id, "fire_risk_points": n})
+
+        points = request.data.get("points") or []
+        if not isinstance(points, list) or not points:
+            return Response({"detail": "points (or fire_risk: true) is required."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(points) > SAMPLE_MAX_POINTS:
+            return Response({"detail": f"At most {SAMPLE_MAX_POINTS} points per request."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            coords = [(float(p[0]), float(p[1])) for p in points]
+            band = int(request.data.get("band") or 1)
+        except Exception as e:
+            return Response({"detail": f"Invalid input: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST)
+        if band < 1:
+            return Response({"detail": "band must be >= 1."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            values = sample_points(raster_path(obj), coords, band=band)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({"detail": f"Sampling failed: {str(e)}"}, status=status.HTTP_502_BAD_GATEWAY)
+
+        return Response({
+            "index_layer_id": obj.id,
+            "index_name": obj.index_name,
+            "date": obj.date,
+            "values": [None if v != v else v for v in values.tolist()],
+        })
+
+
+class DatacubeTimeSeriesAPIView(APIView):
+    """
+    GET /api/fire/datacube/<index_name>/timeseries/
+      ?lon=&lat=                                      -> [{"date", "value"}]
+      ?zone_type=aoi|provinces|counties|forests&zone_id= -> [{"date", "mean", "min", "max", "count"}]
+      optional &date_from=YYYY-MM-DD&date_to=YYYY-MM-DD
+    Reads only the datacube chunks that cover the point / zone.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    @versioned_get("datacube", *sorted(set(ZONE_TYPES.values())))
+    def get(self, request, index_name: str):
+        date_from = parse_date(request.GET.get("date_from") or "")
+        date_to = parse_date(request.GET.get("date_to") or "")
+        date_from = date_from.isoformat() if date_from else None
+        date_to = date_to.isoformat() if date_to else None
+
+        cube = DataCube(index_name)
+        if cube.grid is None:
+            return Response({"detail": "No datacube for this index_name."}, status=status.HTTP_404_NOT_FOUND)
+
+        zone_type = request.GET.get("zone_type")
+        if zone_type:
+            if zone_type not in ZONE_TYPES:
+                return Response({"detail": f"zone_type must be one of {sorted(ZONE_TYPES)}."},
+                                status=status.HTTP_400_BAD_REQUEST)
+            try:
+                zone_id = int(request.GET.get("zone_id"))
+            except (TypeError, ValueError):
+                return Response({"detail": "zone_id must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+            geom = zone_geometry(zone_type, zone_id)
+            if geom is None:
+                return Response({"detail": "Zone not found."}, status=status.HTTP_404_NOT_FOUND)
+            series = cube.area_series(geom, date_from, date_to)
+            return Response({
+                "index_name": index_name,
+                "zone_type": zone_type,
+                "zone_id": zone_id,
+                "series": [{"date": d, **st} for d, st in series],
+            })
+
+        try:
+            lon = float(request.GET.get("lon"))
+            lat = float(request.GET.get("lat"))
+        except (TypeError, ValueError):
+            return Response({"detail": "lon/lat (or zone_type/zone_id) are required."},
                             status=status.HTTP_400_BAD_REQUEST)
+        series = cube.point_series(lon, lat, date_from, date_to)
+        if series is None:
+            return Response({"detail": "Point is outside the datacube extent."}, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            "index_name": index_name,
+            "lon": lon,
+            "lat": lat,
+            "series": [{"date": d, "value": v} for d, v in series],
+        })
+
+
+class DeriveIndexLayerAPIView(APIView):
+    """
+    POST /api/fire/index-layers/derive/
+    {
+      "expression": "pre - post",
+      "inputs": {"pre": {"index_layer": 12}, "post": {"index_layer": 15},
+                 "nir": {"satellite_image": 3, "band": 8}},
+      "grid": "pre",                      # optional, input whose grid is used
+      "title": "...", "index_name": "DNBR", "date": "YYYY-MM-DD",
+      "satellite_name": "SENTINEL2"       # optional
+    }
+    Evaluated blockwise (fire.utils.bandmath) by a background job, then
+    stored and published like an uploaded index layer. Returns 202 + job id.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        expression = request.data.get("expression")
+        spec = request.data.get("inputs") or {}
+        title = request.data.get("title")
+        index_name = request.data.get("index_name")
+        d = parse_date(request.data.get("date") or "")
+
+        if not expression:
+            return Response({"detail": "expression is required."}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(spec, dict) or not spec:
+            return Response({"detail": "inputs is required."}, status=status.HTTP_400_BAD_REQUEST)
+        if not title or not index_name:
+            return Response({"detail": "title and index_name are required."}, status=status.HTTP_400_BAD_REQUEST)
+        if not d:
+            return Response({"detail": "date is required (YYYY-MM-DD)."}, status=status.HTTP_400_BAD_REQUEST)
 
-        geos = None
-        if geometry:
+        inputs = {}
+        satellite_name = request.data.get("satellite_name")
+        for name, item in spec.items():
+            if not str(name).isidentifier() or not isinstance(item, dict):
+                return Response({"detail": f"Invalid input: {name}"}, status=status.HTTP_400_BAD_REQUEST)
             try:
-                geometry_obj = json.loads(geometry) if isinstance(geometry, str) else geometry
-                geos = GEOSGeometry(json.dumps(geometry_obj), srid=4326)
-                if geos.geom_type != "Polygon":
-                    return Response({"detail": "Only Polygon geometry is allowed."},
+                band = int(item.get("band") or 1)
+                if "index_layer" in item:
+                    obj = IndexLayer.objects.get(id=int(item["index_layer"]))
+                elif "satellite_image" in item:
+                    obj = SatelliteImage.objects.get(id=int(item["satellite_image"]))
+                else:
+                    return Response({"detail": f"{name}: index_layer or satellite_image is required."},
                                     status=status.HTTP_400_BAD_REQUEST)
-            except Exception as e:
-                return Response({"detail": f"Invalid geometry: {str(e)}"},
+            except (IndexLayer.DoesNotExist, SatelliteImage.DoesNotExist):
+                return Response({"detail": f"{name}: raster not found."}, status=status.HTTP_404_NOT_FOUND)
+            except (TypeError, ValueError):
+                return Response({"detail": f"{name}: ids and band must be integers."},
                                 status=status.HTTP_400_BAD_REQUEST)
+            if not obj.minio_object:
+                return Response({"detail": f"{name}: raster has no MinIO object."}, status=status.HTTP_409_CONFLICT)
+            inputs[name] = (obj, band)
+            satellite_name = satellite_name or obj.satellite_name
 
-        mm = MinioManager()
-        object_name = _safe_object_name("satellite", f.name)
+        try:
+            missing = Expression(expression).names - set(inputs)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if missing:
+            return Response({"detail": f"no input for: {', '.join(sorted(missing))}"},
+                            status=status.HTTP_400_BAD_REQUEST)
 
-        content = f.read()
-        minio_url_public = mm.upload_satellite(
-            satellite_name=satellite_name,
-            file_name=object_name,
-            content=content
-        )
+        job = enqueue("derive_index_layer", {
+            "expression": expression,
+            "inputs": {
+                name: ["index" if isinstance(obj, IndexLayer) else "satellite", obj.id, band]
+                for name, (obj, band) in inputs.items()
+            },
+            "grid": request.data.get("grid"),
+            "title": title,
+            "index_name": index_name,
+            "date": d.isoformat(),
+            "satellite_name": satellite_name,
+            "request_key": uuid.uuid4().hex,  # one derived layer per request, however often the job is retried
+        })
+        return Response({
+            "job_id": job.id,
+            "job_url": request.build_absolute_uri(reverse("fire-job", args=[job.id])),
+        }, status=status.HTTP_202_ACCEPTED)
 
-        bucket = f"sat-{_slug(satellite_name)}"
-
-        obj = SatelliteImage.objects.create(
-            satellite_name=satellite_name,
-            date_time=dt,
-            image_name=image_name,
-            minio_link=minio_url_public,
-            geometry=geos,
-            minio_bucket=bucket,
-            minio_object=object_name,
-            status="minio_ok",
-            is_published=False,
-        )
 
+class JobAPIView(APIView):
+    """
+    GET /api/fire/jobs/<id>/ -> state of a background job (queued | running | succeeded | failed).
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request, job_id: int):
         try:
-            base_url_internal, user, pwd, ws = _geoserver_cfg()
-            if not base_url_internal or not user or not pwd:
-                raise Exception("GeoServer settings missing (GEOSERVER_BASE_URL_INTERNAL / GEOSERVER_ADMIN_USER / GEOSERVER_ADMIN_PASSWORD).")
+            job = Job.objects.get(id=job_id)
+        except Job.DoesNotExist:
+            return Response({"detail": "Job not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(job_dict(job))
 
-            gs = GeoServerManager(base_url=base_url_internal, username=user, password=pwd, workspace=ws)
 
-            minio_url_internal = _minio_internal_url(bucket=bucket, object_name=object_name)
+# ==========================================================
+# Upload APIs (MinIO + DB + GeoServer publish)
+# ==========================================================
 
-            store_name = f"sat_{_slug(satellite_name)}_{obj.id}"
-            layer_name = f"sat_{_slug(satellite_name)}_{obj.id}"
+def _polygon_or_none(geometry):
+    """GeoJSON Polygon (dict or JSON text) -> GEOSGeometry; ValueError with the 400 detail."""
+    if not geometry:
+        return None
+    try:
+        geometry_obj = json.loads(geometry) if isinstance(geometry, str) else geometry
+        geos = GEOSGeometry(json.dumps(geometry_obj), srid=4326)
+    except Exception as e:
+        raise ValueError(f"Invalid geometry: {str(e)}")
+    if geos.geom_type != "Polygon":
+        raise ValueError("Only Polygon geometry is allowed.")
+    return geos
+
+
+def _satellite_fields(data, file_name=None):
+    """Validated SatelliteImage fields from upload metadata (ValueError = 400 detail)."""
+    satellite_name = data.get("satellite_name")
+    date_time = data.get("date_time")
+    if not satellite_name:
+        raise ValueError("satellite_name is required.")
+    if not date_time:
+        raise ValueError("date_time is required.")
+    dt = parse_datetime(date_time)
+    if not dt:
+        raise ValueError("date_time is invalid. Use ISO datetime.")
+    return {
+        "satellite_name": satellite_name,
+        "date_time": dt,
+        "image_name": data.get("image_name") or file_name,
+        "geometry": _polygon_or_none(data.get("geometry")),
+        "minio_bucket": f"sat-{_slug(satellite_name)}",
+    }
+
+
+def _index_fields(data, file_name=None):
+    """Validated IndexLayer fields from upload metadata (ValueError = 400 detail)."""
+    for key, msg in (
+        ("title", "title is required."),
+        ("index_name", "index_name is required."),
+        ("date", "date is required (YYYY-MM-DD)."),
+        ("satellite_name", "satellite_name is required."),
+    ):
+        if not data.get(key):
+            raise ValueError(msg)
+    d = parse_date(data.get("date"))
+    if not d:
+        raise ValueError("date is invalid. Use YYYY-MM-DD.")
+    return {
+        "title": data.get("title"),
+        "index_name": data.get("index_name"),
+        "date": d,
+        "satellite_name": data.get("satellite_name"),
+        "geometry": _polygon_or_none(data.get("geometry")),
+        "minio_bucket": f"idx-{_slug(data.get('index_name'))}",
+    }
+
+
+# kind -> (model, field validator, LayerVersion name, row serializer)
+UPLOAD_KINDS = {
+    "satellite": (SatelliteImage, _satellite_fields, "satellite-images", _satellite_image_dict),
+    "index": (IndexLayer, _index_fields, "index-layers", _index_layer_dict),
+}
+
+_SHA256_RE = re.compile(r"^[0-9a-f]{64}$")  # declared content hash (lowercase hex)
+
+
+def _duplicate_response(kind, existing):
+    """200 with the row that already holds these bytes (nothing new is stored)."""
+    to_dict = UPLOAD_KINDS[kind][3]
+    return Response({**to_dict(existing), "duplicate": True, "duplicate_of": existing.id})
+
+
+def _header_duplicate(request, kind):
+    """
+    Row matching the client's X-Content-SHA256 header, checked before the
+    body is read so a re-upload never streams the file at all.
+    """
+    return find_duplicate(kind, (request.META.get("HTTP_X_CONTENT_SHA256") or "").strip())
 
-            gs.publish_geotiff_from_minio(
-                minio_internal_url=minio_url_internal,
-                store_name=store_name,
-                layer_name=layer_name,
-            )
 
-            public_base = _geoserver_public_base()
-
-            obj.geoserver_workspace = ws
-            obj.geoserver_store = store_name
-            obj.geoserver_layer = f"{ws}:{layer_name}"
-            obj.wms_url = f"{public_base}/wms"
-            obj.wmts_url = f"{public_base}/gwc/service/wmts"
-            obj.status = "published"
-            obj.is_published = True
-            obj.error_message = None
-            obj.save(update_fields=[
-                "geoserver_workspace", "geoserver_store", "geoserver_layer",
-                "wms_url", "wmts_url", "status", "is_published", "error_message"
-            ])
+def _create_pending(kind, fields, sha256=None):
+    """
+    (new "pending" row, None), or (None, existing row) when another row
+    already holds this content hash (the unique index settles races).
+    """
+    Model = UPLOAD_KINDS[kind][0]
+    if sha256:
+        existing = find_duplicate(kind, sha256)
+        if existing is not None:
+            return None, existing
+    try:
+        with transaction.atomic():
+            obj = Model.objects.create(minio_link="", status="pending", is_published=False,
+                                       content_sha256=sha256.lower() if sha256 else None, **fields)
+    except IntegrityError:
+        existing = find_duplicate(kind, sha256)
+        if existing is None:
+            raise
+        return None, existing
+    return obj, None
+
+
+class UploadSatelliteImageAPIView(StreamingUploadMixin, APIView):
+    parser_classes = (MultiPartParser, FormParser)
+    authentication_classes = []
+    permission_classes = [AllowAny]
 
-        except Exception as e:
-            obj.status = "publish_failed"
-            obj.error_message = str(e)
-            obj.save(update_fields=["status", "error_message"])
+    def post(self, request):
+        existing = _header_duplicate(request, "satellite")
+        if existing is not None:
+            return _duplicate_response("satellite", existing)
 
-            return Response({
-                "detail": "publish_failed",
-                "stage": "geoserver",
-                "error": str(e),
-                "id": obj.id,
-                "minio_link": obj.minio_link,
-                "minio_bucket": obj.minio_bucket,
-                "minio_object": obj.minio_object,
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        f = request.FILES.get("file")
+        if not f:
+            return Response({"detail": "file is required."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            fields = _satellite_fields(request.data, f.name)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # same bytes already stored: the staged copy is dropped in finalize_response
+        obj, existing = _create_pending("satellite", fields, getattr(f, "sha256", None))
+        if existing is not None:
+            return _duplicate_response("satellite", existing)
+        bump_layer_version("satellite-images")
+
+        # COG conversion + MinIO + GeoServer run in a run_jobs worker
+        job = enqueue_staged_ingest(obj, "satellite", f, keep_original_requested(request.data.get("keep_original")))
 
         return Response({
             "id": obj.id,
             "satellite_name": obj.satellite_name,
             "date_time": obj.date_time,
             "image_name": obj.image_name,
-            "minio_link": obj.minio_link,
             "minio_bucket": obj.minio_bucket,
-            "minio_object": obj.minio_object,
             "status": obj.status,
             "is_published": obj.is_published,
-            "geoserver_layer": obj.geoserver_layer,
-            "wms_url": obj.wms_url,
-            "wmts_url": obj.wmts_url,
-        }, status=status.HTTP_201_CREATED)
+            "job_id": job.id,
+            "job_url": request.build_absolute_uri(reverse("fire-job", args=[job.id])),
+        }, status=status.HTTP_202_ACCEPTED)
 
 
-class UploadIndexLayerAPIView(APIView):
+class UploadIndexLayerAPIView(StreamingUploadMixin, APIView):
     parser_classes = (MultiPartParser, FormParser)
     authentication_classes = []
     permission_classes = [AllowAny]
 
     def post(self, request):
-        f = request.FILES.get("file")
-        title = request.data.get("title")
-        index_name = request.data.get("index_name")
-        date = request.data.get("date")
-        satellite_name = request.data.get("satellite_name")
-        geometry = request.data.get("geometry")
+        existing = _header_duplicate(request, "index")
+        if existing is not None:
+            return _duplicate_response("index", existing)
 
+        f = request.FILES.get("file")
         if not f:
             return Response({"detail": "file is required."}, status=status.HTTP_400_BAD_REQUEST)
-        if not title:
-            return Response({"detail": "title is required."}, status=status.HTTP_400_BAD_REQUEST)
-        if not index_name:
-            return Response({"detail": "index_name is required."}, status=status.HTTP_400_BAD_REQUEST)
-        if not date:
-            return Response({"detail": "date is required (YYYY-MM-DD)."}, status=status.HTTP_400_BAD_REQUEST)
-        if not satellite_name:
-            return Response({"detail": "satellite_name is required."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            fields = _index_fields(request.data, f.name)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        d = parse_date(date)
-        if not d:
-            return Response({"detail": "date is invalid. Use YYYY-MM-DD."},
+        # same bytes already stored: the staged copy is dropped in finalize_response
+        obj, existing = _create_pending("index", fields, getattr(f, "sha256", None))
+        if existing is not None:
+            return _duplicate_response("index", existing)
+        bump_layer_version("index-layers")
+
+        # COG conversion + MinIO + GeoServer run in a run_jobs worker
+        job = enqueue_staged_ingest(obj, "index", f, keep_original_requested(request.data.get("keep_original")))
+
+        return Response({
+            "id": obj.id,
+            "title": obj.title,
+            "index_name": obj.index_name,
+            "satellite_name": obj.satellite_name,
+            "date": obj.date,
+            "minio_bucket": obj.minio_bucket,
+            "status": obj.status,
+            "is_published": obj.is_published,
+            "job_id": job.id,
+            "job_url": request.build_absolute_uri(reverse("fire-job", args=[job.id])),
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+BULK_MAX_ITEMS = 500
+
+
+class BulkUploadAPIView(StreamingUploadMixin, APIView):
+    """
+    POST /api/fire/upload/bulk/  (multipart)
+      kind      satellite | index
+      manifest  JSON {"defaults": {...}, "items": [{"file": "<file or archive member name>", ...}]}
+                (or just the items list); per-item fields as in the single-file uploads
+      files     GeoTIFFs (repeat the field), and/or
+      archive   one .zip / .tar[.gz|.bz2|.xz] holding them
+      concurrency  optional pool size for the ingest job (at most / default BULK_INGEST_WORKERS)
+    Rows are created now (status "pending") and one bulk_ingest job
+    converts, stores and publishes them in parallel; per-item results end
+    up in the job result. Items with invalid metadata are listed under
+    "rejected", files whose bytes are already stored under "duplicates";
+    neither stops the rest.
+    """
+    parser_classes = (MultiPartParser, FormParser)
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        kind = request.data.get("kind")
+        if kind not in UPLOAD_KINDS:
+            return Response({"detail": f"kind must be one of {sorted(UPLOAD_KINDS)}."},
                             status=status.HTTP_400_BAD_REQUEST)
+        _, validate, version_layer, _ = UPLOAD_KINDS[kind]
 
-        geos = None
-        if geometry:
-            try:
-                geometry_obj = json.loads(geometry) if isinstance(geometry, str) else geometry
-                geos = GEOSGeometry(json.dumps(geometry_obj), srid=4326)
-                if geos.geom_type != "Polygon":
-                    return Response({"detail": "Only Polygon geometry is allowed."},
-                                    status=status.HTTP_400_BAD_REQUEST)
-            except Exception as e:
-                return Response({"detail": f"Invalid geometry: {str(e)}"},
+        try:
+            manifest = request.data.get("manifest") or "[]"
+            manifest = json.loads(manifest) if isinstance(manifest, str) else manifest
+            if isinstance(manifest, list):
+                manifest = {"items": manifest}
+            defaults = manifest.get("defaults") or {}
+            entries = manifest.get("items") or []
+            if not isinstance(defaults, dict) or not isinstance(entries, list):
+                raise ValueError("defaults must be an object and items a list")
+        except (ValueError, AttributeError) as e:
+            return Response({"detail": f"Invalid manifest: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST)
+        if not entries:
+            return Response({"detail": "manifest has no items."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(entries) > BULK_MAX_ITEMS:
+            return Response({"detail": f"At most {BULK_MAX_ITEMS} items per request."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        files = {f.name: f for f in request.FILES.getlist("files")}
+        archive_file = request.FILES.get("archive")
+        archive = None
+        if archive_file is not None:
+            archive_kind = archive_type(archive_file.name)
+            if archive_kind is None:
+                return Response({"detail": "archive must be .zip or .tar (optionally .gz/.bz2/.xz)."},
                                 status=status.HTTP_400_BAD_REQUEST)
+            archive = {"bucket": archive_file.bucket, "object": archive_file.object_name,
+                       "name": archive_file.name, "type": archive_kind}
+        if not files and archive is None:
+            return Response({"detail": "files or archive is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        items, rejected, duplicates, used = [], [], [], set()
+        for entry in entries:
+            name = entry.get("file") if isinstance(entry, dict) else None
+            if not name:
+                rejected.append({"file": name, "detail": "file is required."})
+                continue
+            f = files.get(name)
+            if f is None and archive is None:
+                rejected.append({"file": name, "detail": "No uploaded file with this name."})
+                continue
+            data = {**defaults, **entry}
+            try:
+                fields = validate(data, os.path.basename(name))
+            except ValueError as e:
+                rejected.append({"file": name, "detail": str(e)})
+                continue
+            keep_original = keep_original_requested(data.get("keep_original"))
+            # archive members are hashed in the job (status "duplicate" in its result)
+            obj, existing = _create_pending(kind, fields, getattr(f, "sha256", None))
+            if existing is not None:
+                duplicates.append({"file": name, "duplicate_of": existing.id})
+                continue
+            items.append({
+                "file": name,
+                "id": obj.id,
+                "keep_original": keep_original,
+                "staged": staged_ingest_payload(obj, kind, f, keep_original) if f is not None else None,
+            })
+            if f is not None:
+                used.add(name)
 
-        mm = MinioManager()
-        object_name = _safe_object_name("index", f.name)
+        if not items and duplicates and not rejected:
+            return Response({"items": [], "rejected": [], "duplicates": duplicates})
+        if not items:
+            return Response({"detail": "No valid items.", "rejected": rejected, "duplicates": duplicates},
+                            status=status.HTTP_400_BAD_REQUEST)
+        bump_layer_version(version_layer)
 
-        content = f.read()
-        minio_url_public = mm.upload_index(
-            index_name=index_name,
-            file_name=object_name,
-            content=content
-        )
+        try:
+            concurrency = max(0, min(int(request.data.get("concurrency") or 0), default_bulk_concurrency())) or None
+        except (TypeError, ValueError):
+            concurrency = None
+        job = enqueue("bulk_ingest", {"kind": kind, "concurrency": concurrency, "archive": archive, "items": items})
 
-        bucket = f"idx-{_slug(index_name)}"
-
-        obj = IndexLayer.objects.create(
-            title=title,
-            minio_link=minio_url_public,
-            index_name=index_name,
-            date=d,
-            satellite_name=satellite_name,
-            geometry=geos,
-            minio_bucket=bucket,
-            minio_object=object_name,
-            status="minio_ok",
-            is_published=False,
-        )
+        # the job owns these staging objects now; unused ones are dropped
+        for name in used:
+            files[name].release()
+        if archive_file is not None:
+            archive_file.release()
 
+        return Response({
+            "job_id": job.id,
+            "job_url": request.build_absolute_uri(reverse("fire-job", args=[job.id])),
+            "items": [{"file": it["file"], "id": it["id"], "status": "pending"} for it in items],
+            "rejected": rejected,
+            "duplicates": duplicates,
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class UploadSessionsAPIView(APIView):
+    """
+    POST /api/fire/upload/sessions/
+      {"kind": "satellite" | "index", "file_name": "...", "size": <bytes>, ...upload fields}
+    -> 201 {"id", "chunk_size", "parts", ...}; then PUT each chunk to
+    /upload/sessions/<id>/ with "Content-Range: bytes <start>-<end>/<size>"
+    (or ?offset=<start>), GET it to see which chunks are missing, and POST
+    /upload/sessions/<id>/complete/ to ingest like a regular upload.
+    With an optional "sha256" of the file that is already stored, the
+    existing row is returned (200, "duplicate": true) and no session opens;
+    otherwise the ingest job checks the upload against it.
+
+    With "direct": true the bytes bypass Django: "upload" holds presigned
+    PUT URLs into the private staging bucket ("url", or "parts" with one
+    URL per chunk; GET the session for fresh ones) and complete/ verifies
+    the object in MinIO.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        data = request.data.dict() if hasattr(request.data, "dict") else dict(request.data)
+        kind = data.pop("kind", None)
+        file_name = data.pop("file_name", None)
+        if kind not in UPLOAD_KINDS:
+            return Response({"detail": f"kind must be one of {sorted(UPLOAD_KINDS)}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not file_name:
+            return Response({"detail": "file_name is required."}, status=status.HTTP_400_BAD_REQUEST)
         try:
-            base_url_internal, user, pwd, ws = _geoserver_cfg()
-            if not base_url_internal or not user or not pwd:
-                raise Exception("GeoServer settings missing (GEOSERVER_BASE_URL_INTERNAL / GEOSERVER_ADMIN_USER / GEOSERVER_ADMIN_PASSWORD).")
+            size = int(data.pop("size", None))
+        except (TypeError, ValueError):
+            return Response({"detail": "size must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        sha256 = (data.pop("sha256", None) or request.META.get("HTTP_X_CONTENT_SHA256") or "").strip().lower()
+        if sha256 and not _SHA256_RE.match(sha256):
+            return Response({"detail": "sha256 must be 64 hex digits."}, status=status.HTTP_400_BAD_REQUEST)
+        existing = find_duplicate(kind, sha256)
+        if existing is not None:
+            return _duplicate_response(kind, existing)
+        direct = str(data.pop("direct", "")).strip().lower() in ("1", "true", "yes", "on")
+        try:
+            UPLOAD_KINDS[kind][1](data, file_name)  # reject bad metadata before any bytes are sent
+            if direct:
+                session = create_direct_upload(kind, file_name, size, data, sha256 or None)
+            else:
+                session = create_upload_session(kind, file_name, size, data, sha256 or None)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({"detail": f"Creating upload failed: {str(e)}"}, status=status.HTTP_502_BAD_GATEWAY)
+        return Response(_upload_session_response(session), status=status.HTTP_201_CREATED)
 
-            gs = GeoServerManager(base_url=base_url_internal, username=user, password=pwd, workspace=ws)
 
-            minio_url_internal = _minio_internal_url(bucket=bucket, object_name=object_name)
+def _upload_session_response(session):
+    body = upload_session_dict(session)
+    if session.direct and session.status == "open":
+        body["upload"] = direct_upload_urls(session)
+    return body
 
-            store_name = f"idx_{_slug(index_name)}_{obj.id}"
-            layer_name = f"idx_{_slug(index_name)}_{obj.id}"
 
-            gs.publish_geotiff_from_minio(
-                minio_internal_url=minio_url_internal,
-                store_name=store_name,
-                layer_name=layer_name,
-            )
+def _open_upload_session(session_id):
+    """(session, None) or (None, error Response)."""
+    try:
+        session = UploadSession.objects.get(id=session_id)
+    except UploadSession.DoesNotExist:
+        return None, Response({"detail": "Upload session not found."}, status=status.HTTP_404_NOT_FOUND)
+    if session.status == "open" and session.expires_at < timezone.now():
+        return None, Response({"detail": "Upload session expired."}, status=status.HTTP_410_GONE)
+    return session, None
+
 
-            public_base = _geoserver_public_base()
-
-            obj.geoserver_workspace = ws
-            obj.geoserver_store = store_name
-            obj.geoserver_layer = f"{ws}:{layer_name}"
-            obj.wms_url = f"{public_base}/wms"
-            obj.wmts_url = f"{public_base}/gwc/service/wmts"
-            obj.status = "published"
-            obj.is_published = True
-            obj.error_message = None
-            obj.save(update_fields=[
-                "geoserver_workspace", "geoserver_store", "geoserver_layer",
-                "wms_url", "wmts_url", "status", "is_published", "error_message"
-            ])
+class UploadSessionDetailAPIView(APIView):
+    """
+    GET    /api/fire/upload/sessions/<id>/ -> progress + missing_parts (resume from these);
+                                             fresh presigned URLs for direct sessions
+    PUT    /api/fire/upload/sessions/<id>/ -> one chunk (raw body), idempotent
+    DELETE /api/fire/upload/sessions/<id>/ -> abort
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
 
+    def get(self, request, session_id):
+        session, error = _open_upload_session(session_id)
+        if error:
+            return error
+        return Response(_upload_session_response(session))
+
+    def put(self, request, session_id):
+        session, error = _open_upload_session(session_id)
+        if error:
+            return error
+        if session.status != "open":
+            return Response({"detail": f"Upload session is {session.status}."}, status=status.HTTP_409_CONFLICT)
+        if session.direct:
+            return Response({"detail": "Direct upload: PUT the chunks to the presigned URLs."},
+                            status=status.HTTP_409_CONFLICT)
+
+        try:
+            length = int(request.META.get("CONTENT_LENGTH") or 0)
+            part = chunk_part_number(
+                session,
+                content_range=request.META.get("HTTP_CONTENT_RANGE"),
+                offset=request.GET.get("offset"),
+                length=length,
+            )
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # raw stream, one chunk (bypasses DATA_UPLOAD_MAX_MEMORY_SIZE, bounded by chunk_size)
+        data = request.read(length)
+        if len(data) != length:
+            return Response({"detail": "Incomplete chunk body."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            session = put_upload_chunk(session, part, data)
         except Exception as e:
-            obj.status = "publish_failed"
-            obj.error_message = str(e)
-            obj.save(update_fields=["status", "error_message"])
+            return Response({"detail": f"Storing chunk failed: {str(e)}"}, status=status.HTTP_502_BAD_GATEWAY)
+        return Response(upload_session_dict(session))
 
-            return Response({
-                "detail": "publish_failed",
-                "stage": "geoserver",
-                "error": str(e),
-                "id": obj.id,
-                "minio_link": obj.minio_link,
-                "minio_bucket": obj.minio_bucket,
-                "minio_object": obj.minio_object,
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    def delete(self, request, session_id):
+        session, error = _open_upload_session(session_id)
+        if error:
+            return error
+        if session.status == "open":
+            abort_upload_session(session)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UploadSessionCompleteAPIView(APIView):
+    """
+    POST /api/fire/upload/sessions/<id>/complete/
+    Assembles the chunks and creates the SatelliteImage/IndexLayer through
+    the normal ingest job -> 202 {"id", "job_id", ...}; 200 with
+    "duplicate_of" when a row already holds the declared sha256.
+    Repeating it returns the same result; 409 while another request is
+    completing the session.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request, session_id):
+        session, error = _open_upload_session(session_id)
+        if error:
+            return error
+
+        # claim the session under the row lock, then talk to MinIO without holding it
+        with transaction.atomic():
+            session = UploadSession.objects.select_for_update().get(id=session.id)
+            if session.status == "aborted":
+                return Response({"detail": "Upload session is aborted."}, status=status.HTTP_409_CONFLICT)
+            if session.status == "completing" and not completing_expired(session):
+                return Response({"detail": "Upload session is being completed, retry later."},
+                                status=status.HTTP_409_CONFLICT)
+            if session.status in ("open", "completing"):
+                session.status = "completing"
+                session.save(update_fields=["status", "updated_at"])
+                claimed = True
+            else:
+                claimed = False
+
+        if claimed:
+            error = self._complete(session)
+            if error:
+                return error
+
+        body = upload_session_dict(session)
+        if session.job_id:
+            body["job_url"] = request.build_absolute_uri(reverse("fire-job", args=[session.job_id]))
+            return Response(body, status=status.HTTP_202_ACCEPTED)
+        return Response({**body, "duplicate": True, "duplicate_of": session.object_id})
+
+    def _complete(self, session):
+        """Assemble + hand over to the ingest job; an error Response puts the session back to open."""
+        _, validate, version_layer, _ = UPLOAD_KINDS[session.kind]
+
+        def reopen():
+            UploadSession.objects.filter(id=session.id, status="completing").update(
+                status="open", updated_at=timezone.now())
+            session.status = "open"
+
+        try:
+            fields = validate(session.metadata, session.file_name)
+            if session.direct:
+                staged = complete_direct_upload(session)
+            else:
+                staged = complete_upload_session(session)
+        except ValueError as e:
+            if session.status != "aborted":
+                reopen()
+            return Response({"detail": str(e), **upload_session_dict(session)},
+                            status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            reopen()
+            return Response({"detail": f"Assembling chunks failed: {str(e)}"},
+                            status=status.HTTP_502_BAD_GATEWAY)
+
+        obj, existing = _create_pending(session.kind, fields, session.sha256)
+        job = None
+        if existing is not None:
+            staged.discard()  # same bytes already stored
+        else:
+            bump_layer_version(version_layer)
+            job = enqueue_staged_ingest(obj, session.kind, staged,
+                                        keep_original_requested(session.metadata.get("keep_original")),
+                                        expected_sha256=session.sha256)
+        session.status = "completed"
+        session.object_id = obj.id if existing is None else existing.id
+        session.job_id = job.id if job else None
+        session.save(update_fields=["status", "object_id", "job_id", "updated_at"])
+        return None
 
-        return Response({
-            "id": obj.id,
-            "title": obj.title,
-            "index_name": obj.index_name,
-            "satellite_name": obj.satellite_name,
-            "date": obj.date,
-            "minio_link": obj.minio_link,
-            "minio_bucket": obj.minio_bucket,
-            "minio_object": obj.minio_object,
-            "status": obj.status,
-            "is_published": obj.is_published,
-            "geoserver_layer": obj.geoserver_layer,
-            "wms_url": obj.wms_url,
-            "wmts_url": obj.wmts_url,
-        }, status=status.HTTP_201_CREATED)
 
 # ==========================================================
 # Style Legend API (Data-driven from GeoServer SLD)
@@ -573,13 +1360,6 @@ def _dedupe_colormap(colormap):
     return out
 
 
-def _http_get(url: str, username: str, password: str, timeout: int = 10) -> bytes:
-    token = base64.b64encode(f"{username}:{password}".encode("utf-8")).decode("ascii")
-    req = urllib.request.Request(url, headers={"Authorization": f"Basic {token}"})
-    with urllib.request.urlopen(req, timeout=timeout) as resp:
-        return resp.read()
-
-
 def _parse_sld_colormap(sld_xml: bytes):
     try:
         root = ET.fromstring(sld_xml)
@@ -627,14 +1407,15 @@ class StyleLegendAPIView(APIView):
         sld_url = f"{base_url_internal}/rest/workspaces/{ws}/styles/{style_name}.sld"
 
         try:
-            sld_xml = _http_get(sld_url, user, pwd)
-        except urllib.error.HTTPError as e:
-            return Response({
-                "detail": "Failed to fetch SLD from GeoServer.",
-                "status_code": e.code,
-                "error": str(e),
-                "url": sld_url,
-            }, status=status.HTTP_502_BAD_GATEWAY)
+            r = geoserver_client(base_url_internal, user, pwd).request("GET", sld_url, timeout=10)
+            if r.status_code != 200:
+                return Response({
+                    "detail": "Failed to fetch SLD from GeoServer.",
+                    "status_code": r.status_code,
+                    "error": f"HTTP {r.status_code}: {r.reason}",
+                    "url": sld_url,
+                }, status=status.HTTP_502_BAD_GATEWAY)
+            sld_xml = r.content
         except Exception as e:
             return Response({
                 "detail": "Failed to fetch SLD from GeoServer.",
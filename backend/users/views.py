@@ -7,6 +7,10 @@ from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.permissions import IsAuthenticated
 from django.db.models import Count, Q
 
+from config.keyset import (
+    KeysetPagination, KeysetPaginator, NDJSONListMixin, ndjson_response, wants_ndjson,
+)
+
 from .models import User, AccessGroup, GroupMember, Report
 from .serializers import (
     RegisterSerializer, LoginSerializer, ChangePasswordSerializer,
@@ -213,9 +217,11 @@ class AccessGroupDetailAPIView(APIView):
         return Response({"detail": f"گروه {name} با موفقیت حذف شد."}, status=status.HTTP_200_OK)
 
 
-class UserListAPIView(generics.ListAPIView):
+class UserListAPIView(NDJSONListMixin, generics.ListAPIView):
     serializer_class = UserListSerializer
     permission_classes = [IsAuthenticated, IsManagerOrAdmin]
+    pagination_class = KeysetPagination
+    keyset_ordering = ("username", "id")
 
     def get_queryset(self):
         qs = User.objects.all().order_by("username")
@@ -248,9 +254,11 @@ class AdminPingAPIView(APIView):
         )
 
 
-class AdminUserListAPIView(generics.ListAPIView):
+class AdminUserListAPIView(NDJSONListMixin, generics.ListAPIView):
     permission_classes = [IsAuthenticated, IsRoleAdmin]
     serializer_class = AdminUserListSerializer
+    pagination_class = KeysetPagination
+    keyset_ordering = ("-date_joined", "-id")
 
     def get_queryset(self):
         qs = User.objects.all().order_by("-date_joined")
@@ -374,6 +382,28 @@ class ReportUploadAPIView(APIView):
         )
 
 
+def _reports_response(request, qs):
+    """
+    Plain list by default; ?limit=/?cursor= for keyset pages on
+    (created_at, id); ?format=ndjson to stream every row.
+    """
+    context = {"request": request}
+
+    if wants_ndjson(request):
+        return ndjson_response(qs, lambda obj: ReportListSerializer(obj, context=context).data)
+
+    if KeysetPaginator.requested(request):
+        try:
+            rows, next_cursor = KeysetPaginator("-created_at", "-id").paginate(qs, request)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        data = ReportListSerializer(rows, many=True, context=context).data
+        return Response({"results": data, "next_cursor": next_cursor}, status=status.HTTP_200_OK)
+
+    ser = ReportListSerializer(qs, many=True, context=context)
+    return Response(ser.data, status=status.HTTP_200_OK)
+
+
 class MyReportsAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -388,8 +418,7 @@ class MyReportsAPIView(APIView):
         if q:
             qs = qs.filter(Q(title__icontains=q) | Q(subsystem__icontains=q))
 
-        ser = ReportListSerializer(qs, many=True, context={"request": request})
-        return Response(ser.data, status=status.HTTP_200_OK)
+        return _reports_response(request, qs)
 
 
 class ReportsListForManagerAPIView(APIView):
@@ -410,5 +439,4 @@ class ReportsListForManagerAPIView(APIView):
                 Q(uploaded_by__username__icontains=q)
             )
 
-        ser = ReportListSerializer(qs, many=True, context={"request": request})
-        return Response(ser.data, status=status.HTTP_200_OK)
+        return _reports_response(request, qs)